@@ -1,27 +1,58 @@
+import time
+_script_start = time.perf_counter()
+
 import streamlit as st
 import numpy as np
-from PIL import Image
-import tensorflow as tf
-from utils.recycle_info import recycle_guide
-import pandas as pd
+from utils.recycle_info import impact_factors, recycle_guide
+from utils.classifier import (CATEGORIES, decode_predictions, load_classifier,
+                              model_version, predict_with_embeddings, preprocess_image)
+from utils.embedding_index import EmbeddingIndex, project_embeddings
+from utils.prediction_cache import PredictionCache
+from utils.preprocessing import ImageTooLargeError, load_tta_views, open_image, thread_buffer
+from utils.inference_broker import InferenceBroker
+from utils.background import BackgroundTask
+from utils.profiling import LatencyWindow, PhaseTimer
+from utils.detection_index import new_detection_id
+from utils.detection_journal import DetectionJournal, JournalFlusher
+from utils.sheets import HISTORY_COLUMNS, ID_COLUMN, LocalSheet
+from utils.geo import viewport_bounds
+from utils.map_engine import (CATEGORY_COLORS, DEFAULT_COLOR, bounds_from_leaflet, density_image,
+                               detection_geojson, detection_layer, heatmap_layer, viewport_clusters,
+                               viewport_density)
+from utils import settings
+import io
 import os
 from datetime import datetime
-import folium
-from streamlit_folium import folium_static
 import streamlit.components.v1 as components
-import plotly.express as px
-import folium.plugins
-# Add these imports for Google Sheets
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import json
+# tensorflow, pandas, folium, plotly dan gspread di-import saat dibutuhkan saja
+# agar halaman sudah tampil sebelum dependency berat selesai dimuat
 
 # Set page config FIRST
 st.set_page_config(page_title="RecycleLens", layout="wide")
 
+# Waktu startup per fase dicetak ke log server sekali per proses
+@st.cache_resource
+def get_startup_timer():
+    return PhaseTimer("startup")
+
+startup = get_startup_timer()
+is_first_run = not startup.has_phase("imports")
+if is_first_run:
+    startup.record("imports", time.perf_counter() - _script_start)
+
 # Google Sheets Setup
 @st.cache_resource
 def setup_google_sheets():
+    with startup.phase("google sheets"):
+        return _connect_google_sheets()
+
+def _connect_google_sheets():
+    if settings.LOCAL_SHEET_PATH:
+        return LocalSheet(settings.LOCAL_SHEET_PATH)
+
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
     # Define the scope
     scope = ['https://spreadsheets.google.com/feeds',
              'https://www.googleapis.com/auth/drive']
@@ -53,517 +84,252 @@ def setup_google_sheets():
         # Create a new sheet if it doesn't exist
         sheet = client.create(SHEET_NAME).sheet1
         # Set up the header row
-        sheet.append_row(['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
+        sheet.append_row(HISTORY_COLUMNS)
     
     return sheet
 
-# Initialize Google Sheet
-sheet = setup_google_sheets()
-
 # Load model
-@st.cache_resource
 def load_model():
-    return tf.keras.models.load_model('models/DenseNet121_trashnetmerged_best_model.h5')
-
-model = load_model()
-
-# Kategori
-CATEGORIES = ['cardboard', 'glass', 'metal', 'paper', 'plastic', 'trash']
-
-# Fungsi Prediksi
-def predict_image(img):
-    img = img.convert("RGB")
-    img = img.resize((224, 224))
-    img_array = np.array(img) / 255.0
-    img_array = img_array.reshape(1, 224, 224, 3)
-    pred = model.predict(img_array)
-    idx = np.argmax(pred)
-    confidence = float(np.max(pred))
-    return CATEGORIES[idx], confidence
-
-# Google Sheets Management Functions
-def save_detection_to_sheets(jenis_sampah, keyakinan_model, latitude, longitude):
-    try:
-        if sheet is None:
-            st.error("Google Sheets connection not available")
-            return False
-        
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        row = [timestamp, jenis_sampah, str(keyakinan_model), str(latitude), str(longitude)]
-        sheet.append_row(row)
-        return True
-    except Exception as e:
-        st.error(f"Error saving to Google Sheets: {e}")
-        return False
-
-def get_detection_history():
-    try:
-        if sheet is None:
-            st.error("Google Sheets connection not available")
-            return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-        
-        # Get all the data from the sheet
-        data = sheet.get_all_records()
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-        
-        # If the sheet is empty (only headers), return an empty DataFrame with columns
-        if len(df) == 0:
-            return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-        
-        # Fix column names if they don't match expected names
-        if 'jenis_sampah' not in df.columns:
-            # Get the actual column names
-            actual_columns = df.columns.tolist()
-            
-            # Check if we have exactly 5 columns as expected
-            if len(actual_columns) == 5:
-                # Map the columns to expected names based on position
-                # Assuming order is: timestamp, jenis_sampah, keyakinan_model, latitude, longitude
-                expected_columns = ['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude']
-                column_mapping = {actual_columns[i]: expected_columns[i] for i in range(5)}
-                
-                # Rename the columns
-                df = df.rename(columns=column_mapping)
-        
-        # Convert column types
-        if 'keyakinan_model' in df.columns:
-            df['keyakinan_model'] = pd.to_numeric(df['keyakinan_model'], errors='coerce')
-        if 'latitude' in df.columns:
-            df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-        if 'longitude' in df.columns:
-            df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-            
-        return df
-    except Exception as e:
-        st.error(f"Error getting data from Google Sheets: {e}")
-        return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-
-# Initialize Google Sheet
-sheet = setup_google_sheets()
-
-# Load model
+    # Model dibungkus tf.function dan di-warm-up di sini, bukan saat request pertama
+    with startup.phase("model load + warm-up"):
+        model = load_classifier(settings.BACKEND, jit_compile=settings.USE_XLA,
+                                max_batch_size=settings.MAX_BATCH_SIZE, embeddings=True,
+                                fast_backend=settings.CASCADE_FAST_BACKEND,
+                                min_margin=settings.CASCADE_MIN_MARGIN,
+                                min_confidence=settings.CASCADE_MIN_CONFIDENCE)
+    startup.report()
+    return model
+
+# Model dimuat di thread latar belakang sehingga UI sudah bisa dipakai selama warm-up.
+# Thread dimulai setelah render pertama (atau saat prediksi pertama, mana yang duluan)
+# agar import tensorflow tidak berebut CPU dengan render halaman.
 @st.cache_resource
-def load_model():
-    return tf.keras.models.load_model('models/DenseNet121_trashnetmerged_best_model.h5')
-
-model = load_model()
-
-# Kategori
-CATEGORIES = ['cardboard', 'glass', 'metal', 'paper', 'plastic', 'trash']
-
-# Fungsi Prediksi
-def predict_image(img):
-    img = img.convert("RGB")
-    img = img.resize((224, 224))
-    img_array = np.array(img) / 255.0
-    img_array = img_array.reshape(1, 224, 224, 3)
-    pred = model.predict(img_array)
-    idx = np.argmax(pred)
-    confidence = float(np.max(pred))
-    return CATEGORIES[idx], confidence
-
-# Google Sheets Management Functions
-def save_detection_to_sheets(jenis_sampah, keyakinan_model, latitude, longitude):
-    try:
-        if sheet is None:
-            st.error("Google Sheets connection not available")
-            return False
-        
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        row = [timestamp, jenis_sampah, str(keyakinan_model), str(latitude), str(longitude)]
-        sheet.append_row(row)
-        return True
-    except Exception as e:
-        st.error(f"Error saving to Google Sheets: {e}")
-        return False
-
-def get_detection_history():
-    try:
-        if sheet is None:
-            st.error("Google Sheets connection not available")
-            return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-        
-        # Get all the data from the sheet
-        data = sheet.get_all_records()
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-        
-        # If the sheet is empty (only headers), return an empty DataFrame with columns
-        if len(df) == 0:
-            return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-        
-        # Fix column names if they don't match expected names
-        if 'jenis_sampah' not in df.columns:
-            # Get the actual column names
-            actual_columns = df.columns.tolist()
-            
-            # Check if we have exactly 5 columns as expected
-            if len(actual_columns) == 5:
-                # Map the columns to expected names based on position
-                # Assuming order is: timestamp, jenis_sampah, keyakinan_model, latitude, longitude
-                expected_columns = ['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude']
-                column_mapping = {actual_columns[i]: expected_columns[i] for i in range(5)}
-                
-                # Rename the columns
-                df = df.rename(columns=column_mapping)
-        
-        # Convert column types
-        if 'keyakinan_model' in df.columns:
-            df['keyakinan_model'] = pd.to_numeric(df['keyakinan_model'], errors='coerce')
-        if 'latitude' in df.columns:
-            df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-        if 'longitude' in df.columns:
-            df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-            
-        return df
-    except Exception as e:
-        st.error(f"Error getting data from Google Sheets: {e}")
-        return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
+def get_model_task():
+    return BackgroundTask(load_model, name="model-warmup", start=False)
 
-# Initialize Google Sheet
-sheet = setup_google_sheets()
+model_task = get_model_task()
 
-# Load model
+# Satu broker untuk semua sesi: request dari banyak user digabung menjadi satu batch.
+# Setiap item menghasilkan (probabilitas, fitur global-pooled) dari forward pass yang sama
 @st.cache_resource
-def load_model():
-    return tf.keras.models.load_model('models/DenseNet121_trashnetmerged_best_model.h5')
-
-model = load_model()
-
-# Kategori
-CATEGORIES = ['cardboard', 'glass', 'metal', 'paper', 'plastic', 'trash']
-
-# Fungsi Prediksi
-def predict_image(img):
-    img = img.convert("RGB")
-    img = img.resize((224, 224))
-    img_array = np.array(img) / 255.0
-    img_array = img_array.reshape(1, 224, 224, 3)
-    pred = model.predict(img_array)
-    idx = np.argmax(pred)
-    confidence = float(np.max(pred))
-    return CATEGORIES[idx], confidence
-
-# Google Sheets Management Functions
-def save_detection_to_sheets(jenis_sampah, keyakinan_model, latitude, longitude):
-    try:
-        if sheet is None:
-            st.error("Google Sheets connection not available")
-            return False
-        
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        row = [timestamp, jenis_sampah, str(keyakinan_model), str(latitude), str(longitude)]
-        sheet.append_row(row)
-        return True
-    except Exception as e:
-        st.error(f"Error saving to Google Sheets: {e}")
-        return False
+def get_inference_broker():
+    task = get_model_task()
+    return InferenceBroker(lambda batch: predict_with_embeddings(task.result(), batch),
+                           max_batch_size=settings.MAX_BATCH_SIZE,
+                           max_wait_ms=settings.MAX_WAIT_MS)
 
-def get_detection_history():
-    try:
-        if sheet is None:
-            st.error("Google Sheets connection not available")
-            return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-        
-        # Get all the data from the sheet
-        data = sheet.get_all_records()
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-        
-        # If the sheet is empty (only headers), return an empty DataFrame with columns
-        if len(df) == 0:
-            return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-        
-        # Fix column names if they don't match expected names
-        if 'jenis_sampah' not in df.columns:
-            # Get the actual column names
-            actual_columns = df.columns.tolist()
-            
-            # Check if we have exactly 5 columns as expected
-            if len(actual_columns) == 5:
-                # Map the columns to expected names based on position
-                # Assuming order is: timestamp, jenis_sampah, keyakinan_model, latitude, longitude
-                expected_columns = ['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude']
-                column_mapping = {actual_columns[i]: expected_columns[i] for i in range(5)}
-                
-                # Rename the columns
-                df = df.rename(columns=column_mapping)
-        
-        # Convert column types
-        if 'keyakinan_model' in df.columns:
-            df['keyakinan_model'] = pd.to_numeric(df['keyakinan_model'], errors='coerce')
-        if 'latitude' in df.columns:
-            df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-        if 'longitude' in df.columns:
-            df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-            
-        return df
-    except Exception as e:
-        st.error(f"Error getting data from Google Sheets: {e}")
-        return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-
-# Initialize Google Sheet
-sheet = setup_google_sheets()
-
-# Load model
+# Cache prediksi lintas sesi: gambar yang sama tidak diproses ulang oleh model
 @st.cache_resource
-def load_model():
-    return tf.keras.models.load_model('models/DenseNet121_trashnetmerged_best_model.h5')
+def get_prediction_cache():
+    return PredictionCache(settings.PREDICTION_CACHE_SIZE, settings.PREDICTION_CACHE_PATH or None)
 
-model = load_model()
+@st.cache_resource
+def get_model_version():
+    version = model_version(settings.BACKEND, fast_backend=settings.CASCADE_FAST_BACKEND)
+    if settings.BACKEND == 'cascade':
+        # Ambang eskalasi ikut menentukan hasil
+        version += f":{settings.CASCADE_MIN_MARGIN}:{settings.CASCADE_MIN_CONFIDENCE}"
+    return version
+
+# Latensi end-to-end prediksi yang menjalankan model (preprocessing + antrean broker +
+# inferensi), lintas sesi
+@st.cache_resource
+def get_request_latencies():
+    return LatencyWindow()
 
-# Kategori
-CATEGORIES = ['cardboard', 'glass', 'metal', 'paper', 'plastic', 'trash']
+# Embedding deteksi yang tersimpan, untuk "deteksi serupa" & pengecekan duplikat
+@st.cache_resource(show_spinner=False)
+def get_embedding_index():
+    return EmbeddingIndex(settings.EMBEDDING_DIM, settings.EMBEDDING_INDEX_PATH or None)
 
 # Fungsi Prediksi
-def predict_image(img):
-    img = img.convert("RGB")
-    img = img.resize((224, 224))
-    img_array = np.array(img) / 255.0
-    img_array = img_array.reshape(1, 224, 224, 3)
-    pred = model.predict(img_array)
-    idx = np.argmax(pred)
-    confidence = float(np.max(pred))
-    return CATEGORIES[idx], confidence
-
-# Google Sheets Management Functions
-def save_detection_to_sheets(jenis_sampah, keyakinan_model, latitude, longitude):
+def predict_image(img, image_bytes=None, tta=False):
+    # tta=True: rata-rata softmax dari settings.TTA_VIEWS view augmentasi (flip,
+    # crop tengah/sudut, skala) yang dikirim sebagai satu batch ke broker
+    cache = get_prediction_cache()
+    cache_key = None
+    if image_bytes is not None:
+        version = f"{get_model_version()}:tta{settings.TTA_VIEWS}" if tta else get_model_version()
+        cache_key = PredictionCache.make_key(image_bytes, version)
+        cached = cache.get(cache_key)
+        # Entri cache lama tanpa embedding diprediksi ulang sekali
+        if cached is not None and cached[2] is not None:
+            return cached
+
+    # Decode langsung dari bytes asli agar JPEG bisa didecode dengan skala DCT;
+    # buffer per thread aman dipakai ulang karena predict() menunggu hasilnya
+    start = time.perf_counter()
+    source = io.BytesIO(image_bytes) if image_bytes is not None else img
+    if tta:
+        views = load_tta_views(source, settings.TTA_VIEWS)
+        probs, features = get_inference_broker().predict_many(views)
+    else:
+        img_array = preprocess_image(source, out=thread_buffer())
+        probs, features = get_inference_broker().predict(img_array)
+    # Cascade: request dieskalasi jika (salah satu view) dijalankan model penuh
+    if settings.BACKEND == 'cascade':
+        group = 'dieskalasi' if np.isfinite(features).all(axis=-1).any() else 'jalur cepat'
+    else:
+        group = 'semua'
+    get_request_latencies().record(time.perf_counter() - start, group)
+    if tta:
+        probs, features = probs.mean(axis=0), features.mean(axis=0)
+    label, confidence = decode_predictions(probs[np.newaxis])[0]
+    embedding = project_embeddings(features[np.newaxis], settings.EMBEDDING_DIM)[0]
+    # Cascade tanpa eskalasi tidak punya fitur DenseNet121 (NaN) -> tanpa embedding
+    if not np.isfinite(embedding).all():
+        embedding = embedding[:0]
+    result = (label, confidence, embedding)
+
+    if cache_key is not None:
+        cache.put(cache_key, *result)
+    return result
+
+def find_similar_detections(embedding, k=None):
+    # Deteksi tersimpan yang embedding-nya paling mirip -> list dict, urut kemiripan
+    index = get_embedding_index()
+    if embedding is None or len(embedding) == 0 or len(index) == 0:
+        return []
+    store = get_history_store()
+    if store is None:
+        return []
     try:
-        if sheet is None:
-            st.error("Google Sheets connection not available")
-            return False
-        
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        row = [timestamp, jenis_sampah, str(keyakinan_model), str(latitude), str(longitude)]
-        sheet.append_row(row)
-        return True
+        store.refresh()
     except Exception as e:
-        st.error(f"Error saving to Google Sheets: {e}")
-        return False
-
-def get_detection_history():
+        # Tetap cari di data riwayat terakhir yang berhasil disinkronkan
+        st.warning(f"Riwayat tidak dapat disinkronkan untuk deteksi serupa: {e}")
     try:
-        if sheet is None:
-            st.error("Google Sheets connection not available")
-            return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-        
-        # Get all the data from the sheet
-        data = sheet.get_all_records()
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-        
-        # If the sheet is empty (only headers), return an empty DataFrame with columns
-        if len(df) == 0:
-            return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-        
-        # Fix column names if they don't match expected names
-        if 'jenis_sampah' not in df.columns:
-            # Get the actual column names
-            actual_columns = df.columns.tolist()
-            
-            # Check if we have exactly 5 columns as expected
-            if len(actual_columns) == 5:
-                # Map the columns to expected names based on position
-                # Assuming order is: timestamp, jenis_sampah, keyakinan_model, latitude, longitude
-                expected_columns = ['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude']
-                column_mapping = {actual_columns[i]: expected_columns[i] for i in range(5)}
-                
-                # Rename the columns
-                df = df.rename(columns=column_mapping)
-        
-        # Convert column types
-        if 'keyakinan_model' in df.columns:
-            df['keyakinan_model'] = pd.to_numeric(df['keyakinan_model'], errors='coerce')
-        if 'latitude' in df.columns:
-            df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-        if 'longitude' in df.columns:
-            df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-            
-        return df
+        results = index.search(embedding, k or settings.SIMILAR_RESULTS)
     except Exception as e:
-        st.error(f"Error getting data from Google Sheets: {e}")
-        return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-
-# Initialize Google Sheet
-sheet = setup_google_sheets()
-
-# Load model
+        st.warning(f"Deteksi serupa tidak dapat dicari: {e}")
+        return []
+    similar = []
+    for detection_id, score in results:
+        row = store.detection(detection_id)
+        if row is None:
+            continue
+        similar.append({
+            'Waktu': row['timestamp'],
+            'Jenis Sampah': row['jenis_sampah'],
+            'Keyakinan (%)': row['keyakinan_model'],
+            'Latitude': row['latitude'],
+            'Longitude': row['longitude'],
+            'Kemiripan': score,
+        })
+    return similar
+
+# Mode scene (banyak item): tile multi-skala dari satu decode, diklasifikasi
+# sebagai satu batch lewat broker. Di-cache per isi gambar + versi model agar
+# rerun (mis. klik tombol simpan) tidak menjalankan model lagi.
+@st.cache_data(max_entries=32, show_spinner=False)
+def predict_scene(image_bytes, model_version):
+    from utils.scene import load_tiles, merge_tiles, tile_boxes
+
+    boxes, levels = tile_boxes(settings.SCENE_GRIDS, settings.SCENE_OVERLAP)
+    probs, _ = get_inference_broker().predict_many(load_tiles(io.BytesIO(image_bytes), boxes))
+    return merge_tiles(probs, boxes, levels, min_confidence=settings.SCENE_MIN_CONFIDENCE)
+
+# Journal lokal: deteksi dicatat langsung, lalu dikirim ke Google Sheets secara bulk
 @st.cache_resource
-def load_model():
-    return tf.keras.models.load_model('models/DenseNet121_trashnetmerged_best_model.h5')
-
-model = load_model()
+def get_detection_journal():
+    return DetectionJournal(settings.JOURNAL_PATH)
 
-# Kategori
-CATEGORIES = ['cardboard', 'glass', 'metal', 'paper', 'plastic', 'trash']
-
-# Fungsi Prediksi
-def predict_image(img):
-    img = img.convert("RGB")
-    img = img.resize((224, 224))
-    img_array = np.array(img) / 255.0
-    img_array = img_array.reshape(1, 224, 224, 3)
-    pred = model.predict(img_array)
-    idx = np.argmax(pred)
-    confidence = float(np.max(pred))
-    return CATEGORIES[idx], confidence
+@st.cache_resource
+def get_journal_flusher():
+    sheet = setup_google_sheets()
+    if sheet is None:
+        # Baris tetap tersimpan di journal dan dikirim setelah koneksi tersedia
+        return None
+    return JournalFlusher(get_detection_journal(), sheet,
+                          interval=settings.JOURNAL_FLUSH_INTERVAL,
+                          batch_size=settings.JOURNAL_BATCH_SIZE,
+                          retention=settings.JOURNAL_RETENTION)
 
 # Google Sheets Management Functions
-def save_detection_to_sheets(jenis_sampah, keyakinan_model, latitude, longitude):
+def save_detection_to_sheets(jenis_sampah, keyakinan_model, latitude, longitude, embedding=None):
     try:
-        if sheet is None:
-            st.error("Google Sheets connection not available")
-            return False
-        
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        row = [timestamp, jenis_sampah, str(keyakinan_model), str(latitude), str(longitude)]
-        sheet.append_row(row)
+        detection_id = new_detection_id()
+        row = [timestamp, jenis_sampah, str(keyakinan_model), str(latitude), str(longitude), detection_id]
+        get_detection_journal().record(row)
+        # Embedding disimpan lokal per id_deteksi (tidak dikirim ke sheet)
+        if embedding is not None and len(embedding):
+            get_embedding_index().add([detection_id], embedding[np.newaxis])
+        flusher = get_journal_flusher()
+        if flusher is not None:
+            flusher.notify()
         return True
     except Exception as e:
-        st.error(f"Error saving to Google Sheets: {e}")
+        st.error(f"Error saving detection: {e}")
         return False
 
-def get_detection_history():
+# Riwayat deteksi di-cache di memori dan hanya baris baru yang diambil dari sheet
+@st.cache_resource
+def get_history_store():
+    from utils.history_store import HistoryStore
+
+    sheet = setup_google_sheets()
+    if sheet is None:
+        return None
+    # Pastikan flusher berjalan agar sisa journal dari proses sebelumnya ikut terkirim
+    get_journal_flusher()
+    return HistoryStore(sheet, get_detection_journal(), ttl=settings.HISTORY_TTL)
+
+def get_detection_history(force_refresh=False):
+    from utils.history_store import rows_to_frame
+
+    store = get_history_store()
+    if store is None:
+        st.error("Google Sheets connection not available")
+        return rows_to_frame([], HISTORY_COLUMNS)
     try:
-        if sheet is None:
-            st.error("Google Sheets connection not available")
-            return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-        
-        # Get all the data from the sheet
-        data = sheet.get_all_records()
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-        
-        # If the sheet is empty (only headers), return an empty DataFrame with columns
-        if len(df) == 0:
-            return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-        
-        # Fix column names if they don't match expected names
-        if 'jenis_sampah' not in df.columns:
-            # Get the actual column names
-            actual_columns = df.columns.tolist()
-            
-            # Check if we have exactly 5 columns as expected
-            if len(actual_columns) == 5:
-                # Map the columns to expected names based on position
-                # Assuming order is: timestamp, jenis_sampah, keyakinan_model, latitude, longitude
-                expected_columns = ['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude']
-                column_mapping = {actual_columns[i]: expected_columns[i] for i in range(5)}
-                
-                # Rename the columns
-                df = df.rename(columns=column_mapping)
-        
-        # Convert column types
-        if 'keyakinan_model' in df.columns:
-            df['keyakinan_model'] = pd.to_numeric(df['keyakinan_model'], errors='coerce')
-        if 'latitude' in df.columns:
-            df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-        if 'longitude' in df.columns:
-            df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-            
-        return df
+        store.refresh(force=force_refresh)
     except Exception as e:
+        # Tetap tampilkan data terakhir yang berhasil disinkronkan
         st.error(f"Error getting data from Google Sheets: {e}")
-        return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
+    return store.frame()
 
-# Initialize Google Sheet
-sheet = setup_google_sheets()
-
-# Load model
-@st.cache_resource
-def load_model():
-    return tf.keras.models.load_model('models/DenseNet121_trashnetmerged_best_model.h5')
+@st.cache_resource(show_spinner=False)
+def get_rollup_engine():
+    from utils.rollups import RollupEngine
 
-model = load_model()
+    store = get_history_store()
+    if store is None:
+        return None
+    return RollupEngine(store, snapshot_path=settings.ROLLUP_SNAPSHOT_PATH or None)
 
-# Kategori
-CATEGORIES = ['cardboard', 'glass', 'metal', 'paper', 'plastic', 'trash']
+@st.cache_resource(show_spinner=False)
+def get_map_cache():
+    # HTML peta hotspot & data layer peta riwayat (GeoJSON / PNG) yang sudah dirender,
+    # dipakai bersama antar sesi (kunci memuat data_version)
+    from utils.map_cache import MapCache
 
-# Fungsi Prediksi
-def predict_image(img):
-    img = img.convert("RGB")
-    img = img.resize((224, 224))
-    img_array = np.array(img) / 255.0
-    img_array = img_array.reshape(1, 224, 224, 3)
-    pred = model.predict(img_array)
-    idx = np.argmax(pred)
-    confidence = float(np.max(pred))
-    return CATEGORIES[idx], confidence
-
-# Google Sheets Management Functions
-def save_detection_to_sheets(jenis_sampah, keyakinan_model, latitude, longitude):
-    try:
-        if sheet is None:
-            st.error("Google Sheets connection not available")
-            return False
-        
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        row = [timestamp, jenis_sampah, str(keyakinan_model), str(latitude), str(longitude)]
-        sheet.append_row(row)
-        return True
-    except Exception as e:
-        st.error(f"Error saving to Google Sheets: {e}")
-        return False
-
-def get_detection_history():
-    try:
-        if sheet is None:
-            st.error("Google Sheets connection not available")
-            return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-        
-        # Get all the data from the sheet
-        data = sheet.get_all_records()
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-        
-        # If the sheet is empty (only headers), return an empty DataFrame with columns
-        if len(df) == 0:
-            return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-        
-        # Fix column names if they don't match expected names
-        if 'jenis_sampah' not in df.columns:
-            # Get the actual column names
-            actual_columns = df.columns.tolist()
-            
-            # Check if we have exactly 5 columns as expected
-            if len(actual_columns) == 5:
-                # Map the columns to expected names based on position
-                # Assuming order is: timestamp, jenis_sampah, keyakinan_model, latitude, longitude
-                expected_columns = ['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude']
-                column_mapping = {actual_columns[i]: expected_columns[i] for i in range(5)}
-                
-                # Rename the columns
-                df = df.rename(columns=column_mapping)
-        
-        # Convert column types
-        if 'keyakinan_model' in df.columns:
-            df['keyakinan_model'] = pd.to_numeric(df['keyakinan_model'], errors='coerce')
-        if 'latitude' in df.columns:
-            df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-        if 'longitude' in df.columns:
-            df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-            
-        return df
-    except Exception as e:
-        st.error(f"Error getting data from Google Sheets: {e}")
-        return pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
-
-# Initialize Google Sheet
-sheet = setup_google_sheets()
+    return MapCache(settings.MAP_CACHE_ENTRIES, settings.MAP_CACHE_MB * 1024 * 1024)
 
 # Halaman Utama
+_render_start = time.perf_counter()
 st.title("♻️ RecycleLens")
 st.markdown("Suggests a clear view into recyclability")
 
-# Tab Navigasi - Add new History & Map tab
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["🔍 Deteksi Sampah", "📦 Kategori Sampah", "📷 Panduan", "🧠 Tentang Kami", "🗺️ Riwayat & Peta"])
+# Instrumentasi per rerun: fase yang benar-benar dikerjakan pada rerun ini
+rerun_timer = PhaseTimer("rerun", verbose=False)
+
+def report_rerun(timer, sidebar=True):
+    if not settings.RERUN_STATS:
+        return
+    timer.report()
+    if sidebar:
+        with st.sidebar.expander("⏱️ Rerun terakhir"):
+            for name, seconds in timer.phases:
+                st.write(f"{name}: {seconds * 1000:.0f} ms")
+            # Cascade: berapa banyak gambar yang perlu model penuh
+            if settings.BACKEND == 'cascade' and model_task.ready and model_task.error is None:
+                stats = model_task.result().stats()
+                st.write(f"cascade: {stats['escalated']}/{stats['items']} dieskalasi "
+                         f"({stats['escalation_rate'] * 100:.0f}%)")
+            # Latensi end-to-end per request prediksi (tanpa cache hit)
+            for group, (n, p50, p99) in get_request_latencies().summary().items():
+                st.write(f"prediksi {group}: p50 {p50:.0f} ms, p99 {p99:.0f} ms (n={n})")
 
 # JavaScript for browser geolocation
 def get_geolocation():
@@ -633,13 +399,57 @@ def get_geolocation():
     # Return the coordinates
     return {"lat": lat, "lon": lon}
 
+def render_scene_result(image, regions, latitude, longitude):
+    import pandas as pd
+    from utils.scene import draw_regions
+
+    col1, spacer, col2 = st.columns([1, 0.1, 2])
+    with col1:
+        st.image(draw_regions(image, regions, CATEGORY_COLORS, DEFAULT_COLOR),
+                 caption="Item yang Terdeteksi", use_container_width=True)
+    with col2:
+        if not regions:
+            st.warning("Tidak ada item yang terdeteksi dengan cukup yakin. Coba foto lebih dekat atau lebih terang.")
+            return
+        item_counts = pd.Series([r['label'] for r in regions]).value_counts()
+        st.success(f"Terdeteksi **{len(regions)}** item dari **{len(item_counts)}** jenis sampah")
+        st.dataframe(pd.DataFrame({'Jenis Sampah': item_counts.index, 'Jumlah Item': item_counts.values}),
+                     use_container_width=True, hide_index=True)
+        for category in item_counts.index:
+            with st.expander(f"♻️ Cara Daur Ulang {category.capitalize()}"):
+                st.markdown(recycle_guide[category]['recycling_info'])
+
+    # Setiap item disimpan sebagai satu baris riwayat
+    if st.button("Simpan Riwayat Deteksi"):
+        if latitude is not None and longitude is not None:
+            saved = sum(save_detection_to_sheets(r['label'], r['confidence'] * 100, latitude, longitude)
+                        for r in regions)
+            if saved == len(regions):
+                st.success(f"{saved} item berhasil disimpan dan akan dikirim ke Google Sheets!")
+            else:
+                st.error(f"Gagal menyimpan {len(regions) - saved} dari {len(regions)} item.")
+        else:
+            st.error("Gagal menyimpan data. Lokasi tidak tersedia.")
+
 # Tab 1: Deteksi Sampah
-with tab1:
+def detection_page():
     st.subheader("🔍 Unggah atau Ambil Gambar Sampah")
 
+    if not model_task.ready:
+        st.info("⏳ Model sedang dipanaskan di latar belakang. Anda sudah bisa memilih gambar.")
+    elif model_task.error is not None:
+        st.error(f"Gagal memuat model: {model_task.error}")
+
     option = st.radio("Pilih metode input gambar:", ["📁 Upload File", "📷 Kamera"], horizontal=True)
+    scene_mode = st.toggle("🧺 Mode banyak item",
+                           help="Untuk foto tempat sampah berisi campuran: gambar dipecah menjadi beberapa "
+                                "bagian, setiap bagian diklasifikasi, lalu item per jenis dihitung.")
+    high_accuracy = st.toggle("🎯 Mode akurasi tinggi", disabled=scene_mode,
+                              help="Untuk foto yang ramai/sulit: gambar diklasifikasi dari beberapa variasi "
+                                   "(flip, crop, skala) sekaligus lalu hasilnya dirata-rata. Sedikit lebih lambat.")
 
     image = None 
+    image_bytes = None
     
     # Geolocation section
     st.subheader("📍 Lokasi")
@@ -653,15 +463,31 @@ with tab1:
     if option == "📁 Upload File":
         uploaded_file = st.file_uploader("Upload gambar dari perangkat", type=["jpg", "jpeg", "png"])
         if uploaded_file:
-            image = Image.open(uploaded_file)
+            image_bytes = uploaded_file.getvalue()
 
     elif option == "📷 Kamera":
         camera_image = st.camera_input("Ambil gambar dari kamera")
         if camera_image:
-            image = Image.open(camera_image)
+            image_bytes = camera_image.getvalue()
 
-    if image:
-        label, confidence = predict_image(image)
+    if image_bytes:
+        try:
+            # Dibuka lewat open_image agar gambar raksasa (bom dekompresi) ditolak
+            # dengan pesan yang sama, bukan traceback
+            image = open_image(image_bytes)
+            with st.spinner("Menganalisis gambar..." if model_task.ready else "Menunggu model siap..."):
+                with rerun_timer.phase("prediksi"):
+                    if scene_mode:
+                        regions = predict_scene(image_bytes, get_model_version())
+                    else:
+                        label, confidence, embedding = predict_image(image, image_bytes, tta=high_accuracy)
+        except ImageTooLargeError as e:
+            st.error(f"Gambar tidak dapat diproses: {e}")
+            image = None
+
+    if image and scene_mode:
+        render_scene_result(image, regions, latitude, longitude)
+    elif image:
         info = recycle_guide[label]
 
         col1, spacer, col2 = st.columns([1, 0.1, 2])
@@ -676,19 +502,35 @@ with tab1:
             st.markdown("### 🔥 Jejak Karbon")
             st.markdown(info['carbon_footprint'])
         
+        # Deteksi tersimpan yang mirip; yang sangat mirip & baru saja disimpan dianggap
+        # item yang sama dikirim ulang sehingga tidak disimpan lagi
+        with rerun_timer.phase("deteksi serupa"):
+            similar = find_similar_detections(embedding)
+        duplicate = next((d for d in similar if d['Kemiripan'] >= settings.DUPLICATE_SIMILARITY
+                          and (datetime.now() - d['Waktu']).total_seconds() <= settings.DUPLICATE_WINDOW), None)
+
         # Save detection with location
         if st.button("Simpan Riwayat Deteksi"):
-            if latitude is not None and longitude is not None:
-                success = save_detection_to_sheets(label, confidence*100, latitude, longitude)
+            if duplicate is not None:
+                st.info(f"Item ini sudah tersimpan pada {duplicate['Waktu']} "
+                        f"(kemiripan {duplicate['Kemiripan'] * 100:.0f}%), tidak disimpan ulang.")
+            elif latitude is not None and longitude is not None:
+                success = save_detection_to_sheets(label, confidence*100, latitude, longitude, embedding)
                 if success:
-                    st.success("Data deteksi berhasil disimpan ke Google Sheets!")
+                    st.success("Data deteksi berhasil disimpan dan akan dikirim ke Google Sheets!")
                 else:
-                    st.error("Gagal menyimpan data ke Google Sheets.")
+                    st.error("Gagal menyimpan data deteksi.")
             else:
                 st.error("Gagal menyimpan data. Lokasi tidak tersedia.")
 
+        if similar:
+            with st.expander(f"🔎 Deteksi serupa sebelumnya ({len(similar)})"):
+                st.dataframe(similar, use_container_width=True, hide_index=True,
+                             column_config={'Kemiripan': st.column_config.ProgressColumn(
+                                 'Kemiripan', min_value=0.0, max_value=1.0, format="%.2f")})
+
 # Tab 2: Kategori Sampah
-with tab2:
+def categories_page():
     st.subheader("📦 Kategori Sampah & Informasi Daur Ulang")
     for cat in CATEGORIES:
         col1, col2 = st.columns([1, 4])
@@ -707,10 +549,13 @@ with tab2:
 
             with st.expander("🔥 Jejak Karbon"):
                 st.markdown(info['carbon_footprint'])
+                factor = impact_factors[cat]
+                st.caption(f"Estimasi di tab Riwayat memakai {factor['co2_kg']} kg CO₂ per {factor['unit']}"
+                           + (f" (≈{factor['item_mass_kg']} kg per item)" if factor['unit'] == 'kg' else ""))
         st.divider()
 
 # Tab 3: Panduan Upload
-with tab3:
+def guide_page():
     col1, spacer,col2 = st.columns([1, 0.1, 2])
     with col1:
         st.image("assets/sample_image.png", caption="Contoh Gambar yang Baik", use_container_width=True)
@@ -719,13 +564,13 @@ with tab3:
         st.markdown("""
         Agar hasil prediksi lebih akurat:
         - Gambar terang dan tidak blur 
-        - Fokus hanya pada satu jenis sampah
+        - Fokus hanya pada satu jenis sampah (untuk foto campuran, aktifkan **Mode banyak item**)
         - Hindari latar belakang ramai
         - Pastikan benda sampah tidak terpotong
         """)  
 
 # Tab 4: Tentang Kami
-with tab4:
+def about_page():
     col1, spacer,col2 = st.columns([1, 0.1, 2])
     with col1:
         st.image("assets/sampah.jpg", caption="Ilustrasi tumpukan sampah di Indonesia", use_container_width=True)
@@ -746,19 +591,311 @@ with tab4:
         - A010YBM333 – Muhammad Nafriel Ramadhan – Universitas Indonesia 
         """)
 
+# Tabel riwayat per halaman sebagai fragment: pindah halaman/urutan hanya
+# mengambil baris halaman itu dari HistoryStore, bukan mengirim seluruh riwayat
+HISTORY_SORT_COLUMNS = {
+    'timestamp': "Waktu",
+    'keyakinan_model': "Keyakinan",
+    'jenis_sampah': "Jenis Sampah",
+}
+
+@st.fragment
+def render_history_table(filter_category):
+    from utils.history_export import EXPORT_FORMATS, export_history
+
+    store = get_history_store()
+    fragment_timer = PhaseTimer("rerun tabel", verbose=False)
+    with fragment_timer.phase("tabel riwayat"):
+        col_sort, col_order, col_size = st.columns([2, 2, 1])
+        with col_sort:
+            sort_by = st.selectbox("Urutkan berdasarkan:", list(HISTORY_SORT_COLUMNS),
+                                   format_func=HISTORY_SORT_COLUMNS.get, key="history_sort")
+        with col_order:
+            ascending = st.radio("Urutan:", ["Menurun", "Menaik"], horizontal=True,
+                                 key="history_order") == "Menaik"
+        with col_size:
+            page_sizes = sorted({25, 50, 100, 250, settings.HISTORY_PAGE_SIZE})
+            page_size = st.selectbox("Baris/halaman:", page_sizes,
+                                     index=page_sizes.index(settings.HISTORY_PAGE_SIZE), key="history_page_size")
+
+        # Kembali ke halaman 1 jika filter/urutan/ukuran halaman berubah
+        query = (filter_category, sort_by, ascending, page_size)
+        if st.session_state.get("history_table_query") != query:
+            st.session_state["history_table_query"] = query
+            st.session_state["history_page"] = 1
+            st.session_state.pop("history_export_path", None)
+
+        total = len(store.view_positions(filter_category, sort_by, ascending)[1])
+        page_count = max(1, -(-total // page_size))
+        if st.session_state.get("history_page", 1) > page_count:
+            st.session_state["history_page"] = page_count
+        page_number = st.number_input(f"Halaman (dari {page_count}):", min_value=1, max_value=page_count,
+                                      step=1, key="history_page")
+        offset = (page_number - 1) * page_size
+        page, total = store.page(offset, page_size, filter_category, sort_by, ascending)
+        st.dataframe(page, use_container_width=True, hide_index=True)
+        st.caption(f"Menampilkan baris {min(offset + 1, total)}–{offset + len(page)} dari {total}")
+
+        # Ekspor ditulis per potongan ke file di server, baru kemudian diunduh
+        col_format, col_export = st.columns([1, 3])
+        with col_format:
+            export_format = st.selectbox("Format ekspor:", list(EXPORT_FORMATS),
+                                         format_func=str.upper, key="history_export_format")
+        with col_export:
+            if st.button("📦 Siapkan file ekspor", key="history_export"):
+                with st.spinner("Menulis file ekspor..."):
+                    st.session_state["history_export_path"] = export_history(
+                        store, settings.EXPORT_DIR, export_format, filter_category, sort_by, ascending)
+            export_path = st.session_state.get("history_export_path")
+            if export_path and os.path.exists(export_path):
+                with open(export_path, 'rb') as f:
+                    st.download_button(
+                        f"⬇️ Unduh {os.path.basename(export_path)}",
+                        data=f,
+                        file_name=os.path.basename(export_path),
+                        mime=EXPORT_FORMATS[os.path.splitext(export_path)[1][1:]],
+                        key="history_download"
+                    )
+    report_rerun(fragment_timer, sidebar=False)
+
+MAP_WIDTH, MAP_HEIGHT = 800, 500
+
+# Peta riwayat sebagai fragment yang mengikuti viewport: setiap geser/zoom
+# hanya deteksi di dalam bbox yang di-query (SpatialIndex di HistoryStore)
+@st.fragment
+def render_history_map(selected_filter, focus_row, center_lat, center_lon, zoom_level):
+    import folium
+    from streamlit_folium import st_folium
+
+    fragment_timer = PhaseTimer("rerun peta", verbose=False)
+    with fragment_timer.phase("peta riwayat"):
+        # Jika pusat/zoom yang diminta berubah (mis. fokus ke deteksi lain) pakai
+        # itu; selain itu pakai viewport terakhir yang dilaporkan peta
+        requested_view = (float(center_lat), float(center_lon), zoom_level)
+        map_state = st.session_state.get("history_map") or {}
+        bounds = bounds_from_leaflet(map_state.get("bounds"))
+        if st.session_state.get("history_map_view") != requested_view or bounds is None:
+            st.session_state["history_map_view"] = requested_view
+            zoom = zoom_level
+            bounds = viewport_bounds(center_lat, center_lon, zoom, MAP_WIDTH, MAP_HEIGHT)
+        else:
+            zoom = map_state.get("zoom") or zoom_level
+
+        map_mode = st.radio(
+            "Mode peta:",
+            ["Titik & Cluster", "Heatmap"],
+            horizontal=True,
+            key="history_map_mode",
+            help="Heatmap menampilkan kepadatan deteksi (warna = jenis sampah dominan) dan tetap ringan untuk riwayat besar"
+        )
+        category = None if selected_filter == "Semua Jenis" else selected_filter
+        store = get_history_store()
+        cache_key = ("riwayat", store.data_version, map_mode, category, zoom,
+                     tuple(round(v, 6) for v in bounds))
+
+        def render_layer():
+            if map_mode == "Heatmap":
+                pixel_size = max(1, settings.HEATMAP_PIXEL_SIZE)
+                rollups = get_rollup_engine().snapshot()
+                grid = viewport_density(
+                    store,
+                    rollups,
+                    bounds,
+                    zoom,
+                    category,
+                    shape=(MAP_HEIGHT // pixel_size, MAP_WIDTH // pixel_size),
+                    pixel_size=pixel_size,
+                    max_points=settings.MAP_VIEWPORT_POINTS
+                )
+                return density_image(grid, rollups.cells.categories)
+            clusters, categories, details = viewport_clusters(
+                store,
+                get_rollup_engine().snapshot(),
+                bounds,
+                zoom,
+                category,
+                max_features=settings.MAP_MAX_FEATURES,
+                max_points=settings.MAP_VIEWPORT_POINTS
+            )
+            return detection_geojson(clusters, categories, details)
+
+        # Viewport yang sama (data, filter, zoom tidak berubah) memakai data layer
+        # (GeoJSON / PNG heatmap) dari cache tanpa query & clustering lagi; layer
+        # folium-nya dibangun ulang dari data itu lewat API publik folium
+        data = get_map_cache().get_or_render(cache_key, render_layer)
+        if map_mode == "Heatmap":
+            layer = heatmap_layer(data, bounds, focus_row)
+        else:
+            layer = detection_layer(data, focus_row)
+        m = folium.Map(location=[center_lat, center_lon], zoom_start=zoom_level, tiles="OpenStreetMap")
+        st_folium(
+            m,
+            key="history_map",
+            width=MAP_WIDTH,
+            height=MAP_HEIGHT,
+            center=(center_lat, center_lon),
+            zoom=zoom_level,
+            feature_group_to_add=layer,
+            returned_objects=["bounds", "zoom"]
+        )
+    report_rerun(fragment_timer, sidebar=False)
+
+# Analisis spasial sebagai fragment: menggeser slider resolusi hanya merender
+# ulang bagian ini, bukan peta riwayat & chart di atasnya
+@st.fragment
+def render_hotspot_section(rollups, selected_filter, center_lat, center_lon):
+    import folium
+    from utils.hotspots import cell_size_m
+
+    fragment_timer = PhaseTimer("rerun hotspot", verbose=False)
+    with fragment_timer.phase("hotspot"):
+        # 2. ANALISIS SPASIAL (POLA LOKASI SAMPAH)
+        st.subheader("Analisis Spasial (Pola Lokasi Sampah)")
+        st.write("""
+        Analisis ini menunjukkan distribusi geografis dari berbagai jenis sampah,
+        membantu mengidentifikasi area atau "hotspot" dengan konsentrasi jenis sampah tertentu.
+        """)
+
+        # Grid hotspot = tile Web Mercator pada level terpilih; indeks diperbarui
+        # inkremental setiap ada deteksi baru, tidak dihitung ulang dari semua baris
+        level_options = list(range(16, 23))
+        hotspot_level = st.select_slider(
+            "Resolusi grid hotspot:",
+            options=level_options,
+            value=min(max(settings.HOTSPOT_LEVEL, level_options[0]), level_options[-1]),
+            format_func=lambda level: f"~{cell_size_m(level, center_lat):.0f} m"
+        )
+        hotspot_index = rollups.hotspot_cells(hotspot_level)
+        hotspot_category = None if selected_filter == "Semua Jenis" else selected_filter
+        dominant_waste = hotspot_index.hotspots(hotspot_category)
+
+        if len(dominant_waste) > 0:
+            try:
+                # Create a map showing the dominant waste type in each area
+                st.write("#### Peta Hotspot Sampah")
+                st.write("Peta ini menunjukkan area dengan konsentrasi jenis sampah tertentu. Lingkaran lebih besar menunjukkan jumlah yang lebih tinggi.")
+
+                def render_hotspot_map():
+                    hotspot_map = folium.Map(location=[center_lat, center_lon], zoom_start=15,
+                                           tiles="CartoDB positron")
+
+                    # Add markers for hotspots (hanya sel terpadat agar ukuran peta tetap terbatas)
+                    for row in dominant_waste.head(settings.MAP_MAX_FEATURES).itertuples():
+                        # Get color for this waste type
+                        color = CATEGORY_COLORS.get(row.jenis_sampah, DEFAULT_COLOR)
+
+                        # Add circle marker sized by count
+                        folium.CircleMarker(
+                            location=[row.latitude, row.longitude],
+                            radius=min(5 + (row.count * 2), 30),  # Base size + adjustment for count
+                            popup=f"""
+                            <div style="width:200px">
+                                <h4>Hotspot Sampah</h4>
+                                <p><b>Jenis dominan:</b> {row.jenis_sampah.capitalize()}</p>
+                                <p><b>Jumlah:</b> {row.count} dari {row.total} item</p>
+                                <p><b>Lokasi:</b> {row.latitude:.6f}, {row.longitude:.6f}</p>
+                            </div>
+                            """,
+                            tooltip=f"{row.jenis_sampah.capitalize()}: {row.count} item",
+                            color=color,
+                            fill=True,
+                            fill_color=color,
+                            fill_opacity=0.6,
+                            weight=2
+                        ).add_to(hotspot_map)
+
+                    # Add layer control and other map elements
+                    folium.LayerControl().add_to(hotspot_map)
+                    return folium.Figure().add_child(hotspot_map).render()
+
+                # Display the hotspot map (HTML di-cache per versi data, filter, resolusi & pusat peta)
+                hotspot_key = ("hotspot", get_history_store().data_version, hotspot_category, hotspot_level,
+                               float(center_lat), float(center_lon))
+                components.html(get_map_cache().get_or_render(hotspot_key, render_hotspot_map),
+                                width=800, height=510)
+
+                # Display results in a table
+                st.write("#### Tabel Hotspot Jenis Sampah")
+                hotspot_table = dominant_waste[['latitude', 'longitude', 'jenis_sampah', 'count', 'total']].copy()
+                hotspot_table.columns = ['Latitude', 'Longitude', 'Jenis Sampah Dominan', 'Jumlah', 'Total Deteksi']
+                st.dataframe(hotspot_table, use_container_width=True)
+
+                # Generate insights from the data
+                if len(hotspot_table) > 1:
+                    # Find the location with highest concentration (tabel sudah urut dari terbanyak)
+                    max_loc = hotspot_table.iloc[0]
+                    st.info(f"""
+                    📌 **Insight:** Konsentrasi sampah tertinggi ditemukan di sekitar koordinat 
+                    **{max_loc['Latitude']:.6f}, {max_loc['Longitude']:.6f}** dengan **{max_loc['Jumlah']}** item 
+                    sampah jenis **{max_loc['Jenis Sampah Dominan']}**.
+                    """)
+
+                # Check if there are different waste types in different areas
+                waste_variety = hotspot_table['Jenis Sampah Dominan'].nunique()
+                if waste_variety > 1:
+                    st.success(f"""
+                    🔍 **Pola Spasial Terdeteksi:** Terdeteksi **{waste_variety}** jenis sampah dominan
+                    di area yang berbeda. Hal ini menunjukkan adanya pola distribusi spasial yang spesifik
+                    untuk jenis sampah tertentu.
+                    """)
+            except Exception as e:
+                st.warning(f"Tidak dapat menghitung hotspot: {e}")
+        else:
+            st.warning("Belum cukup data untuk analisis hotspot. Diperlukan lebih banyak titik data.")
+    report_rerun(fragment_timer, sidebar=False)
+
+# Estimasi CO2 sebagai fragment: mengganti periode hanya menghitung ulang bagian ini
+@st.fragment
+def render_carbon_section(history_data, rollups):
+    import plotly.express as px
+    from utils.carbon import PERIODS, co2_by_cell, co2_saved
+
+    st.subheader("Estimasi CO₂ yang Dihemat")
+    st.write("""
+    Perkiraan emisi CO₂ yang dapat dihindari jika sampah yang terdeteksi didaur ulang,
+    berdasarkan faktor per jenis sampah pada tab Kategori Sampah (asumsi satu item per deteksi).
+    """)
+    freq = st.radio("Periode:", list(PERIODS), format_func=PERIODS.get, horizontal=True, key="carbon_period")
+    # Satu pass vektor atas kode kategori & periode, bukan apply per baris
+    total_co2, co2_by_category, co2_by_period = co2_saved(history_data, freq)
+    st.metric("Total CO₂ dihemat", f"{total_co2:,.1f} kg", help=f"Dari {len(history_data):,} deteksi")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        fig = px.bar(co2_by_category, x='Jenis Sampah', y='CO2 (kg)', color='Jenis Sampah',
+                     title='CO₂ Dihemat per Jenis', template='plotly_white',
+                     color_discrete_map=CATEGORY_COLORS)
+        st.plotly_chart(fig, use_container_width=True)
+    with col2:
+        if not co2_by_period.empty:
+            fig = px.line(co2_by_period, x='Periode', y='CO2 (kg)', markers=True,
+                          title=f'CO₂ Dihemat ({PERIODS[freq]})', template='plotly_white')
+            st.plotly_chart(fig, use_container_width=True)
+
+    # Per wilayah dari sel hotspot rollup (jumlah per sel x faktor), tanpa membaca baris riwayat
+    co2_regions = co2_by_cell(rollups.hotspot_cells(settings.CARBON_REGION_LEVEL), limit=10)
+    if not co2_regions.empty:
+        st.write("#### Wilayah dengan CO₂ Dihemat Terbanyak")
+        st.dataframe(co2_regions, use_container_width=True)
+
 # Tab 5: History & Map - dengan fitur filter dan fokus
-with tab5:
+def history_page():
+    import plotly.express as px
+
     st.subheader("🗺️ Riwayat Deteksi & Peta Sebaran Sampah")
+
+    refresh_history = st.button("🔄 Muat ulang riwayat", help="Ambil data terbaru dari Google Sheets sekarang")
     
     # Get history data
-    history_data = get_detection_history()
+    with rerun_timer.phase("sinkron riwayat"):
+        history_data = get_detection_history(force_refresh=refresh_history)
     
     # Debug information about columns
     if not history_data.empty:
         st.sidebar.write("Debug: Actual columns in DataFrame:", history_data.columns.tolist())
     
-    # Initialize valid_locations as empty DataFrame to avoid reference errors
-    valid_locations = pd.DataFrame(columns=['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude'])
+    # Initialize located_center to avoid reference errors
+    located_center = None
     
     # Display data table
     if not history_data.empty:
@@ -778,136 +915,80 @@ with tab5:
         
         # Add filter option at the top - with safety checks
         if 'jenis_sampah' in history_data.columns:
-            all_waste_types = history_data['jenis_sampah'].unique().tolist()
+            # Daftar jenis dari indeks kategori HistoryStore, bukan unique() atas seluruh frame
+            store = get_history_store()
+            all_waste_types = store.categories()
             filter_options = ["Semua Jenis"] + [type.capitalize() for type in all_waste_types]
             
+            # Filter aktif disimpan di ?filter=<jenis> (diisi selectbox & tombol legenda di bawah peta)
+            query_filter = st.query_params.get("filter", "").capitalize()
+            st.session_state["history_filter"] = query_filter if query_filter in filter_options else "Semua Jenis"
+
+            def sync_filter_param():
+                if st.session_state["history_filter"] == "Semua Jenis":
+                    st.query_params.pop("filter", None)
+                else:
+                    st.query_params["filter"] = st.session_state["history_filter"].lower()
+
             col1, col2 = st.columns([3, 1])
             with col1:
-                selected_filter = st.selectbox("Filter berdasarkan jenis sampah:", filter_options)
+                selected_filter = st.selectbox("Filter berdasarkan jenis sampah:", filter_options,
+                                               key="history_filter", on_change=sync_filter_param)
+            filter_category = None if selected_filter == "Semua Jenis" else selected_filter.lower()
             
-            # Filter the data if needed
-            if selected_filter != "Semua Jenis":
-                filtered_data = history_data[history_data['jenis_sampah'].str.lower() == selected_filter.lower()]
-                st.dataframe(filtered_data, use_container_width=True)
-            else:
-                filtered_data = history_data
-                st.dataframe(filtered_data, use_container_width=True)
+            # Tabel per halaman; filter & urutan dikerjakan di HistoryStore (indeks jenis)
+            render_history_table(filter_category)
             
             # Create map visualization
             st.subheader("🗺️ Peta Sebaran Deteksi Sampah")
             
-            # Exclude 0,0 coordinates (invalid data points)
-            valid_locations = filtered_data[(filtered_data['latitude'] != 0) | (filtered_data['longitude'] != 0)]
-            valid_locations = valid_locations.dropna(subset=['latitude', 'longitude'])
+            # Exclude 0,0 coordinates (invalid data points); rata-rata dihitung dari posisi di indeks
+            located_center = store.located_center(filter_category)
             
             # Add option to focus on a specific detection
-            if not valid_locations.empty:
+            if located_center is not None:
                 # Create a selection widget for focusing on specific entries
                 with col2:
-                    if "focus_index" not in st.session_state:
-                        st.session_state["focus_index"] = 0
-                    
-                    timestamps = ["Otomatis"] + valid_locations['timestamp'].tolist()
-                    selected_timestamp = st.selectbox(
+                    # Pilihan dibatasi ke deteksi terbaru agar ukuran widget tidak ikut membesar;
+                    # nilai yang dipilih adalah id_deteksi (timestamp bisa sama untuk dua deteksi)
+                    recent_locations = store.located_frame(filter_category, limit=settings.MAP_FOCUS_OPTIONS)
+                    focus_labels = dict(zip(recent_locations[ID_COLUMN], recent_locations['timestamp']))
+                    focus_options = ["Otomatis"] + recent_locations[ID_COLUMN].tolist()[::-1]
+                    if st.session_state.get("focus_id") not in focus_labels:
+                        st.session_state["focus_id"] = "Otomatis"
+                    selected_id = st.selectbox(
                         "Fokus ke lokasi:",
-                        timestamps,
-                        index=st.session_state["focus_index"]
+                        focus_options,
+                        key="focus_id",
+                        format_func=lambda detection_id: str(focus_labels.get(detection_id, detection_id))
                     )
-                    
-                    # Update session state when selection changes
-                    focus_index = timestamps.index(selected_timestamp)
-                    st.session_state["focus_index"] = focus_index
                 
                 # Determine map center and zoom based on selection
-                if selected_timestamp != "Otomatis" and focus_index > 0:
-                    # Focus on selected detection
-                    focus_row = valid_locations[valid_locations['timestamp'] == selected_timestamp].iloc[0]
-                    center_lat = focus_row['latitude']
-                    center_lon = focus_row['longitude']
+                focus_row = None
+                if selected_id != "Otomatis":
+                    # Focus on selected detection (lookup lewat indeks id_deteksi)
+                    focus_row = store.detection(selected_id)
+                if focus_row is not None:
+                    center_lat = float(focus_row['latitude'])
+                    center_lon = float(focus_row['longitude'])
                     zoom_level = 18  # Closer zoom when focusing on a specific point
                 else:
                     # Center map on average coordinates
-                    center_lat = valid_locations['latitude'].mean()
-                    center_lon = valid_locations['longitude'].mean()
+                    center_lat, center_lon = located_center
                     zoom_level = 15  # Default zoom for overview
                 
-                # Create map with proper zoom level
-                m = folium.Map(location=[center_lat, center_lon], zoom_start=zoom_level, 
-                              tiles="OpenStreetMap")
-                
-                # Add markers for each detection with custom colors and popups
-                colors = {
-                    'cardboard': 'orange', 
-                    'glass': 'blue', 
-                    'metal': 'gray',
-                    'paper': 'green', 
-                    'plastic': 'red', 
-                    'trash': 'black'
-                }
-                
-                # Add markers loop with highlighted focus marker
-                for idx, row in valid_locations.iterrows():
-                    # Get color based on waste type or default to darkblue
-                    color = colors.get(str(row['jenis_sampah']).lower(), 'darkblue')
-                    
-                    # Format confidence to 2 decimal places
-                    confidence = float(row['keyakinan_model'])
-                    
-                    # Create detailed popup content
-                    popup_html = f"""
-                    <div style="width:200px">
-                        <h4 style="color:{color}">{str(row['jenis_sampah']).capitalize()}</h4>
-                        <p><b>Keyakinan:</b> {confidence:.2f}%</p>
-                        <p><b>Waktu:</b> {row['timestamp']}</p>
-                        <p><b>Koordinat:</b> {row['latitude']:.6f}, {row['longitude']:.6f}</p>
-                    </div>
-                    """
-                    
-                    # Check if this is the focused marker
-                    is_focused = (selected_timestamp != "Otomatis" and row['timestamp'] == selected_timestamp)
-                    
-                    # Use a larger, different icon for the focused marker
-                    if is_focused:
-                        icon = folium.Icon(
-                            color=color,
-                            icon='star',
-                            prefix='fa',
-                            icon_color='yellow'
-                        )
-                        # Add a circle to highlight the focused marker
-                        folium.Circle(
-                            location=[row['latitude'], row['longitude']],
-                            radius=20,  # meters
-                            color=color,
-                            fill=True,
-                            fill_opacity=0.3
-                        ).add_to(m)
-                    else:
-                        icon = folium.Icon(
-                            color=color, 
-                            icon='trash', 
-                            prefix='fa'
-                        )
-                    
-                    # Add marker with tooltip and popup
-                    folium.Marker(
-                        location=[row['latitude'], row['longitude']],
-                        popup=folium.Popup(popup_html, max_width=300),
-                        tooltip=f"{str(row['jenis_sampah']).capitalize()} ({confidence:.1f}%)",
-                        icon=icon
-                    ).add_to(m)
-                
-                # Display the map
-                folium_static(m, width=800, height=500)
+                # Peta hanya memuat deteksi di viewport yang sedang dilihat (fragment:
+                # geser/zoom peta tidak menjalankan ulang bagian lain halaman)
+                render_history_map(selected_filter, focus_row, center_lat, center_lon, zoom_level)
                 
                 # Display legend with interactive filtering capabilities
                 st.subheader("Keterangan Warna & Filter")
                 
                 # Create legend as clickable buttons
-                legend_cols = st.columns(len(colors))
+                legend_cols = st.columns(len(CATEGORY_COLORS))
                 
                 # In the legend section of Tab 5, update the filter buttons code
-                for i, (waste_type, color) in enumerate(colors.items()):
+                for i, (waste_type, color) in enumerate(CATEGORY_COLORS.items()):
                     with legend_cols[i]:
                         # Create a button-like element for each waste type
                         if st.button(
@@ -937,7 +1018,7 @@ with tab5:
             st.info("Belum ada data deteksi sampah. Silahkan lakukan deteksi pada tab 'Deteksi Sampah' terlebih dahulu.")
         
         # Add new analytics section
-        if not valid_locations.empty:
+        if located_center is not None:
             # New Analytics Section
             st.header("📊 Analisis Data Sampah")
             
@@ -948,134 +1029,81 @@ with tab5:
             yang telah terdeteksi, sehingga dapat diketahui jenis sampah apa yang paling dominan.
             """)
             
-            # Count frequency of each waste type
-            waste_counts = history_data['jenis_sampah'].value_counts().reset_index()
-            waste_counts.columns = ['Jenis Sampah', 'Jumlah']
+            # Jumlah per jenis dari rollup (diperbarui inkremental, tidak menghitung ulang semua baris)
+            with rerun_timer.phase("analitik"):
+                rollups = get_rollup_engine().snapshot()
+                waste_counts = rollups.class_counts()
             
-            # Calculate percentages
-            total = waste_counts['Jumlah'].sum()
-            waste_counts['Persentase'] = (waste_counts['Jumlah'] / total * 100).round(2)
+                # Calculate percentages
+                total = waste_counts['Jumlah'].sum()
+                waste_counts['Persentase'] = (waste_counts['Jumlah'] / total * 100).round(2)
             
-            col1, col2 = st.columns([3, 2])
+                col1, col2 = st.columns([3, 2])
             
-            with col1:
-                # Create bar chart with plotly
-                fig = px.bar(
-                    waste_counts, 
-                    x='Jenis Sampah', 
-                    y='Jumlah',
-                    text='Persentase',
-                    color='Jenis Sampah',
-                    labels={'Jumlah': 'Frekuensi', 'Jenis Sampah': 'Kategori Sampah'},
-                    title='Distribusi Jenis Sampah',
-                    template='plotly_white',
-                    color_discrete_map={
-                        'cardboard': 'orange',
-                        'glass': 'blue',
-                        'metal': 'gray',
-                        'paper': 'green',
-                        'plastic': 'red',
-                        'trash': 'black'
-                    }
-                )
-                fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
-                st.plotly_chart(fig, use_container_width=True)
+                with col1:
+                    # Create bar chart with plotly
+                    fig = px.bar(
+                        waste_counts, 
+                        x='Jenis Sampah', 
+                        y='Jumlah',
+                        text='Persentase',
+                        color='Jenis Sampah',
+                        labels={'Jumlah': 'Frekuensi', 'Jenis Sampah': 'Kategori Sampah'},
+                        title='Distribusi Jenis Sampah',
+                        template='plotly_white',
+                        color_discrete_map=CATEGORY_COLORS
+                    )
+                    fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
+                    st.plotly_chart(fig, use_container_width=True)
             
-            with col2:
-                # Show data table
-                st.write("#### Data Distribusi:")
-                st.dataframe(waste_counts, use_container_width=True)
+                with col2:
+                    # Show data table
+                    st.write("#### Data Distribusi:")
+                    st.dataframe(waste_counts, use_container_width=True)
                 
-                # Show insights
-                most_common = waste_counts.iloc[0]['Jenis Sampah']
-                most_common_pct = waste_counts.iloc[0]['Persentase']
-                st.info(f"📌 **Insight:** Sampah jenis **{most_common}** adalah yang paling sering ditemukan, mewakili **{most_common_pct:.1f}%** dari semua deteksi.")
-            
-            # 2. ANALISIS SPASIAL (POLA LOKASI SAMPAH)
-            st.subheader("Analisis Spasial (Pola Lokasi Sampah)")
-            st.write("""
-            Analisis ini menunjukkan distribusi geografis dari berbagai jenis sampah,
-            membantu mengidentifikasi area atau "hotspot" dengan konsentrasi jenis sampah tertentu.
-            """)
-            
-            # Group by location grid (round to 4 decimal places for grouping nearby points)
-            valid_locations['lat_grid'] = np.round(valid_locations['latitude'], 4)
-            valid_locations['lon_grid'] = np.round(valid_locations['longitude'], 4)
+                    # Show insights
+                    most_common = waste_counts.iloc[0]['Jenis Sampah']
+                    most_common_pct = waste_counts.iloc[0]['Persentase']
+                    st.info(f"📌 **Insight:** Sampah jenis **{most_common}** adalah yang paling sering ditemukan, mewakili **{most_common_pct:.1f}%** dari semua deteksi.")
             
-            # Count waste types in each grid cell
-            grid_counts = valid_locations.groupby(['lat_grid', 'lon_grid', 'jenis_sampah']).size().reset_index(name='count')
+                # Tren waktu dari rollup per (tanggal, jam)
+                daily_counts = rollups.daily_counts()
+                if not daily_counts.empty:
+                    st.write("#### Tren Waktu Deteksi")
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        fig = px.line(daily_counts, x='Tanggal', y='Jumlah', markers=True,
+                                      title='Deteksi per Hari', template='plotly_white')
+                        st.plotly_chart(fig, use_container_width=True)
+                    with col2:
+                        fig = px.bar(rollups.hourly_counts(), x='Jam', y='Jumlah',
+                                     title='Deteksi per Jam', template='plotly_white')
+                        st.plotly_chart(fig, use_container_width=True)
             
-            if len(grid_counts) > 0:
-                # Find dominant waste type in each grid cell
-                try:
-                    dominant_waste = grid_counts.loc[grid_counts.groupby(['lat_grid', 'lon_grid'])['count'].idxmax()]
-                
-                    # Create a map showing the dominant waste type in each area
-                    st.write("#### Peta Hotspot Sampah")
-                    st.write("Peta ini menunjukkan area dengan konsentrasi jenis sampah tertentu. Lingkaran lebih besar menunjukkan jumlah yang lebih tinggi.")
-                    
-                    hotspot_map = folium.Map(location=[center_lat, center_lon], zoom_start=15,
-                                           tiles="CartoDB positron")
-                    
-                    # Add markers for hotspots
-                    for idx, row in dominant_waste.iterrows():
-                        # Get color for this waste type
-                        color = colors.get(str(row['jenis_sampah']).lower(), 'darkblue')
-                        
-                        # Add circle marker sized by count
-                        folium.CircleMarker(
-                            location=[row['lat_grid'], row['lon_grid']],
-                            radius=5 + (row['count'] * 2),  # Base size + adjustment for count
-                            popup=f"""
-                            <div style="width:200px">
-                                <h4>Hotspot Sampah</h4>
-                                <p><b>Jenis dominan:</b> {row['jenis_sampah'].capitalize()}</p>
-                                <p><b>Jumlah:</b> {row['count']} item</p>
-                                <p><b>Lokasi:</b> {row['lat_grid']:.6f}, {row['lon_grid']:.6f}</p>
-                            </div>
-                            """,
-                            tooltip=f"{row['jenis_sampah'].capitalize()}: {row['count']} item",
-                            color=color,
-                            fill=True,
-                            fill_color=color,
-                            fill_opacity=0.6,
-                            weight=2
-                        ).add_to(hotspot_map)
-                    
-                    # Add layer control and other map elements
-                    folium.LayerControl().add_to(hotspot_map)
-                    
-                    # Display the hotspot map
-                    folium_static(hotspot_map, width=800, height=500)
-                    
-                    # Display results in a table
-                    st.write("#### Tabel Hotspot Jenis Sampah")
-                    hotspot_table = dominant_waste.copy()
-                    hotspot_table.columns = ['Latitude', 'Longitude', 'Jenis Sampah Dominan', 'Jumlah']
-                    st.dataframe(hotspot_table, use_container_width=True)
-                    
-                    # Generate insights from the data
-                    if len(hotspot_table) > 1:
-                        # Find the location with highest concentration
-                        max_loc = hotspot_table.loc[hotspot_table['Jumlah'].idxmax()]
-                        st.info(f"""
-                        📌 **Insight:** Konsentrasi sampah tertinggi ditemukan di sekitar koordinat 
-                        **{max_loc['Latitude']:.6f}, {max_loc['Longitude']:.6f}** dengan **{max_loc['Jumlah']}** item 
-                        sampah jenis **{max_loc['Jenis Sampah Dominan']}**.
-                        """)
-                    
-                    # Check if there are different waste types in different areas
-                    waste_variety = hotspot_table['Jenis Sampah Dominan'].nunique()
-                    if waste_variety > 1:
-                        st.success(f"""
-                        🔍 **Pola Spasial Terdeteksi:** Terdeteksi **{waste_variety}** jenis sampah dominan
-                        di area yang berbeda. Hal ini menunjukkan adanya pola distribusi spasial yang spesifik
-                        untuk jenis sampah tertentu.
-                        """)
-                except Exception as e:
-                    st.warning(f"Tidak dapat menghitung hotspot: {e}")
-            else:
-                st.warning("Belum cukup data untuk analisis hotspot. Diperlukan lebih banyak titik data.")
-
-
-
+            with rerun_timer.phase("estimasi co2"):
+                render_carbon_section(history_data, rollups)
+            render_hotspot_section(rollups, selected_filter, center_lat, center_lon)
+
+# Navigasi halaman: hanya halaman yang aktif yang dijalankan setiap rerun
+# (st.tabs menjalankan isi kelima tab sekaligus)
+pages = [
+    st.Page(detection_page, title="Deteksi Sampah", icon="🔍", url_path="deteksi", default=True),
+    st.Page(categories_page, title="Kategori Sampah", icon="📦", url_path="kategori"),
+    st.Page(guide_page, title="Panduan", icon="📷", url_path="panduan"),
+    st.Page(about_page, title="Tentang Kami", icon="🧠", url_path="tentang"),
+    st.Page(history_page, title="Riwayat & Peta", icon="🗺️", url_path="riwayat"),
+]
+current_page = st.navigation(pages, position="hidden")
+for nav_col, page in zip(st.columns(len(pages)), pages):
+    nav_col.page_link(page)
+
+with rerun_timer.phase(f"halaman {current_page.title}"):
+    current_page.run()
+rerun_timer.record("total", time.perf_counter() - _render_start)
+report_rerun(rerun_timer)
+
+if is_first_run:
+    startup.record("first render", time.perf_counter() - _render_start)
+    startup.report()
+
+model_task.start()
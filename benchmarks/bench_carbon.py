@@ -0,0 +1,52 @@
+# Estimasi CO2 dihemat: faktor per baris via map + groupby (pandas) vs satu
+# bincount atas (periode, kode jenis) di utils.carbon, pada riwayat sintetis.
+#
+#   python -m benchmarks.bench_carbon --rows 1000000
+import argparse
+
+import numpy as np
+
+from benchmarks.bench_history_schema import synthetic_rows
+from benchmarks.common import summarize, time_calls
+from utils.carbon import IMPACT_TABLE, co2_by_cell, co2_saved
+from utils.history_store import rows_to_frame
+from utils.rollups import Rollups
+from utils.settings import CARBON_REGION_LEVEL
+from utils.sheets import HISTORY_COLUMNS
+
+
+def pandas_co2(frame, freq):
+    factors = dict(zip(IMPACT_TABLE['category'], IMPACT_TABLE['co2_kg_per_item']))
+    co2 = frame['jenis_sampah'].astype(str).map(factors).fillna(0.0)
+    by_category = co2.groupby(frame['jenis_sampah'], observed=True).sum()
+    by_period = co2.groupby(frame['timestamp'].dt.to_period(freq)).sum()
+    return co2.sum(), by_category, by_period
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    frame = rows_to_frame(synthetic_rows(args.rows), HISTORY_COLUMNS)
+    total, _, _ = co2_saved(frame, 'D')
+    expected, _, _ = pandas_co2(frame, 'D')
+    assert np.isclose(total, expected), (total, expected)
+    print(f"{len(frame):,} deteksi, total {total:,.1f} kg CO2\n")
+
+    for freq in ('D', 'W', 'M'):
+        summarize(f"pandas map+groupby ({freq})", time_calls(
+            lambda: pandas_co2(frame, freq), args.repeats, warmup=1))
+        summarize(f"bincount ({freq})", time_calls(
+            lambda: co2_saved(frame, freq), args.repeats, warmup=1))
+
+    rollups = Rollups()
+    rollups.add(frame)
+    cells = rollups.hotspot_cells(CARBON_REGION_LEVEL)
+    summarize(f"per wilayah ({len(cells)} sel)", time_calls(
+        lambda: co2_by_cell(cells, limit=10), args.repeats, warmup=1))
+
+
+if __name__ == '__main__':
+    main()
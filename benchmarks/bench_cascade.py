@@ -0,0 +1,66 @@
+# Cascade (model cepat dulu, DenseNet121 penuh hanya jika selisih top-1/top-2
+# kecil) vs model penuh saja: rasio eskalasi, distribusi latensi end-to-end per
+# gambar, dan kecocokan label dengan model penuh untuk beberapa ambang.
+#
+#   python -m benchmarks.bench_cascade --images "data/test/*/*.jpg" --margins 0.1 0.2 0.3
+import argparse
+import glob
+import time
+
+import numpy as np
+
+from benchmarks.common import load_benchmark_model, random_batch
+from utils.cascade import CascadeModel
+from utils.classifier import MODEL_PATH, TFLITE_MODEL_PATHS, ServingModel, load_classifier, predict_batch
+from utils.preprocessing import load_image
+
+
+def latencies(fn, images):
+    times = []
+    for image in images:
+        start = time.perf_counter()
+        fn(image[np.newaxis])
+        times.append((time.perf_counter() - start) * 1000)
+    return np.array(times)
+
+
+def report(name, times, escalation=None, agreement=None):
+    p50, p90, p99 = np.percentile(times, [50, 90, 99])
+    extra = ""
+    if escalation is not None:
+        extra = f"   eskalasi {escalation * 100:5.1f}%   cocok {agreement * 100:5.1f}%"
+    print(f"{name:<22} p50 {p50:7.1f} ms   p90 {p90:7.1f} ms   p99 {p99:7.1f} ms   mean {times.mean():7.1f} ms{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--fast', choices=list(TFLITE_MODEL_PATHS), default='tflite-int8')
+    parser.add_argument('--images', help="Pola glob gambar uji (default: gambar acak)")
+    parser.add_argument('--limit', type=int, default=200)
+    parser.add_argument('--margins', type=float, nargs='+', default=[0.1, 0.2, 0.3, 0.5])
+    args = parser.parse_args()
+
+    if args.images:
+        paths = sorted(glob.glob(args.images, recursive=True))[:args.limit]
+        images = np.stack([load_image(path) for path in paths])
+    else:
+        print("[benchmark] --images tidak diberikan, memakai gambar acak (rasio eskalasi tidak representatif)")
+        images = random_batch(args.limit)
+
+    full = ServingModel(load_benchmark_model(args.model)).warmup()
+    fast = load_classifier(args.fast)
+    reference = predict_batch(full, images).argmax(axis=1)
+    print(f"{len(images)} gambar, model cepat {args.fast}\n")
+
+    report("penuh (fp32)", latencies(lambda x: predict_batch(full, x), images))
+    report(f"cepat ({args.fast})", latencies(lambda x: predict_batch(fast, x), images))
+    for margin in args.margins:
+        cascade = CascadeModel(fast, full, min_margin=margin)
+        labels = []
+        times = latencies(lambda x: labels.append(int(predict_batch(cascade, x).argmax(axis=1)[0])), images)
+        report(f"cascade margin {margin:g}", times, cascade.escalation_rate, np.mean(np.array(labels) == reference))
+
+
+if __name__ == '__main__':
+    main()
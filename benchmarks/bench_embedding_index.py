@@ -0,0 +1,61 @@
+# Indeks embedding utils.embedding_index pada N vektor sintetis (berkelompok,
+# mirip embedding foto sampah): memori, waktu build IVF, latensi query exact
+# vs IVF, dan recall@k IVF terhadap exact.
+#
+#   python -m benchmarks.bench_embedding_index --vectors 1000000
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import summarize, time_calls
+from utils.embedding_index import EmbeddingIndex
+from utils.settings import EMBEDDING_DIM
+
+
+def synthetic_embeddings(n, dim, clusters=5000, noise=0.6, seed=0, chunk=100_000):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = np.empty((n, dim), dtype=np.float16)
+    for start in range(0, n, chunk):
+        size = min(chunk, n - start)
+        v = centers[rng.integers(0, clusters, size)] + noise * rng.standard_normal((size, dim)).astype(np.float32)
+        vectors[start:start + size] = v / np.linalg.norm(v, axis=1, keepdims=True)
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vectors', type=int, default=1_000_000)
+    parser.add_argument('--dim', type=int, default=EMBEDDING_DIM)
+    parser.add_argument('--nprobe', type=int, default=8)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.vectors + args.queries, args.dim)
+    queries, vectors = vectors[:args.queries].astype(np.float32), vectors[args.queries:]
+    ids = [f"{i:016x}" for i in range(len(vectors))]
+
+    index = EmbeddingIndex(args.dim, exact_limit=len(vectors), nprobe=args.nprobe)
+    index.add(ids, vectors)
+    start = time.perf_counter()
+    index.build()
+    print(f"{len(index):,} vektor x {args.dim} dim float16: {index.nbytes / 1e6:.0f} MB, "
+          f"build IVF {time.perf_counter() - start:.1f} s")
+
+    cycle = iter(range(10 ** 9))
+    summarize("query exact", time_calls(
+        lambda: index.search(queries[next(cycle) % len(queries)], args.k, exact=True), 10, warmup=1))
+    summarize(f"query IVF (nprobe={args.nprobe})", time_calls(
+        lambda: index.search(queries[next(cycle) % len(queries)], args.k), 100))
+
+    hits = 0
+    for query in queries:
+        exact = {i for i, _ in index.search(query, args.k, exact=True)}
+        hits += len(exact & {i for i, _ in index.search(query, args.k)})
+    print(f"recall@{args.k} IVF vs exact: {hits / (len(queries) * args.k):.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# Frame riwayat lama (kolom object, hanya 3 kolom dikonversi pd.to_numeric) vs
+# skema bertipe utils.history_store (kategorikal, float32, datetime64, id pyarrow)
+# pada riwayat sintetis: memori, waktu muat, groupby & filter.
+#
+#   python -m benchmarks.bench_history_schema --rows 1000000
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import summarize, time_calls
+from utils.classifier import CATEGORIES
+from utils.detection_index import new_detection_id
+from utils.history_store import NUMERIC_COLUMNS, TIMESTAMP_FORMAT, rows_to_frame
+from utils.sheets import HISTORY_COLUMNS
+
+
+def synthetic_rows(n, seed=0):
+    # Baris mentah seperti yang dikembalikan sheet.get(): semua kolom string
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2025-01-01T00:00:00')
+    times = (start + rng.integers(0, 180 * 86400, n).astype('timedelta64[s]')).astype(str)
+    labels = np.asarray(CATEGORIES)[rng.integers(0, len(CATEGORIES), n)]
+    confidence = rng.uniform(40, 100, n)
+    lat = -0.95 + rng.normal(0, 0.05, n)
+    lon = 100.35 + rng.normal(0, 0.05, n)
+    return [[t.replace('T', ' '), label, f"{c:.2f}", f"{a:.6f}", f"{b:.6f}", new_detection_id()]
+            for t, label, c, a, b in zip(times, labels, confidence, lat, lon)]
+
+
+def legacy_frame(rows):
+    # Salinan rows_to_frame sebelum skema bertipe
+    width = len(HISTORY_COLUMNS)
+    padded = [list(row[:width]) + [''] * (width - len(row)) for row in rows]
+    df = pd.DataFrame(padded, columns=HISTORY_COLUMNS)
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    frames = {}
+    for name, load in (("lama (object)", legacy_frame), ("bertipe", lambda r: rows_to_frame(r, HISTORY_COLUMNS))):
+        frames[name], load_ms = timed(lambda: load(rows))
+        memory_mb = frames[name].memory_usage(deep=True).sum() / 1e6
+        print(f"{name:<16} muat {load_ms:8.0f} ms   memori {memory_mb:8.1f} MB")
+
+    legacy, typed = frames["lama (object)"], frames["bertipe"]
+    print()
+    summarize("lama: jumlah per jenis", time_calls(
+        lambda: legacy['jenis_sampah'].str.lower().value_counts(), args.repeats, warmup=1))
+    summarize("bertipe: jumlah per jenis", time_calls(
+        lambda: typed['jenis_sampah'].value_counts(), args.repeats, warmup=1))
+    summarize("lama: filter jenis", time_calls(
+        lambda: legacy[legacy['jenis_sampah'].str.lower() == 'plastic'], args.repeats, warmup=1))
+    summarize("bertipe: filter jenis", time_calls(
+        lambda: typed[typed['jenis_sampah'] == 'plastic'], args.repeats, warmup=1))
+    summarize("lama: jumlah per hari", time_calls(
+        lambda: pd.to_datetime(legacy['timestamp'], format=TIMESTAMP_FORMAT).dt.date.value_counts(),
+        args.repeats, warmup=1))
+    summarize("bertipe: jumlah per hari", time_calls(
+        lambda: typed['timestamp'].dt.floor('D').value_counts(), args.repeats, warmup=1))
+    summarize("lama: mean keyakinan/jenis", time_calls(
+        lambda: legacy.groupby('jenis_sampah')['keyakinan_model'].mean(), args.repeats, warmup=1))
+    summarize("bertipe: mean keyakinan/jenis", time_calls(
+        lambda: typed.groupby('jenis_sampah', observed=True)['keyakinan_model'].mean(), args.repeats, warmup=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# Cold start per format artefak model: waktu import runtime, waktu muat,
+# panggilan pertama, dan RSS, plus throughput steady-state batch 16 (seperti
+# batch broker / view TTA / tile scene). Setiap pengukuran berjalan di proses
+# Python baru (seperti replika baru saat autoscaling). Varian .keras dibuat dari
+# --model di direktori sementara; artefak serving (SavedModel) dipakai dari
+# --artifact jika ada, jika tidak diekspor ulang. Waktu muat artefak serving
+# termasuk hash sha256 .h5 yang dijalankan loader untuk memeriksa kecocokannya.
+#
+#   python -m benchmarks.bench_model_load --runs 3
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import load_benchmark_model, random_batch, time_calls
+from utils.classifier import MODEL_PATH, SERVING_ARTIFACT_PATH
+
+VARIANTS = ['h5', 'keras', 'serving']
+
+
+def rss_mb():
+    # RSS saat ini dari /proc (Linux); selain Linux pakai puncak RSS
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(variant, path, source, batch_size=16, repeats=5):
+    # Dijalankan di proses anak; mengembalikan dict hasil pengukuran
+    start = time.perf_counter()
+    import tensorflow  # noqa: F401
+    import_ms = (time.perf_counter() - start) * 1000
+    base_rss = rss_mb()
+
+    start = time.perf_counter()
+    if variant == 'serving':
+        from utils.classifier import ServingArtifact, file_digest
+        file_digest(source)
+        model = ServingArtifact(path)
+    else:
+        from utils.classifier import load_classifier
+        model = load_classifier('keras', path=path, warmup=False, embeddings=True, prefer_artifact=False)
+    predict = model.predict_with_embeddings
+    load_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    predict(random_batch(1))
+    first_ms = (time.perf_counter() - start) * 1000
+
+    batch = random_batch(batch_size)
+    batch_ms = float(np.median(time_calls(lambda: predict(batch), repeats, warmup=1)))
+    return {
+        'import_ms': import_ms,
+        'load_ms': load_ms,
+        'first_call_ms': first_ms,
+        'batch_images_per_s': batch_size / batch_ms * 1000,
+        'model_rss_mb': rss_mb() - base_rss,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def prepare_artifacts(model_path, artifact_path, directory):
+    # -> {varian: path}; hanya memuat TensorFlow di proses induk
+    from tools.export_serving import export
+    model = load_benchmark_model(model_path)
+    paths = {'h5': model_path}
+    if not os.path.exists(model_path):
+        paths['h5'] = os.path.join(directory, 'model.h5')
+        model.save(paths['h5'])
+    paths['keras'] = os.path.join(directory, 'model.keras')
+    model.save(paths['keras'])
+    paths['serving'] = artifact_path
+    if not os.path.exists(artifact_path):
+        paths['serving'] = os.path.join(directory, 'serving')
+        export(model, paths['serving'])
+    return paths
+
+
+def run_child(variant, path, source, batch_size):
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3')
+    proc = subprocess.run([sys.executable, '-m', 'benchmarks.bench_model_load', '--child', variant, path, source,
+                           '--batch-size', str(batch_size)],
+                          capture_output=True, text=True, env=env, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--artifact', default=SERVING_ARTIFACT_PATH)
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=VARIANTS)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--child', nargs=3, metavar=('VARIANT', 'PATH', 'SOURCE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(*args.child, batch_size=args.batch_size)))
+        return
+
+    directory = tempfile.mkdtemp(prefix='recyclelens_load_')
+    try:
+        paths = prepare_artifacts(args.model, args.artifact, directory)
+        print(f"{'format':<12}{'ukuran':>9}{'import':>10}{'muat':>10}{'pertama':>10}"
+              f"{'cold start':>12}{'RSS model':>11}{'RSS puncak':>12}{f'batch {args.batch_size}':>14}"
+              f"   (median {args.runs} proses)")
+        for variant in args.variants:
+            path = paths[variant]
+            if os.path.isdir(path):
+                size = sum(os.path.getsize(os.path.join(root, name))
+                           for root, _, files in os.walk(path) for name in files)
+            else:
+                size = os.path.getsize(path)
+            runs = [run_child(variant, path, paths['h5'], args.batch_size) for _ in range(args.runs)]
+            median = {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+            cold_start = median['import_ms'] + median['load_ms'] + median['first_call_ms']
+            print(f"{variant:<12}{size / 1e6:>6.1f} MB{median['import_ms']:>7.0f} ms{median['load_ms']:>7.0f} ms"
+                  f"{median['first_call_ms']:>7.0f} ms{cold_start:>9.0f} ms{median['model_rss_mb']:>8.0f} MB"
+                  f"{median['peak_rss_mb']:>9.0f} MB{median['batch_images_per_s']:>8.1f} img/s")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
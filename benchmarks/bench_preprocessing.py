@@ -0,0 +1,128 @@
+# Preprocessing lama (decode penuh, np.array / 255.0 float64) vs utils.preprocessing
+# pada foto JPEG sintetis seukuran kamera ponsel, lalu pada foto asli (--photos,
+# default dari assets/) beserta salinan yang diperbesar (--upscale). Dengan
+# --model, top-1 kedua jalur pada foto asli juga dibandingkan.
+#
+#   python -m benchmarks.bench_preprocessing --sizes 12 48
+#   python -m benchmarks.bench_preprocessing --model models/DenseNet121_trashnetmerged_best_model.h5
+import argparse
+import io
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.common import load_benchmark_model, summarize, time_calls
+from utils.preprocessing import DECODE_HEADROOM, IMG_SIZE, load_image
+
+# Resolusi (lebar, tinggi) per megapiksel, rasio 4:3
+RESOLUTIONS = {12: (4000, 3000), 24: (5664, 4248), 48: (8000, 6000)}
+PHOTOS = ['assets/sampah.jpg', 'assets/sample_image.png']
+
+
+def legacy_preprocess(data):
+    # Salinan preprocessing asli di predict_image
+    img = Image.open(io.BytesIO(data))
+    img = img.convert("RGB")
+    img = img.resize((IMG_SIZE, IMG_SIZE))
+    img_array = np.array(img) / 255.0
+    return img_array.reshape(1, IMG_SIZE, IMG_SIZE, 3)[0]
+
+
+def synthetic_jpeg(width, height, seed=0):
+    # Gradien halus + noise ringan agar isi JPEG mirip foto, bukan bidang rata
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    base = np.empty((height, width, 3), dtype=np.float32)
+    base[..., 0] = x * 200 + 20
+    base[..., 1] = y * 180 + 40
+    base[..., 2] = (x + y) * 100 + 30
+    small_noise = rng.normal(0, 12, (height // 8, width // 8, 3)).astype(np.float32)
+    noise = np.repeat(np.repeat(small_noise, 8, axis=0), 8, axis=1)[:height, :width]
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format='JPEG', quality=90)
+    return buf.getvalue()
+
+
+def decoded_bitmap_mb(data, use_draft):
+    # Alokasi terbesar ada di C (bitmap hasil decode PIL), tidak terlihat oleh tracemalloc
+    img = Image.open(io.BytesIO(data))
+    if use_draft:
+        img.draft('RGB', (IMG_SIZE * DECODE_HEADROOM, IMG_SIZE * DECODE_HEADROOM))
+    img.load()
+    return img.width * img.height * 4 / 1e6
+
+
+def photo_variants(paths, factors):
+    # -> [(nama, bytes)]: foto apa adanya (faktor 1) dan salinan yang diperbesar
+    # (disimpan ulang sebagai JPEG, seperti foto ponsel beresolusi tinggi)
+    variants = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        for factor in factors:
+            if factor == 1:
+                variants.append((path, data))
+                continue
+            img = Image.open(io.BytesIO(data)).convert('RGB')
+            img = img.resize((img.width * factor, img.height * factor), Image.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, format='JPEG', quality=92)
+            variants.append((f"{path} x{factor}", buf.getvalue()))
+    return variants
+
+
+def compare_photos(variants, model_path, repeats):
+    legacy = np.stack([legacy_preprocess(data) for _, data in variants]).astype(np.float32)
+    fast = np.stack([load_image(data) for _, data in variants])
+    print(f"\n== Foto asli (DECODE_HEADROOM {DECODE_HEADROOM}) ==")
+    for (name, data), old, new in zip(variants, legacy, fast):
+        diff = np.abs(old - new)
+        old_ms = np.median(time_calls(lambda: legacy_preprocess(data), repeats, warmup=1))
+        new_ms = np.median(time_calls(lambda: load_image(data), repeats, warmup=1))
+        print(f"{name:<34} {Image.open(io.BytesIO(data)).size!s:>14}  selisih max {diff.max():.3f} "
+              f"rata-rata {diff.mean():.4f}   lama {old_ms:6.1f} ms  baru {new_ms:6.1f} ms")
+    if model_path:
+        model = load_benchmark_model(model_path)
+        old_probs = model.predict(legacy, verbose=0)
+        new_probs = model.predict(fast, verbose=0)
+        agreement = (old_probs.argmax(axis=1) == new_probs.argmax(axis=1)).mean()
+        print(f"top-1 sama {agreement * 100:.1f}% dari {len(variants)} gambar, "
+              f"maks |selisih prob| {np.abs(old_probs - new_probs).max():.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', nargs='+', type=int, choices=list(RESOLUTIONS), default=[12, 48])
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--photos', nargs='*', default=PHOTOS)
+    parser.add_argument('--upscale', nargs='+', type=int, default=[1, 3],
+                        help="Faktor perbesaran salinan foto (1 = apa adanya)")
+    parser.add_argument('--model', help="Model untuk membandingkan top-1 jalur lama vs baru")
+    args = parser.parse_args()
+
+    out = np.empty((IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    for mp in args.sizes:
+        width, height = RESOLUTIONS[mp]
+        data = synthetic_jpeg(width, height)
+        print(f"\n== {mp} MP JPEG ({width}x{height}, {len(data) / 1e6:.1f} MB) ==")
+
+        legacy = legacy_preprocess(data)
+        fast = load_image(data, out=out)
+        diff = np.abs(legacy - fast)
+        print(f"selisih vs lama: max {diff.max():.4f}, rata-rata {diff.mean():.5f} "
+              f"(dtype lama {legacy.dtype}, baru {fast.dtype})")
+
+        summarize("lama", time_calls(lambda: legacy_preprocess(data), args.repeats, warmup=1))
+        summarize("utils.preprocessing", time_calls(lambda: load_image(data, out=out), args.repeats, warmup=1))
+        print(f"bitmap terdecode: lama {decoded_bitmap_mb(data, False):.1f} MB, "
+              f"baru {decoded_bitmap_mb(data, True):.1f} MB; "
+              f"array output: lama {legacy.nbytes / 1e6:.2f} MB, baru {fast.nbytes / 1e6:.2f} MB")
+
+    if args.photos:
+        compare_photos(photo_variants(args.photos, args.upscale), args.model, args.repeats)
+
+
+if __name__ == '__main__':
+    main()
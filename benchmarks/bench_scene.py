@@ -0,0 +1,55 @@
+# Latensi mode scene: satu gambar (load_image + predict) vs tile multi-skala dari
+# satu decode dalam satu batch (utils.scene) vs decode ulang & predict per crop.
+#
+#   python -m benchmarks.bench_scene --grids 1 2 3
+import argparse
+import io
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.bench_preprocessing import synthetic_jpeg
+from benchmarks.common import load_benchmark_model, summarize, time_calls
+from utils.classifier import MODEL_PATH, ServingModel, predict_batch
+from utils.preprocessing import IMG_SIZE, load_image
+from utils.scene import load_tiles, merge_tiles, tile_boxes
+
+
+def naive_scene(model, photo, boxes):
+    # Tiap crop: decode penuh, crop, resize, predict sendiri-sendiri
+    probs = []
+    for box in boxes:
+        img = Image.open(io.BytesIO(photo)).convert('RGB')
+        crop = img.crop(tuple(box * [img.width, img.height, img.width, img.height]))
+        probs.append(predict_batch(model, load_image(crop)[np.newaxis])[0])
+    return np.stack(probs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--grids', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--overlap', type=float, default=0.25)
+    parser.add_argument('--repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    boxes, levels = tile_boxes(args.grids, args.overlap)
+    serving = ServingModel(load_benchmark_model(args.model), max_batch_size=len(boxes))
+    serving.warmup(batch_sizes=(1, len(boxes)))
+    photo = synthetic_jpeg(4000, 3000)
+    tiles = np.empty((len(boxes), IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+
+    single, _ = summarize("satu gambar", time_calls(
+        lambda: predict_batch(serving, load_image(photo)[np.newaxis]), args.repeats))
+    summarize(f"tile dari 1 decode ({len(boxes)} tile)", time_calls(
+        lambda: load_tiles(photo, boxes, out=tiles), args.repeats))
+    scene, _ = summarize("scene: 1 decode + 1 batch", time_calls(
+        lambda: merge_tiles(predict_batch(serving, load_tiles(photo, boxes, out=tiles)), boxes, levels),
+        args.repeats))
+    naive, _ = summarize("scene: decode & predict per crop", time_calls(
+        lambda: naive_scene(serving, photo, boxes), max(args.repeats // 3, 1), warmup=1))
+    print(f"\nscene {scene / single:.1f}x latensi satu gambar, per crop {naive / single:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
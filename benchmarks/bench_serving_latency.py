@@ -0,0 +1,34 @@
+# Latensi satu gambar: model.predict vs ServingModel (tf.function, opsional XLA)
+#
+#   python -m benchmarks.bench_serving_latency --repeats 100
+import argparse
+import time
+
+from benchmarks.common import load_benchmark_model, random_batch, summarize, time_calls
+from utils.classifier import MODEL_PATH, ServingModel
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--repeats', type=int, default=100)
+    parser.add_argument('--xla', action='store_true', help="Ikut ukur varian XLA")
+    args = parser.parse_args()
+
+    model = load_benchmark_model(args.model)
+    image = random_batch(1)
+
+    summarize("model.predict", time_calls(lambda: model.predict(image, verbose=0), args.repeats))
+
+    variants = [False, True] if args.xla else [False]
+    for jit in variants:
+        serving = ServingModel(model, jit_compile=jit, max_batch_size=1)
+        start = time.perf_counter()
+        serving.warmup()
+        name = "tf.function + XLA" if jit else "tf.function"
+        print(f"{name} warm-up: {(time.perf_counter() - start) * 1000:.0f} ms")
+        summarize(name, time_calls(lambda: serving.predict_on_batch(image), args.repeats, warmup=0))
+
+
+if __name__ == '__main__':
+    main()
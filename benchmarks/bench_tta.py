@@ -0,0 +1,46 @@
+# Latensi mode TTA terhadap jumlah augmentasi: N panggilan predict berurutan vs
+# satu forward pass batch, plus biaya membuat view dari satu decode.
+#
+#   python -m benchmarks.bench_tta --views 1 2 4 8
+import argparse
+
+import numpy as np
+
+from benchmarks.bench_preprocessing import synthetic_jpeg
+from benchmarks.common import load_benchmark_model, summarize, time_calls
+from utils.classifier import MODEL_PATH, ServingModel, predict_batch
+from utils.preprocessing import TTA_TRANSFORMS, load_tta_views
+
+
+def predict_tta(model, views):
+    # views: batch augmentasi satu gambar (N, 224, 224, 3) -> rata-rata softmax
+    # dari satu forward pass (di app lewat InferenceBroker.predict_many)
+    return predict_batch(model, views).mean(axis=0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--views', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--repeats', type=int, default=30)
+    args = parser.parse_args()
+
+    serving = ServingModel(load_benchmark_model(args.model), max_batch_size=len(TTA_TRANSFORMS))
+    serving.warmup(batch_sizes=sorted(set([1] + args.views)))
+    photo = synthetic_jpeg(4000, 3000)
+
+    base = None
+    for n in args.views:
+        views = load_tta_views(photo, n)
+        summarize(f"view TTA dari 1 decode (N={n})", time_calls(
+            lambda: load_tta_views(photo, n), args.repeats))
+        sequential, _ = summarize(f"{n} x predict berurutan", time_calls(
+            lambda: [predict_batch(serving, view[np.newaxis]) for view in views], args.repeats))
+        batched, _ = summarize(f"1 batch (N={n})", time_calls(
+            lambda: predict_tta(serving, views), args.repeats))
+        base = base or batched
+        print(f"  -> batch {batched / base:.2f}x latensi N=1, berurutan {sequential / base:.2f}x\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import os
+import time
+
+import numpy as np
+
+from utils.classifier import CATEGORIES, IMG_SIZE, MODEL_PATH
+
+
+def load_benchmark_model(path=MODEL_PATH):
+    # Pakai model terlatih jika ada. Jika tidak (mis. di CI), bangun arsitektur
+    # DenseNet121 yang sama dengan bobot acak; latensi tidak bergantung pada bobot.
+    import tensorflow as tf
+    if os.path.exists(path):
+        return tf.keras.models.load_model(path)
+    print(f"[benchmark] {path} tidak ditemukan, memakai DenseNet121 dengan bobot acak")
+    base = tf.keras.applications.DenseNet121(weights=None, include_top=False,
+                                             input_shape=(IMG_SIZE, IMG_SIZE, 3))
+    x = tf.keras.layers.GlobalAveragePooling2D()(base.output)
+    outputs = tf.keras.layers.Dense(len(CATEGORIES), activation='softmax')(x)
+    return tf.keras.Model(base.input, outputs)
+
+
+def random_batch(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.random((n, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+
+
+def time_calls(fn, repeats, warmup=3):
+    # Mengembalikan daftar latensi per panggilan dalam milidetik
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def summarize(name, times):
+    p50, p99 = np.percentile(times, [50, 99])
+    print(f"{name:<32} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms   (n={len(times)})")
+    return p50, p99
@@ -0,0 +1,31 @@
+# Import tingkat modul app.py tidak boleh memuat dependency berat: pandas,
+# tensorflow, dll. di-import saat dibutuhkan saja (lihat komentar di app.py).
+#
+#   python -m pytest tests/
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# (plotly tidak dicek: streamlit sendiri sudah meng-import-nya)
+LAZY_MODULES = ['pandas', 'pyarrow', 'tensorflow', 'folium', 'gspread']
+
+
+def app_imports():
+    # Pernyataan import di tingkat modul app.py (bukan di dalam fungsi)
+    with open(os.path.join(ROOT, 'app.py'), encoding='utf-8') as f:
+        source = f.read()
+    tree = ast.parse(source)
+    return [ast.get_source_segment(source, node) for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def test_app_imports_do_not_load_heavy_modules():
+    code = '\n'.join(app_imports() + [
+        'import sys',
+        f'print(",".join(name for name in {LAZY_MODULES!r} if name in sys.modules))',
+    ])
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    loaded = [name for name in proc.stdout.strip().split(',') if name]
+    assert loaded == []
@@ -0,0 +1,148 @@
+# Journal deteksi terhadap sheet palsu lokal (tanpa koneksi internet).
+#
+#   python -m pytest tests/
+import time
+
+import pytest
+
+from utils.detection_journal import DetectionJournal, JournalFlusher
+from utils.sheets import HISTORY_COLUMNS, LocalSheet
+
+
+def make_row(i):
+    return ['2024-01-01 10:00:00', 'plastic', '0.9', '-6.2', '106.8', f'id-{i}']
+
+
+class FlakySheet(LocalSheet):
+    # LocalSheet yang gagal pada panggilan append_rows tertentu (nomor 1-based)
+    def __init__(self, fail_calls=(), path=None):
+        super().__init__(path)
+        self.fail_calls = set(fail_calls)
+        self.calls = []
+
+    def append_rows(self, values, **kwargs):
+        self.calls.append(len(values))
+        if len(self.calls) in self.fail_calls:
+            raise RuntimeError("kuota API habis")
+        super().append_rows(values, **kwargs)
+
+
+def sheet_ids(sheet):
+    return [row[HISTORY_COLUMNS.index('id_deteksi')] for row in sheet.get_all_values()[1:]]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("kondisi tidak terpenuhi sebelum timeout")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return DetectionJournal(str(tmp_path / 'journal.sqlite'))
+
+
+def test_flush_batches_through_append_rows(journal):
+    sheet = FlakySheet()
+    for i in range(7):
+        journal.record(make_row(i))
+
+    assert journal.flush(sheet, batch_size=3) == 7
+    assert sheet.calls == [3, 3, 1]
+    assert sheet_ids(sheet) == [f'id-{i}' for i in range(7)]
+    assert journal.pending_count() == 0
+
+
+def test_flusher_retries_with_backoff(journal):
+    sheet = FlakySheet(fail_calls={1, 2})
+    for i in range(3):
+        journal.record(make_row(i))
+
+    flusher = JournalFlusher(journal, sheet, interval=0.01, batch_size=10, max_backoff=0.05)
+    try:
+        wait_for(lambda: journal.pending_count() == 0)
+    finally:
+        flusher.stop(flush=False)
+
+    assert len(sheet.calls) == 3
+    assert sheet_ids(sheet) == ['id-0', 'id-1', 'id-2']
+    assert flusher.failures == 0 and flusher.last_error is None
+
+
+def test_backoff_grows_and_is_capped(journal, monkeypatch):
+    flusher = JournalFlusher(journal, LocalSheet(), interval=1.0, max_backoff=10.0)
+    flusher.stop(flush=False)
+    monkeypatch.setattr('utils.detection_journal.random.uniform', lambda low, high: high)
+
+    assert flusher._next_delay() == 1.0
+    delays = []
+    for failures in range(1, 6):
+        flusher.failures = failures
+        delays.append(flusher._next_delay())
+    assert delays == [2.0, 4.0, 8.0, 10.0, 10.0]
+
+
+def test_unsynced_rows_survive_reopen(tmp_path):
+    path = str(tmp_path / 'journal.sqlite')
+    journal = DetectionJournal(path)
+    for i in range(4):
+        journal.record(make_row(i))
+    journal.flush(FlakySheet(), batch_size=2)
+    journal.record(make_row(4))
+    journal.record(make_row(5))
+    journal._db.close()
+
+    reopened = DetectionJournal(path)
+    assert [row[-1] for _, row in reopened.pending()] == ['id-4', 'id-5']
+
+    sheet = FlakySheet()
+    assert reopened.flush(sheet) == 2
+    assert sheet_ids(sheet) == ['id-4', 'id-5']
+
+
+def test_partial_failure_does_not_resend_sent_batches(journal):
+    sheet = FlakySheet(fail_calls={2})
+    for i in range(5):
+        journal.record(make_row(i))
+
+    with pytest.raises(RuntimeError):
+        journal.flush(sheet, batch_size=2)
+    # Batch pertama sudah terkirim dan ditandai; hanya sisanya yang pending
+    assert sheet_ids(sheet) == ['id-0', 'id-1']
+    assert journal.pending_count() == 3
+
+    assert journal.flush(sheet, batch_size=2) == 3
+    assert sheet_ids(sheet) == [f'id-{i}' for i in range(5)]
+
+
+def test_flushed_rows_are_pruned_after_retention(journal):
+    for i in range(3):
+        journal.record(make_row(i))
+    journal.flush(LocalSheet(), batch_size=2)
+    journal.record(make_row(3))
+    last_id = journal.last_id()
+
+    # Baris yang baru terkirim masih disimpan selama retention
+    assert journal.prune(time.time() - 3600.0) == 0
+    assert len(journal.unsynced(since=0)) == 4
+
+    assert journal.prune(time.time() + 1) == 3
+    assert [row[-1] for _, row in journal.unsynced(since=0)] == ['id-3']
+    assert journal.last_id() == last_id
+    journal.record(make_row(4))
+    assert journal.last_id() == last_id + 1
+
+
+def test_flusher_prunes_after_successful_flush(journal):
+    sheet = LocalSheet()
+    for i in range(3):
+        journal.record(make_row(i))
+    flusher = JournalFlusher(journal, sheet, interval=60.0, retention=0.0)
+    flusher.stop(flush=False)
+
+    journal.record(make_row(3))
+    assert flusher.flush_once() is not False
+    assert journal.unsynced(since=0) == []
+    assert len(sheet_ids(sheet)) == 4
@@ -0,0 +1,25 @@
+# Binning grid kepadatan heatmap.
+#
+#   python -m pytest tests/
+import numpy as np
+import pytest
+
+from utils.heatmap import count_grid, density_grid
+
+
+@pytest.mark.parametrize('bounds', [(-6.9, 106.2, -6.1, 107.2), (-6.9, 107.0, -6.1, 106.1)])
+def test_count_grid_matches_one_hot_density(bounds):
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(-7.0, -6.0, 5000)
+    lon = rng.uniform(106.0, 107.5, 5000)
+    codes = rng.integers(0, 7, 5000)
+
+    grid = count_grid(lat, lon, codes, 7, bounds, (25, 40))
+    assert grid.shape == (7, 25, 40)
+    assert np.array_equal(grid, density_grid(lat, lon, np.eye(7)[codes], bounds, (25, 40)))
+    assert grid.sum() > 0
+
+
+def test_count_grid_empty():
+    grid = count_grid(np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64), 3, (-1.0, -1.0, 1.0, 1.0), (4, 5))
+    assert grid.shape == (3, 4, 5) and not grid.any()
@@ -0,0 +1,37 @@
+# HistoryStore terhadap sheet lokal (tanpa koneksi internet).
+#
+#   python -m pytest tests/
+from utils.history_store import HistoryStore
+from utils.sheets import LocalSheet
+
+
+def make_row(i, label='plastic'):
+    return [f'2024-01-01 10:00:{i:02d}', label, '0.9', '-6.2', '106.8', f'id-{i}']
+
+
+def test_view_positions_survive_concurrent_refresh():
+    sheet = LocalSheet()
+    sheet.append_rows([make_row(i, 'plastic' if i % 2 else 'glass') for i in range(6)])
+    store = HistoryStore(sheet, ttl=0.0)
+    store.refresh(force=True)
+
+    # Refresh lain selesai tepat setelah frame diambil, sebelum posisi diurutkan
+    sheet.append_rows([make_row(i, 'plastic') for i in range(6, 10)])
+    pending_frame = store.pending_frame
+
+    def pending_then_refresh():
+        pending = pending_frame()
+        store.refresh(force=True)
+        return pending
+
+    store.pending_frame = pending_then_refresh
+    frame, positions = store.view_positions('plastic', sort_by='timestamp', ascending=True)
+    store.pending_frame = pending_frame
+
+    assert len(frame) == 6
+    assert frame.iloc[positions]['id_deteksi'].tolist() == ['id-1', 'id-3', 'id-5']
+
+    # View yang di-cache tidak dipakai untuk versi data yang lebih baru
+    frame, positions = store.view_positions('plastic', sort_by='timestamp', ascending=True)
+    assert len(frame) == 10
+    assert frame.iloc[positions]['id_deteksi'].tolist() == ['id-1', 'id-3', 'id-5', 'id-6', 'id-7', 'id-8', 'id-9']
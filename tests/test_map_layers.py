@@ -0,0 +1,75 @@
+# Layer peta riwayat dirender lewat st_folium (feature_group_to_add), dari data
+# layer yang di-cache (GeoJSON / PNG heatmap).
+#
+#   python -m pytest tests/
+import json
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from utils.map_engine import ClusterLevel, density_image, detection_geojson
+
+FOCUS = {'latitude': -6.2, 'longitude': 106.8, 'jenis_sampah': 'plastic', 'keyakinan_model': 91.5,
+         'timestamp': '2024-01-01 10:00:00'}
+
+
+def render_feature_group(mode, data):
+    # Jalankan st_folium di AppTest -> JS feature group yang dikirim ke komponen
+    def script():
+        import folium
+        import streamlit as st
+        from streamlit_folium import st_folium
+
+        from utils.map_engine import detection_layer, heatmap_layer
+
+        if st.session_state.mode == "Heatmap":
+            layer = heatmap_layer(st.session_state.data, (-6.3, 106.7, -6.1, 106.9), st.session_state.focus)
+        else:
+            layer = detection_layer(st.session_state.data, st.session_state.focus)
+        m = folium.Map(location=[-6.2, 106.8], zoom_start=12)
+        st_folium(m, key="history_map", width=800, height=500, feature_group_to_add=layer,
+                  returned_objects=["bounds", "zoom"])
+
+    at = AppTest.from_function(script)
+    at.session_state.mode = mode
+    at.session_state.data = data
+    at.session_state.focus = FOCUS
+    at.run(timeout=60)
+    assert not at.exception
+    [component] = at._tree.children[0].children.values()
+    return json.loads(component.proto.json_args)['feature_group']
+
+
+def test_detection_layer_renders_through_st_folium():
+    clusters = ClusterLevel(12, np.array([1, 2]), np.array([3, 1]), np.array([-6.2, -6.25]),
+                            np.array([106.8, 106.85]), np.array([[0, 0, 0, 3, 0, 0], [1, 0, 0, 0, 0, 0]]), None)
+    geojson = detection_geojson(clusters, ['cardboard', 'glass', 'metal', 'paper', 'plastic', 'trash'])
+    assert [f['properties']['n'] for f in json.loads(geojson)['features']] == [3, 1]
+
+    script = render_feature_group("Titik & Cluster", geojson)
+    assert 'L.geoJson(' in script
+    assert '"b": [["paper", ' in script
+    assert 'Math.log10(p.n)' in script
+    assert "'icon': 'star'" in script.replace('"', "'")
+    assert '.addTo(map_div)' in script
+
+
+def test_heatmap_layer_renders_through_st_folium():
+    grid = np.zeros((7, 10, 16))
+    grid[4, 3:6, 5:9] = 5
+    image = density_image(grid, ['cardboard', 'glass', 'metal', 'paper', 'plastic', 'trash', 'lainnya'])
+    assert image.startswith('data:image/png;base64,')
+
+    script = render_feature_group("Heatmap", image)
+    assert 'L.imageOverlay(' in script
+    assert image in script
+    assert '.addTo(map_div)' in script
+
+
+def test_empty_layers_render_focus_only():
+    assert detection_geojson(ClusterLevel(12, *[np.zeros(0)] * 4, np.zeros((0, 6)), None), []) == ''
+    assert density_image(np.zeros((7, 4, 4)), []) == ''
+    for mode in ("Titik & Cluster", "Heatmap"):
+        script = render_feature_group(mode, '')
+        assert 'L.geoJson(' not in script and 'L.imageOverlay(' not in script
+        assert 'L.marker(' in script
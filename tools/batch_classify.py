@@ -0,0 +1,171 @@
+# Klasifikasi gambar secara batch tanpa Streamlit.
+#
+# Contoh:
+#   python -m tools.batch_classify data/kamera/ -o hasil.csv
+#   python -m tools.batch_classify "dump/**/*.jpg" -o hasil.jsonl --batch-size 64
+#   python -m tools.batch_classify --manifest daftar_gambar.txt -o hasil.csv
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.classifier import (BACKENDS, IMG_SIZE, decode_predictions, load_classifier,
+                              predict_batch, preprocess_image)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+OUTPUT_FIELDS = ['path', 'label', 'confidence', 'error']
+
+
+def iter_image_paths(inputs, manifest=None):
+    # Input bisa berupa direktori, pola glob, atau file gambar langsung
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(root, name)
+        elif any(ch in item for ch in '*?['):
+            for path in sorted(glob.iglob(item, recursive=True)):
+                if path.lower().endswith(IMAGE_EXTENSIONS):
+                    yield path
+        else:
+            yield item
+
+    # Manifest: satu path per baris (baris kosong dan '#' diabaikan)
+    if manifest:
+        with open(manifest, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line
+
+
+def load_and_preprocess(path):
+    # Dijalankan di thread pool; decode dan resize PIL melepas GIL
+    try:
+        return path, preprocess_image(path), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def iter_batches(paths, batch_size, workers, prefetch):
+    # Decode gambar di depan model: maksimal batch_size * prefetch gambar "in flight"
+    max_in_flight = batch_size * prefetch
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        batch = []
+        for path in paths:
+            pending.append(pool.submit(load_and_preprocess, path))
+            while len(pending) >= max_in_flight:
+                batch.append(pending.popleft().result())
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+        while pending:
+            batch.append(pending.popleft().result())
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+class ResultWriter:
+    # Menulis hasil per batch langsung ke CSV atau JSONL (streaming)
+    def __init__(self, path, fmt):
+        self.fmt = fmt
+        self.file = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(self.file, fieldnames=OUTPUT_FIELDS)
+            self.writer.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if self.fmt == 'csv':
+                self.writer.writerow(row)
+            else:
+                self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+def classify_batch(model, batch):
+    # Urutan baris output mengikuti urutan input, termasuk gambar yang gagal didecode
+    rows = [{'path': path, 'label': None, 'confidence': None, 'error': err} for path, _, err in batch]
+    ok = [i for i, (_, _, err) in enumerate(batch) if err is None]
+    if ok:
+        arrays = np.empty((len(ok), IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+        for j, i in enumerate(ok):
+            arrays[j] = batch[i][1]
+        preds = decode_predictions(predict_batch(model, arrays))
+        for i, (label, confidence) in zip(ok, preds):
+            rows[i]['label'] = label
+            rows[i]['confidence'] = round(confidence, 6)
+    return rows
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"harus >= 1, bukan {value}")
+    return number
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Klasifikasi banyak gambar sampah sekaligus dengan model RecycleLens.")
+    parser.add_argument('inputs', nargs='*', help="Direktori, pola glob, atau file gambar")
+    parser.add_argument('--manifest', help="File teks berisi satu path gambar per baris")
+    parser.add_argument('-o', '--output', default='-', help="File output .csv/.jsonl (default: stdout)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="Format output (default: dari ekstensi file)")
+    parser.add_argument('--backend', choices=BACKENDS, default='keras', help="Backend inferensi")
+    parser.add_argument('--model', help="Path model (default: sesuai backend)")
+    parser.add_argument('--batch-size', type=positive_int, default=32)
+    parser.add_argument('--xla', action='store_true', help="Kompilasi model dengan XLA")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                        help="Jumlah thread untuk decode dan resize gambar")
+    parser.add_argument('--prefetch', type=positive_int, default=2,
+                        help="Jumlah batch yang didecode lebih dulu di depan model")
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.manifest:
+        parser.error("berikan minimal satu input atau --manifest")
+    if args.format is None:
+        args.format = 'jsonl' if args.output.endswith(('.jsonl', '.json')) else 'csv'
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    model = load_classifier(args.backend, path=args.model, jit_compile=args.xla,
+                            max_batch_size=args.batch_size)
+    writer = ResultWriter(args.output, args.format)
+
+    start = time.perf_counter()
+    total = failed = 0
+    try:
+        paths = iter_image_paths(args.inputs, args.manifest)
+        for batch in iter_batches(paths, args.batch_size, args.workers, args.prefetch):
+            rows = classify_batch(model, batch)
+            writer.write(rows)
+            total += len(rows)
+            failed += sum(1 for row in rows if row['error'])
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(f"Selesai: {total} gambar ({failed} gagal) dalam {elapsed:.1f} detik ({rate:.1f} gambar/detik)",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# Ekspor model Keras (.h5) sekali ke artefak serving: SavedModel dengan endpoint
+# `serve` (batch dinamis) berisi softmax + fitur global-pooled, plus metadata
+# <output>.json berisi hash .h5 sumbernya. Backend 'keras' otomatis memakai
+# artefak ini selama hash-nya cocok; hapus artefaknya untuk kembali ke .h5.
+#
+# Sebelum dipasang, prediksi artefak dibandingkan dengan model Keras; artefak
+# yang selisihnya melebihi --tolerance tidak dipasang.
+#
+# Contoh:
+#   python -m tools.export_serving
+#   python -m tools.export_serving --images data/validasi/ --num-eval 200
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from tools.batch_classify import iter_image_paths
+from tools.export_tflite import load_arrays
+from utils.classifier import (IMG_SIZE, MODEL_PATH, SERVING_ARTIFACT_PATH, ServingArtifact, ServingModel,
+                              embedding_output, file_digest, load_keras_model)
+
+
+def export(keras_model, path):
+    # SavedModel float32 (bobot persis) dengan endpoint serve: batch (N, 224, 224, 3)
+    # -> {'probabilities': (N, C), 'features': (N, D)}. Hanya bobot dan satu
+    # tf.function yang disimpan (tanpa objek Keras), jadi artefaknya lebih kecil
+    # dan lebih cepat dimuat daripada model.export()
+    import tensorflow as tf
+    serving = tf.keras.Model(keras_model.inputs, [keras_model.outputs[0], embedding_output(keras_model)])
+
+    @tf.function(input_signature=[tf.TensorSpec([None, IMG_SIZE, IMG_SIZE, 3], tf.float32)])
+    def serve(x):
+        probabilities, features = serving(x, training=False)
+        return {'probabilities': probabilities, 'features': features}
+
+    module = tf.Module()
+    module.weights = serving.weights
+    module.serve = serve
+    tf.saved_model.save(module, path, signatures={'serve': serve.get_concrete_function()})
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def predict_all_with_embeddings(model, arrays, batch_size=16):
+    outputs = [model.predict_with_embeddings(arrays[i:i + batch_size]) for i in range(0, len(arrays), batch_size)]
+    return np.concatenate([o[0] for o in outputs]), np.concatenate([o[1] for o in outputs])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ekspor model RecycleLens ke artefak serving SavedModel.")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--output', default=SERVING_ARTIFACT_PATH)
+    parser.add_argument('--images', nargs='+',
+                        help="Direktori atau pola glob gambar untuk verifikasi (default: gambar acak)")
+    parser.add_argument('--num-eval', type=int, default=64)
+    parser.add_argument('--tolerance', type=float, default=1e-3,
+                        help="Selisih probabilitas maksimum terhadap model Keras")
+    args = parser.parse_args()
+
+    if args.images:
+        evaluation = load_arrays(list(itertools.islice(iter_image_paths(args.images), args.num_eval)))
+        if len(evaluation) == 0:
+            parser.error("tidak ada gambar yang bisa dibaca untuk verifikasi")
+    else:
+        rng = np.random.default_rng(0)
+        evaluation = rng.random((args.num_eval, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+
+    start = time.perf_counter()
+    keras_model = load_keras_model(args.model)
+    keras_load_ms = (time.perf_counter() - start) * 1000
+    ref_probs, ref_features = predict_all_with_embeddings(ServingModel(keras_model, embeddings=True), evaluation)
+
+    # Tulis ke direktori sementara dulu; artefak lama tetap dipakai sampai verifikasi lolos
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = args.output + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    export(keras_model, tmp_path)
+
+    start = time.perf_counter()
+    artifact = ServingArtifact(tmp_path)
+    artifact_load_ms = (time.perf_counter() - start) * 1000
+    probs, features = predict_all_with_embeddings(artifact, evaluation)
+    del artifact
+
+    prob_diff = float(np.abs(probs - ref_probs).max())
+    feature_diff = float(np.abs(features - ref_features).max())
+    agreement = float((probs.argmax(axis=1) == ref_probs.argmax(axis=1)).mean())
+    print(f"Verifikasi {len(evaluation)} gambar: top-1 cocok {agreement * 100:.2f}%   "
+          f"maks |selisih prob| {prob_diff:.2e}   maks |selisih fitur| {feature_diff:.2e}")
+    print(f"Waktu muat: .h5 {keras_load_ms:.0f} ms   artefak {artifact_load_ms:.0f} ms   "
+          f"({directory_size(tmp_path) / 1e6:.1f} MB)")
+    if prob_diff > args.tolerance:
+        shutil.rmtree(tmp_path)
+        print(f"Selisih melebihi toleransi {args.tolerance}; artefak tidak dipasang", file=sys.stderr)
+        sys.exit(1)
+
+    # Direktori tidak bisa di-os.replace ke direktori yang berisi: artefak lama
+    # dipindah dulu, lalu dihapus setelah yang baru terpasang. Metadata lama
+    # dihapus lebih dulu sehingga selama pertukaran loader memakai .h5
+    if os.path.exists(args.output + '.json'):
+        os.remove(args.output + '.json')
+    old_path = args.output + '.old'
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(args.output):
+        os.replace(args.output, old_path)
+    os.replace(tmp_path, args.output)
+    shutil.rmtree(old_path, ignore_errors=True)
+    meta = {
+        'source': args.model,
+        'source_sha256': file_digest(args.model),
+        'outputs': ['probabilities', 'features'],
+        'max_prob_diff': prob_diff,
+        'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    with open(args.output + '.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    print(f"Artefak disimpan ke {args.output}")
+
+
+if __name__ == '__main__':
+    main()
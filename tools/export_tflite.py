@@ -0,0 +1,142 @@
+# Ekspor model Keras ke TFLite (dynamic-range dan full int8), lalu bandingkan
+# prediksinya dengan model fp32 per kelas.
+#
+# Contoh:
+#   python -m tools.export_tflite --images data/validasi/
+#   python -m tools.export_tflite --images "data/**/*.jpg" --num-calibration 300 --num-eval 1000
+import argparse
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from tools.batch_classify import iter_image_paths, load_and_preprocess
+from utils.classifier import (CATEGORIES, MODEL_PATH, TFLITE_MODEL_PATHS, ServingModel,
+                              load_keras_model, predict_batch)
+from utils.tflite_backend import TFLiteModel
+
+
+def load_arrays(paths):
+    arrays = []
+    for path in paths:
+        _, arr, err = load_and_preprocess(path)
+        if err is None:
+            arrays.append(arr.astype(np.float32))
+    return np.stack(arrays) if arrays else np.empty((0,), dtype=np.float32)
+
+
+def convert(saved_model_dir, mode, calibration):
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == 'tflite-int8':
+        # Full integer: bobot dan aktivasi int8, input/output uint8
+        def representative_dataset():
+            for arr in calibration:
+                yield [arr[np.newaxis]]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.uint8
+        converter.inference_output_type = tf.uint8
+    return converter.convert()
+
+
+def predict_all(model, arrays, batch_size=16):
+    outputs = [predict_batch(model, arrays[i:i + batch_size]) for i in range(0, len(arrays), batch_size)]
+    if not outputs:
+        return np.zeros((0, len(CATEGORIES)), dtype=np.float32)
+    return np.concatenate(outputs)
+
+
+def agreement_report(reference, candidate):
+    # Agreement per kelas: dari gambar yang diprediksi kelas c oleh fp32,
+    # berapa persen juga diprediksi c oleh model terkuantisasi
+    ref_idx = reference.argmax(axis=1)
+    cand_idx = candidate.argmax(axis=1)
+    per_class = {}
+    for i, cat in enumerate(CATEGORIES):
+        mask = ref_idx == i
+        n = int(mask.sum())
+        per_class[cat] = {
+            'n': n,
+            'agreement': float((cand_idx[mask] == i).mean()) if n else None,
+        }
+    return {
+        'overall_agreement': float((ref_idx == cand_idx).mean()) if len(ref_idx) else None,
+        'mean_abs_prob_diff': float(np.abs(reference - candidate).mean()) if len(ref_idx) else None,
+        'per_class': per_class,
+    }
+
+
+def print_report(name, report, size_mb, latency_ms):
+    print(f"\n== {name} ({size_mb:.1f} MB, {latency_ms:.1f} ms/gambar) ==")
+    if report['overall_agreement'] is None:
+        print("Tidak ada gambar evaluasi")
+        return
+    print(f"Agreement total: {report['overall_agreement'] * 100:.2f}%   "
+          f"rata-rata |selisih prob|: {report['mean_abs_prob_diff']:.4f}")
+    for cat, row in report['per_class'].items():
+        value = f"{row['agreement'] * 100:6.2f}%" if row['agreement'] is not None else "     -"
+        print(f"  {cat:<10} {value}  (n={row['n']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ekspor model RecycleLens ke TFLite dynamic-range dan int8.")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--images', nargs='+', required=True,
+                        help="Direktori atau pola glob gambar lokal untuk kalibrasi dan evaluasi")
+    parser.add_argument('--num-calibration', type=int, default=200)
+    parser.add_argument('--num-eval', type=int, default=500)
+    parser.add_argument('--modes', nargs='+', choices=list(TFLITE_MODEL_PATHS), default=list(TFLITE_MODEL_PATHS))
+    parser.add_argument('--report', default='models/tflite_agreement.json')
+    args = parser.parse_args()
+
+    paths = list(itertools.islice(iter_image_paths(args.images), args.num_calibration + args.num_eval))
+    calibration = load_arrays(paths[:args.num_calibration])
+    # Evaluasi selalu memakai gambar terpisah dari kalibrasi; agreement pada
+    # gambar kalibrasi terlalu optimis
+    evaluation = load_arrays(paths[args.num_calibration:])
+    print(f"Kalibrasi: {len(calibration)} gambar, evaluasi: {len(evaluation)} gambar")
+    if len(calibration) == 0:
+        parser.error("tidak ada gambar yang bisa dibaca untuk kalibrasi")
+    if len(evaluation) == 0:
+        parser.error(f"tidak ada gambar evaluasi yang bisa dibaca setelah {args.num_calibration} gambar kalibrasi; "
+                     "tambah gambar atau kurangi --num-calibration")
+
+    keras_model = load_keras_model(args.model)
+    reference = predict_all(ServingModel(keras_model).warmup(), evaluation)
+
+    saved_model_dir = tempfile.mkdtemp(prefix='recyclelens_savedmodel_')
+    results = {}
+    try:
+        keras_model.export(saved_model_dir, verbose=False)
+        for mode in args.modes:
+            output_path = TFLITE_MODEL_PATHS[mode]
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, 'wb') as f:
+                f.write(convert(saved_model_dir, mode, calibration))
+
+            tflite_model = TFLiteModel(output_path).warmup()
+            start = time.perf_counter()
+            candidate = predict_all(tflite_model, evaluation)
+            latency_ms = (time.perf_counter() - start) * 1000 / max(len(evaluation), 1)
+
+            size_mb = os.path.getsize(output_path) / 1e6
+            report = agreement_report(reference, candidate)
+            report.update({'path': output_path, 'size_mb': size_mb, 'latency_ms_per_image': latency_ms})
+            results[mode] = report
+            print_report(mode, report, size_mb, latency_ms)
+    finally:
+        shutil.rmtree(saved_model_dir, ignore_errors=True)
+
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump({'reference': args.model, 'num_eval': len(evaluation), 'results': results}, f, indent=2)
+    print(f"\nLaporan disimpan ke {args.report}")
+
+
+if __name__ == '__main__':
+    main()
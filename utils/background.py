@@ -0,0 +1,44 @@
+import threading
+from concurrent.futures import Future
+
+
+class BackgroundTask:
+    # Menjalankan fn() sekali di thread terpisah; hasilnya bisa ditunggu atau
+    # dicek tanpa memblokir (mis. untuk menampilkan status "model warming").
+    # Dengan start=False thread baru jalan saat start() atau result() dipanggil.
+
+    def __init__(self, fn, name="background-task", start=True):
+        self._fn = fn
+        self._future = Future()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._start_lock = threading.Lock()
+        self._started = False
+        if start:
+            self.start()
+
+    def start(self):
+        with self._start_lock:
+            if not self._started:
+                self._started = True
+                self._thread.start()
+        return self
+
+    def _run(self):
+        if not self._future.set_running_or_notify_cancel():
+            return
+        try:
+            self._future.set_result(self._fn())
+        except BaseException as e:
+            self._future.set_exception(e)
+
+    @property
+    def ready(self):
+        return self._future.done()
+
+    @property
+    def error(self):
+        return self._future.exception() if self._future.done() else None
+
+    def result(self, timeout=None):
+        self.start()
+        return self._future.result(timeout=timeout)
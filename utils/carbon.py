@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from utils.history_store import LABEL_CATEGORIES
+from utils.recycle_info import impact_factors
+
+# Tabel dampak bertipe, satu baris per kode jenis di skema riwayat
+# (LABEL_CATEGORIES, termasuk "lainnya" yang tidak dihitung)
+IMPACT_DTYPE = np.dtype([
+    ('category', 'U16'),
+    ('co2_kg', 'f8'),
+    ('unit', 'U8'),
+    ('item_mass_kg', 'f8'),
+    ('co2_kg_per_item', 'f8'),
+    ('decomposition_min_years', 'f8'),
+    ('decomposition_max_years', 'f8'),
+])
+PERIODS = {'D': "Harian", 'W': "Mingguan", 'M': "Bulanan"}
+
+
+def impact_table(categories=LABEL_CATEGORIES, factors=impact_factors):
+    table = np.zeros(len(categories), dtype=IMPACT_DTYPE)
+    table['decomposition_min_years'] = np.nan
+    table['decomposition_max_years'] = np.nan
+    for i, name in enumerate(categories):
+        table['category'][i] = name
+        info = factors.get(name)
+        if info is None:
+            continue
+        if info['unit'] not in ('item', 'kg'):
+            raise ValueError(f"Unit dampak tidak dikenal untuk {name}: {info['unit']!r}")
+        per_item = info['co2_kg'] if info['unit'] == 'item' else info['co2_kg'] * info['item_mass_kg']
+        low, high = info['decomposition_years']
+        table[i] = (name, info['co2_kg'], info['unit'], info['item_mass_kg'], per_item,
+                    np.nan if low is None else low, np.nan if high is None else high)
+    return table
+
+
+IMPACT_TABLE = impact_table()
+CO2_PER_ITEM = IMPACT_TABLE['co2_kg_per_item']
+
+
+def period_index(times, freq):
+    # Nomor periode (int) per timestamp datetime64; minggu dimulai hari Senin
+    if freq == 'W':
+        # 1970-01-01 (hari ke-0) adalah Kamis -> geser 3 hari
+        return (times.astype('datetime64[D]').astype(np.int64) + 3) // 7
+    return times.astype(f'datetime64[{freq}]').astype(np.int64)
+
+
+def period_start(periods, freq):
+    if freq == 'W':
+        return (periods * 7 - 3).astype('datetime64[D]').astype('datetime64[ns]')
+    return periods.astype(f'datetime64[{freq}]').astype('datetime64[ns]')
+
+
+def co2_saved(frame, freq='D'):
+    # Estimasi CO2 (kg) yang dihemat dari deteksi di `frame` (frame riwayat
+    # bertipe), dalam satu bincount atas (periode, jenis):
+    # -> (total, DataFrame per jenis, DataFrame per periode `freq` D/W/M)
+    n_cat = len(LABEL_CATEGORIES)
+    codes = frame['jenis_sampah'].cat.codes.to_numpy().astype(np.int64)
+    codes[codes < 0] = n_cat - 1
+    times = frame['timestamp'].to_numpy()
+    valid = ~np.isnat(times)
+    periods = period_index(times[valid], freq)
+    first = periods.min() if len(periods) else 0
+    n_periods = int(periods.max() - first + 1) if len(periods) else 0
+    counts = np.bincount((periods - first) * n_cat + codes[valid],
+                         minlength=n_periods * n_cat).reshape(n_periods, n_cat)
+    # Deteksi tanpa timestamp valid tetap ikut total per jenis
+    by_code = counts.sum(axis=0) + np.bincount(codes[~valid], minlength=n_cat)
+    co2_by_code = by_code * CO2_PER_ITEM
+    by_category = pd.DataFrame({
+        'Jenis Sampah': LABEL_CATEGORIES,
+        'Jumlah': by_code,
+        'CO2 (kg)': co2_by_code,
+    })
+    by_category = by_category[by_category['Jumlah'] > 0].sort_values('CO2 (kg)', ascending=False)
+    period_co2 = counts @ CO2_PER_ITEM
+    by_period = pd.DataFrame({
+        'Periode': period_start(first + np.arange(n_periods), freq),
+        'Jumlah': counts.sum(axis=1),
+        'CO2 (kg)': period_co2,
+    })
+    return float(co2_by_code.sum()), by_category.reset_index(drop=True), by_period[by_period['Jumlah'] > 0]
+
+
+def co2_by_cell(cells, limit=None):
+    # Estimasi CO2 per sel grid (HotspotIndex dari rollup): satu perkalian
+    # matriks (n_sel, n_jenis) x faktor, tanpa membaca baris riwayat
+    if cells.categories != LABEL_CATEGORIES:
+        raise ValueError("Kategori HotspotIndex tidak sesuai tabel dampak")
+    counts = cells.counts
+    co2 = counts @ CO2_PER_ITEM
+    total = counts.sum(axis=1)
+    order = np.argsort(-co2, kind='stable')
+    if limit is not None:
+        order = order[:limit]
+    lat_sum, lon_sum = cells.lat_sum[order].sum(axis=1), cells.lon_sum[order].sum(axis=1)
+    return pd.DataFrame({
+        'Latitude': lat_sum / total[order],
+        'Longitude': lon_sum / total[order],
+        'Jumlah': total[order],
+        'CO2 (kg)': co2[order],
+    })
@@ -0,0 +1,70 @@
+import threading
+
+import numpy as np
+
+from utils.classifier import IMG_SIZE, predict_batch, predict_with_embeddings
+
+
+def top2_margin(probs):
+    # Selisih probabilitas top-1 dan top-2 per baris
+    top2 = np.partition(probs, -2, axis=1)[:, -2:]
+    return top2[:, 1] - top2[:, 0]
+
+
+class CascadeModel:
+    # Model cepat (mis. TFLite int8) menjalankan semua gambar; hanya gambar yang
+    # hasilnya ragu (selisih top-1/top-2 < min_margin atau keyakinan top-1 <
+    # min_confidence) yang dieskalasi ke model penuh (DenseNet121 fp32), dalam
+    # satu batch untuk seluruh gambar yang dieskalasi.
+    #
+    # Punya predict_on_batch & predict_with_embeddings seperti ServingModel.
+    # Fitur embedding hanya ada untuk gambar yang dieskalasi; baris lain NaN.
+    # Latensi end-to-end per request dicatat oleh pemanggil (antrean broker,
+    # preprocessing, dan menunggu model penuh ikut terhitung), bukan di sini.
+
+    def __init__(self, fast, full, min_margin=0.2, min_confidence=0.0):
+        self.fast = fast
+        self.full = full
+        self.min_margin = min_margin
+        self.min_confidence = min_confidence
+        self._stats_lock = threading.Lock()
+        self.items_run = 0
+        self.items_escalated = 0
+        sample = np.zeros((1, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+        self.feature_dim = predict_with_embeddings(full, sample)[1].shape[1]
+
+    def escalation_mask(self, probs):
+        return (top2_margin(probs) < self.min_margin) | (probs.max(axis=1) < self.min_confidence)
+
+    def _run(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        probs = predict_batch(self.fast, batch)
+        features = np.full((len(batch), self.feature_dim), np.nan, dtype=np.float32)
+        escalate = self.escalation_mask(probs)
+        if escalate.any():
+            probs[escalate], features[escalate] = predict_with_embeddings(self.full, batch[escalate])
+        with self._stats_lock:
+            self.items_run += len(batch)
+            self.items_escalated += int(escalate.sum())
+        return probs, features
+
+    def predict_on_batch(self, batch):
+        return self._run(batch)[0]
+
+    def predict_with_embeddings(self, batch):
+        return self._run(batch)
+
+    @property
+    def escalation_rate(self):
+        with self._stats_lock:
+            return self.items_escalated / self.items_run if self.items_run else 0.0
+
+    def stats(self):
+        # Ringkasan untuk ditampilkan: jumlah item dan rasio eskalasi
+        with self._stats_lock:
+            items, escalated = self.items_run, self.items_escalated
+        return {
+            'items': items,
+            'escalated': escalated,
+            'escalation_rate': escalated / items if items else 0.0,
+        }
@@ -0,0 +1,265 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from utils.preprocessing import IMG_SIZE, load_image
+
+# Lokasi model dan kategori output (urutan sesuai output softmax model)
+MODEL_PATH = 'models/DenseNet121_trashnetmerged_best_model.h5'
+# Varian TFLite hasil tools/export_tflite.py
+TFLITE_MODEL_PATHS = {
+    'tflite-dynamic': 'models/DenseNet121_trashnetmerged_dynamic.tflite',
+    'tflite-int8': 'models/DenseNet121_trashnetmerged_int8.tflite',
+}
+# Artefak serving hasil tools/export_serving.py: SavedModel dengan endpoint `serve`
+# (batch dinamis) yang mengembalikan softmax + fitur global-pooled, dengan metadata
+# <path>.json berisi hash model .h5 sumbernya. Graph-nya sudah di-trace saat
+# ekspor, jadi start tidak perlu men-trace ulang tf.function seperti ServingModel.
+SERVING_ARTIFACT_PATH = 'models/DenseNet121_trashnetmerged_serving'
+# 'cascade': backend cepat (TFLite) dulu, model Keras penuh hanya untuk hasil yang ragu
+BACKENDS = ['keras'] + list(TFLITE_MODEL_PATHS) + ['cascade']
+CATEGORIES = ['cardboard', 'glass', 'metal', 'paper', 'plastic', 'trash']
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def serving_artifact_metadata(artifact=SERVING_ARTIFACT_PATH):
+    try:
+        with open(artifact + '.json', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def serving_artifact_path(path=None, artifact=SERVING_ARTIFACT_PATH):
+    # Artefak serving hanya dipakai jika metadatanya ada dan cocok dengan model
+    # sumber (hash .h5 sama). Jika .h5 sumbernya tidak ikut di-deploy, artefak
+    # dipercaya selama path sumbernya sama dengan yang tercatat saat ekspor.
+    path = path or MODEL_PATH
+    meta = serving_artifact_metadata(artifact)
+    if meta is None or not os.path.exists(artifact):
+        return None
+    if not os.path.exists(path):
+        return artifact if meta.get('source') == path else None
+    return artifact if file_digest(path) == meta.get('source_sha256') else None
+
+
+def load_keras_model(path=MODEL_PATH):
+    # Import tensorflow di sini agar modul ini tetap ringan untuk di-import
+    import tensorflow as tf
+    return tf.keras.models.load_model(path)
+
+
+def batch_buckets(max_batch_size):
+    # Ukuran batch yang dikompilasi: 1, 2, 4, ... sampai max_batch_size
+    sizes = [1]
+    while sizes[-1] < max_batch_size:
+        sizes.append(min(sizes[-1] * 2, max_batch_size))
+    return sizes
+
+
+def embedding_output(model):
+    # Fitur global-pooled sebelum classifier head: output layer global pooling
+    # terakhir, atau input layer terakhir jika model tidak punya layer tersebut
+    import tensorflow as tf
+    pooling = (tf.keras.layers.GlobalAveragePooling2D, tf.keras.layers.GlobalMaxPooling2D)
+    for layer in reversed(model.layers):
+        if isinstance(layer, pooling):
+            return layer.output
+    return model.layers[-1].input
+
+
+class ServingModel:
+    # Membungkus model Keras dalam tf.function dengan signature tetap
+    # (N, 224, 224, 3) float32, sehingga setiap panggilan tidak lagi melewati
+    # data adapter dan callback milik model.predict.
+    #
+    # Dengan jit_compile=True (XLA) setiap bentuk input dikompilasi terpisah,
+    # jadi batch di-padding ke ukuran bucket terdekat agar jumlah bentuknya tetap.
+    # Punya method predict_on_batch seperti model Keras, jadi bisa dipakai
+    # langsung oleh predict_batch. Dengan embeddings=True forward pass yang sama
+    # juga mengembalikan fitur global-pooled (predict_with_embeddings).
+
+    def __init__(self, model, jit_compile=False, max_batch_size=16, embeddings=False):
+        import tensorflow as tf
+        self.model = model
+        self.jit_compile = jit_compile
+        self.embeddings = embeddings
+        self.buckets = batch_buckets(max_batch_size) if jit_compile else None
+        self.num_classes = int(model.outputs[0].shape[-1])
+        self.feature_dim = 0
+        if embeddings:
+            features = embedding_output(model)
+            self.feature_dim = int(features.shape[-1])
+            model = tf.keras.Model(model.inputs, [model.outputs[0], features])
+        self._fn = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec([None, IMG_SIZE, IMG_SIZE, 3], tf.float32)],
+            jit_compile=jit_compile,
+        )
+
+    def _bucket_size(self, n):
+        for size in self.buckets:
+            if size >= n:
+                return size
+        return n
+
+    def _run(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        n = len(batch)
+        if n == 0:
+            # Tidak perlu forward pass untuk batch kosong
+            return (np.zeros((0, self.num_classes), dtype=np.float32),
+                    np.zeros((0, self.feature_dim), dtype=np.float32))
+        if self.buckets is not None:
+            size = self._bucket_size(n)
+            if size != n:
+                padded = np.zeros((size,) + batch.shape[1:], dtype=np.float32)
+                padded[:n] = batch
+                batch = padded
+        outputs = self._fn(batch)
+        if not self.embeddings:
+            return outputs.numpy()[:n], np.zeros((n, 0), dtype=np.float32)
+        probs, features = outputs
+        return probs.numpy()[:n], features.numpy()[:n]
+
+    def predict_on_batch(self, batch):
+        return self._run(batch)[0]
+
+    def predict_with_embeddings(self, batch):
+        return self._run(batch)
+
+    def warmup(self, batch_sizes=(1,)):
+        # Tracing (dan kompilasi XLA) terjadi di sini, bukan saat request pertama user
+        sizes = self.buckets if self.buckets is not None else batch_sizes
+        for n in sizes:
+            self.predict_on_batch(np.zeros((n, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32))
+        return self
+
+
+class ServingArtifact:
+    # SavedModel hasil tools/export_serving.py dengan antarmuka yang sama seperti
+    # ServingModel(embeddings=True). Endpoint `serve` menerima batch berapa pun,
+    # jadi broker, TTA, dan scene tetap menjalankan satu forward pass per batch.
+
+    def __init__(self, path):
+        import tensorflow as tf
+        self.path = path
+        # Objek hasil load harus tetap hidup: variabel model ikut terhapus bersamanya
+        self._loaded = tf.saved_model.load(path)
+        self._serve = self._loaded.serve
+        outputs = self._loaded.signatures['serve'].structured_outputs
+        self.num_classes = int(outputs['probabilities'].shape[-1])
+        self.feature_dim = int(outputs['features'].shape[-1])
+
+    def _run(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        if len(batch) == 0:
+            return (np.zeros((0, self.num_classes), dtype=np.float32),
+                    np.zeros((0, self.feature_dim), dtype=np.float32))
+        outputs = self._serve(batch)
+        return outputs['probabilities'].numpy(), outputs['features'].numpy()
+
+    def predict_on_batch(self, batch):
+        return self._run(batch)[0]
+
+    def predict_with_embeddings(self, batch):
+        return self._run(batch)
+
+    def warmup(self, batch_sizes=(1,)):
+        for n in batch_sizes:
+            self.predict_on_batch(np.zeros((n, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32))
+        return self
+
+
+def load_serving_model(path=MODEL_PATH, jit_compile=False, max_batch_size=16, warmup=True, embeddings=False):
+    serving = ServingModel(load_keras_model(path), jit_compile=jit_compile, max_batch_size=max_batch_size,
+                           embeddings=embeddings)
+    if warmup:
+        serving.warmup(batch_sizes=(1, max_batch_size))
+    return serving
+
+
+def load_classifier(backend='keras', path=None, jit_compile=False, max_batch_size=16, warmup=True,
+                    embeddings=False, fast_backend='tflite-int8', min_margin=0.2, min_confidence=0.0,
+                    prefer_artifact=True):
+    # Memilih backend inferensi; semua backend punya method predict_on_batch.
+    # embeddings berlaku untuk model keras (varian TFLite hanya mengekspor softmax).
+    # keras: artefak serving yang cocok (serving_artifact_path) dipakai jika ada,
+    # kecuali dengan jit_compile (XLA butuh model Keras) atau prefer_artifact=False.
+    # cascade: path = model keras penuh; fast_backend, min_margin & min_confidence
+    # mengatur model cepat dan kapan hasilnya dieskalasi
+    if backend == 'keras':
+        artifact = serving_artifact_path(path) if prefer_artifact and not jit_compile else None
+        if artifact:
+            model = ServingArtifact(artifact)
+            return model.warmup(batch_sizes=(1, max_batch_size)) if warmup else model
+        return load_serving_model(path or MODEL_PATH, jit_compile=jit_compile,
+                                  max_batch_size=max_batch_size, warmup=warmup, embeddings=embeddings)
+    if backend == 'cascade':
+        from utils.cascade import CascadeModel
+        if fast_backend not in TFLITE_MODEL_PATHS:
+            raise ValueError(f"Backend cepat cascade harus salah satu dari: {', '.join(TFLITE_MODEL_PATHS)}")
+        fast = load_classifier(fast_backend, warmup=warmup)
+        full = load_classifier('keras', path, jit_compile=jit_compile, max_batch_size=max_batch_size,
+                               warmup=warmup, embeddings=embeddings, prefer_artifact=prefer_artifact)
+        return CascadeModel(fast, full, min_margin=min_margin, min_confidence=min_confidence)
+    if backend in TFLITE_MODEL_PATHS:
+        from utils.tflite_backend import TFLiteModel
+        model = TFLiteModel(path or TFLITE_MODEL_PATHS[backend])
+        return model.warmup() if warmup else model
+    raise ValueError(f"Backend tidak dikenal: {backend!r} (pilihan: {', '.join(BACKENDS)})")
+
+
+def model_version(backend='keras', path=None, fast_backend='tflite-int8'):
+    # Versi model = backend + hash isi file model; dipakai sebagai bagian kunci cache.
+    # Artefak serving memakai versi .h5 sumbernya (bobot sama, diverifikasi saat
+    # ekspor), jadi cache tetap berlaku saat artefak dipasang atau dilepas.
+    if backend == 'cascade':
+        return f"cascade:{model_version(fast_backend)}+{model_version('keras', path)}"
+    path = path or (MODEL_PATH if backend == 'keras' else TFLITE_MODEL_PATHS.get(backend))
+    if not path or not os.path.exists(path):
+        if backend == 'keras' and serving_artifact_path(path):
+            return f"{backend}:{serving_artifact_metadata()['source_sha256'][:16]}"
+        return f"{backend}:unknown"
+    return f"{backend}:{file_digest(path)[:16]}"
+
+
+def preprocess_image(img, out=None):
+    # Gambar (PIL, path, atau bytes) -> array float32 (224, 224, 3) dengan nilai 0..1
+    return load_image(img, size=IMG_SIZE, out=out)
+
+
+def _as_batch(batch):
+    # Batch kosong (mis. list []) tetap berbentuk (0, 224, 224, 3)
+    batch = np.asarray(batch, dtype=np.float32)
+    return batch.reshape((0, IMG_SIZE, IMG_SIZE, 3)) if batch.size == 0 else batch
+
+
+def predict_batch(model, batch):
+    # batch: array (N, 224, 224, 3); mengembalikan probabilitas (N, len(CATEGORIES))
+    batch = _as_batch(batch)
+    return np.asarray(model.predict_on_batch(batch))
+
+
+def predict_with_embeddings(model, batch):
+    # -> (probabilitas (N, C), fitur global-pooled (N, D)); backend tanpa fitur -> D = 0
+    batch = _as_batch(batch)
+    if hasattr(model, 'predict_with_embeddings'):
+        return model.predict_with_embeddings(batch)
+    probs = predict_batch(model, batch)
+    return probs, np.zeros((len(probs), 0), dtype=np.float32)
+
+
+def decode_predictions(probs):
+    # Ubah probabilitas menjadi daftar (label, keyakinan) per gambar
+    idx = np.argmax(probs, axis=1)
+    return [(CATEGORIES[i], float(p[i])) for i, p in zip(idx, probs)]
@@ -0,0 +1,60 @@
+import uuid
+
+import numpy as np
+
+
+def new_detection_id():
+    # ID unik per deteksi (disimpan di kolom id_deteksi); timestamp saja bisa
+    # sama untuk dua deteksi yang disimpan pada detik yang sama
+    return uuid.uuid4().hex[:16]
+
+
+class DetectionIndex:
+    # Indeks baris riwayat (posisi di frame sheet) berdasarkan id_deteksi dan
+    # jenis sampah, plus posisi baris yang lokasinya valid. Diperbarui per
+    # potongan baris baru (add) sehingga pencarian fokus/filter tidak perlu
+    # memindai seluruh frame setiap rerun.
+
+    def __init__(self):
+        self._positions = {}  # id_deteksi -> posisi baris
+        self._categories = {}  # jenis (lowercase) -> array posisi
+        self._located = {}  # jenis (lowercase) -> array posisi dengan lokasi valid
+        self._all_located = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def add(self, ids, labels, located, offset):
+        # ids, labels: array per baris; located: mask lokasi valid; offset: posisi baris pertama
+        positions = offset + np.arange(len(ids), dtype=np.int64)
+        # Baris duplikat (mis. batch journal terkirim ulang) menunjuk ke salinan terakhir
+        self._positions.update(zip(ids.tolist(), positions.tolist()))
+        # Per label unik (kolom kategorikal: hanya beberapa), bukan per baris.
+        # pandas di-import di sini: app hanya butuh new_detection_id saat start
+        import pandas as pd
+        codes, uniques = pd.factorize(labels)
+        located = np.asarray(located, dtype=bool)
+        for code, label in enumerate(uniques):
+            label = str(label).lower()
+            mask = codes == code
+            self._categories[label] = np.concatenate(
+                [self._categories.get(label, np.zeros(0, dtype=np.int64)), positions[mask]])
+            self._located[label] = np.concatenate(
+                [self._located.get(label, np.zeros(0, dtype=np.int64)), positions[mask & located]])
+        self._all_located = np.concatenate([self._all_located, positions[located]])
+
+    def position(self, detection_id):
+        return self._positions.get(detection_id)
+
+    def categories(self):
+        # Jenis sampah sesuai urutan kemunculan pertama
+        return list(self._categories)
+
+    def category_positions(self, category):
+        return self._categories.get(category.lower(), np.zeros(0, dtype=np.int64))
+
+    def located_positions(self, category=None):
+        # Posisi baris berlokasi valid (urut waktu simpan), semua jenis jika category None
+        if category is None:
+            return self._all_located
+        return self._located.get(category.lower(), np.zeros(0, dtype=np.int64))
@@ -0,0 +1,166 @@
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+
+
+class DetectionJournal:
+    # Journal lokal (SQLite) untuk baris deteksi. Setiap deteksi langsung
+    # dicatat di sini, lalu dikirim ke Google Sheets secara bulk oleh
+    # JournalFlusher. Baris yang belum terkirim tetap ada setelah restart.
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS journal ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, row TEXT NOT NULL, "
+            "created_at REAL NOT NULL, flushed_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS journal_pending ON journal (flushed_at, id)")
+        self._db.commit()
+
+    def record(self, row):
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO journal (row, created_at) VALUES (?, ?)", (json.dumps(row), time.time())
+            )
+            self._db.commit()
+            return cur.lastrowid
+
+    def pending(self, limit=None):
+        # Daftar (id, row) yang belum terkirim, urut sesuai waktu dicatat
+        query = "SELECT id, row FROM journal WHERE flushed_at IS NULL ORDER BY id"
+        params = ()
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (limit,)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [(row_id, json.loads(row)) for row_id, row in rows]
+
+    def pending_count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM journal WHERE flushed_at IS NULL").fetchone()[0]
+
+    def last_id(self):
+        # Dari sqlite_sequence, bukan MAX(id): tetap naik meski baris lama sudah di-prune
+        with self._lock:
+            row = self._db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'journal'").fetchone()
+        return row[0] if row else 0
+
+    def unsynced(self, since):
+        # Baris yang belum terkirim, atau terkirim setelah `since` (timestamp
+        # sinkronisasi terakhir) sehingga belum ada di data sheet yang sudah diambil
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, row FROM journal WHERE flushed_at IS NULL OR flushed_at >= ? ORDER BY id", (since,)
+            ).fetchall()
+        return [(row_id, json.loads(row)) for row_id, row in rows]
+
+    def mark_flushed(self, ids):
+        if not ids:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.executemany("UPDATE journal SET flushed_at = ? WHERE id = ?", [(now, i) for i in ids])
+            self._db.commit()
+
+    def prune(self, older_than):
+        # Hapus baris yang sudah terkirim sebelum timestamp `older_than` agar file
+        # journal tidak tumbuh tanpa batas; baris pending tidak pernah dihapus
+        with self._lock:
+            cur = self._db.execute("DELETE FROM journal WHERE flushed_at IS NOT NULL AND flushed_at < ?",
+                                   (older_than,))
+            self._db.commit()
+            return cur.rowcount
+
+    def flush(self, sheet, batch_size=500):
+        # Kirim semua baris pending ke sheet dengan append_rows per batch.
+        # At-least-once: jika proses mati setelah append_rows tapi sebelum
+        # mark_flushed, batch itu akan terkirim ulang saat restart.
+        sent = 0
+        while True:
+            batch = self.pending(limit=batch_size)
+            if not batch:
+                return sent
+            sheet.append_rows([row for _, row in batch])
+            self.mark_flushed([row_id for row_id, _ in batch])
+            sent += len(batch)
+
+
+class JournalFlusher:
+    # Thread latar belakang yang mengirim isi journal ke sheet setiap `interval`
+    # detik, atau lebih cepat jika satu batch penuh sudah menunggu. Jika gagal
+    # (mis. kena kuota API), percobaan berikutnya ditunda dengan exponential
+    # backoff + jitter.
+    #
+    # Setelah flush berhasil, baris yang terkirim lebih dari `retention` detik lalu
+    # dihapus. Baris yang baru terkirim tetap disimpan sebentar karena HistoryStore
+    # masih menampilkannya dari journal sampai fetch sheet berikutnya; retention
+    # harus jauh lebih lama dari TTL riwayat.
+
+    def __init__(self, journal, sheet, interval=5.0, batch_size=500, max_backoff=300.0, retention=3600.0):
+        self.journal = journal
+        self.sheet = sheet
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.retention = retention
+        self.failures = 0
+        self.last_error = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="journal-flusher", daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        # Dipanggil setelah record(); kirim lebih awal hanya jika satu batch penuh
+        # sudah menunggu dan tidak sedang backoff
+        if not self.failures and self.journal.pending_count() >= self.batch_size:
+            self._wake.set()
+
+    def stop(self, flush=True):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        if flush:
+            self.flush_once()
+
+    def flush_once(self):
+        try:
+            sent = self.journal.flush(self.sheet, batch_size=self.batch_size)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = e
+            print(f"[journal] gagal mengirim ke sheet (percobaan {self.failures}): {e}", file=sys.stderr)
+            return False
+        self.failures = 0
+        self.last_error = None
+        self.journal.prune(time.time() - self.retention)
+        return sent
+
+    def _next_delay(self):
+        if not self.failures:
+            return self.interval
+        backoff = min(self.interval * (2 ** self.failures), self.max_backoff)
+        return backoff * random.uniform(0.5, 1.0)
+
+    def _run(self):
+        # Kirim dulu baris yang tertinggal dari proses sebelumnya
+        self.flush_once()
+        while not self._stop.is_set():
+            self._wake.wait(self._next_delay())
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            if self.journal.pending_count():
+                self.flush_once()
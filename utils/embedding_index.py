@@ -0,0 +1,191 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+# Embedding = fitur global-pooled DenseNet121 (1024 dimensi) yang diproyeksikan
+# acak (Johnson-Lindenstrauss, seed tetap) ke `dim` dimensi, dinormalisasi L2,
+# lalu disimpan float16: 512 byte per deteksi pada dim 256, bukan 4 KB.
+EMBEDDING_SEED = 0
+_projections = {}
+
+
+def projection_matrix(in_dim, out_dim, seed=EMBEDDING_SEED):
+    key = (in_dim, out_dim, seed)
+    if key not in _projections:
+        rng = np.random.default_rng(seed)
+        _projections[key] = (rng.standard_normal((in_dim, out_dim)) / np.sqrt(out_dim)).astype(np.float32)
+    return _projections[key]
+
+
+def project_embeddings(features, dim):
+    # features (N, D) float32 -> (N, dim) float16 ternormalisasi; backend tanpa
+    # fitur (D = 0) -> (N, 0)
+    features = np.asarray(features, dtype=np.float32)
+    if features.shape[1] == 0:
+        return np.zeros((len(features), 0), dtype=np.float16)
+    projected = features @ projection_matrix(features.shape[1], dim)
+    norms = np.linalg.norm(projected, axis=1, keepdims=True)
+    return (projected / np.maximum(norms, 1e-12)).astype(np.float16)
+
+
+def kmeans(vectors, k, iterations=8, seed=0):
+    # Spherical k-means sederhana (vektor sudah ternormalisasi) -> centroid (k, dim)
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = np.bincount(assign, minlength=k) == 0
+        sums[empty] = centroids[empty]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+
+class EmbeddingIndex:
+    # Indeks embedding deteksi yang tersimpan (id_deteksi -> vektor float16) untuk
+    # "deteksi serupa" dan pengecekan duplikat.
+    #
+    # Sampai exact_limit vektor, pencarian exact (skor cosine = dot product,
+    # dihitung per potongan dalam float32). Di atasnya dibangun indeks IVF:
+    # vektor dikelompokkan dengan k-means ke ~sqrt(n)/4 list dan disusun
+    # berurutan per list, query hanya memindai `nprobe` list terdekat. Vektor
+    # yang ditambahkan setelah build dipindai exact sampai indeks dibangun ulang.
+    #
+    # Jika path diberikan, vektor juga disimpan ke SQLite dan dimuat ulang saat start.
+
+    def __init__(self, dim, path=None, exact_limit=20_000, nprobe=8, chunk_rows=32_768):
+        self.dim = dim
+        self.exact_limit = exact_limit
+        self.nprobe = nprobe
+        self.chunk_rows = chunk_rows
+        self._vectors = np.zeros((0, dim), dtype=np.float16)
+        self._ids = np.zeros(0, dtype='S32')
+        self._size = 0
+        self._indexed = 0  # jumlah vektor awal yang sudah tersusun per list IVF
+        self._centroids = None
+        self._offsets = None
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (id TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+            self._load()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return self._vectors[:self._size].nbytes + self._ids[:self._size].nbytes
+
+    def _load(self):
+        rows = self._db.execute("SELECT id, vector FROM embeddings ORDER BY rowid").fetchall()
+        rows = [(i, v) for i, v in rows if len(v) == self.dim * 2]
+        if rows:
+            ids, vectors = zip(*rows)
+            self._append(list(ids), np.frombuffer(b''.join(vectors), dtype=np.float16).reshape(-1, self.dim))
+            self._maybe_rebuild()
+
+    def _append(self, ids, vectors):
+        n = len(ids)
+        needed = self._size + n
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors), 1024)
+            grown = np.zeros((capacity, self.dim), dtype=np.float16)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+            grown_ids = np.zeros(capacity, dtype='S32')
+            grown_ids[:self._size] = self._ids[:self._size]
+            self._ids = grown_ids
+        self._vectors[self._size:needed] = vectors
+        self._ids[self._size:needed] = [str(i).encode('utf-8') for i in ids]
+        self._size = needed
+
+    def add(self, ids, vectors):
+        # ids: list id_deteksi; vectors: (N, dim) hasil project_embeddings.
+        # Idempoten per id: id yang sudah ada diganti vektornya di tempat (tetap di
+        # list IVF lamanya sampai build berikutnya), bukan ditambahkan lagi
+        vectors = np.asarray(vectors, dtype=np.float16).reshape(-1, self.dim)
+        latest = {str(i): v for i, v in zip(ids, vectors)}
+        ids, vectors = list(latest), np.array(list(latest.values()), dtype=np.float16).reshape(-1, self.dim)
+        with self._lock:
+            keys = np.array([i.encode('utf-8') for i in ids], dtype='S32')
+            existing = np.flatnonzero(np.isin(self._ids[:self._size], keys))
+            if len(existing):
+                position = {key: i for i, key in enumerate(keys.tolist())}
+                for pos in existing:
+                    self._vectors[pos] = vectors[position[self._ids[pos]]]
+                known = set(self._ids[existing].tolist())
+                new = [j for j, key in enumerate(keys.tolist()) if key not in known]
+                self._append([ids[j] for j in new], vectors[new])
+            else:
+                self._append(ids, vectors)
+            if self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO embeddings (id, vector) VALUES (?, ?)",
+                                     [(str(i), v.tobytes()) for i, v in zip(ids, vectors)])
+                self._db.commit()
+            self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        # Bangun ulang IVF saat vektor belum terindeks > 10% (dan > exact_limit)
+        tail = self._size - self._indexed
+        if self._size > self.exact_limit and tail > max(self.exact_limit, self._indexed // 10):
+            self.build()
+
+    def build(self, sample=50, seed=0):
+        # Latih centroid dari sampel (sample x jumlah list) lalu susun semua vektor per list
+        n = self._size
+        n_lists = int(min(max(np.sqrt(n) / 4, 16), 1024))
+        rng = np.random.default_rng(seed)
+        sample_rows = rng.choice(n, min(n, sample * n_lists), replace=False)
+        centroids = kmeans(self._vectors[sample_rows].astype(np.float32), n_lists, seed=seed)
+        assign = np.empty(n, dtype=np.int32)
+        for start in range(0, n, self.chunk_rows):
+            chunk = self._vectors[start:min(start + self.chunk_rows, n)].astype(np.float32)
+            assign[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        order = np.argsort(assign, kind='stable')
+        self._vectors[:n] = self._vectors[order]
+        self._ids[:n] = self._ids[order]
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+        self._centroids = centroids
+        self._indexed = n
+
+    def _scores(self, vectors, query):
+        scores = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), self.chunk_rows):
+            chunk = vectors[start:start + self.chunk_rows]
+            scores[start:start + len(chunk)] = chunk.astype(np.float32) @ query
+        return scores
+
+    def search(self, query, k=5, exact=False):
+        # -> list (id_deteksi, skor cosine) urut dari paling mirip
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if len(query) != self.dim:
+            return []
+        with self._lock:
+            if exact or self._centroids is None:
+                positions = None
+                candidates = self._vectors[:self._size]
+            else:
+                lists = np.argsort(-(self._centroids @ query))[:self.nprobe]
+                positions = np.concatenate(
+                    [np.arange(self._offsets[i], self._offsets[i + 1]) for i in lists]
+                    + [np.arange(self._indexed, self._size)])
+                candidates = self._vectors[positions]
+            scores = self._scores(candidates, query)
+            if len(scores) == 0:
+                return []
+            top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            if positions is not None:
+                top_positions = positions[top]
+            else:
+                top_positions = top
+            return [(self._ids[i].decode('utf-8'), float(score)) for i, score in zip(top_positions, scores[top])]
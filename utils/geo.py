@@ -0,0 +1,59 @@
+import numpy as np
+
+# Batas lintang proyeksi Web Mercator (dipakai tile OpenStreetMap/CartoDB)
+MAX_LATITUDE = 85.05112878
+
+
+def tile_xy(lat, lon, level):
+    # Koordinat (array) -> indeks tile Web Mercator (x, y) pada level tertentu.
+    # Level z membagi dunia menjadi 2^z x 2^z tile; sama dengan zoom Leaflet.
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE)
+    lon = np.asarray(lon, dtype=np.float64)
+    n = 1 << level
+    x = np.floor((lon + 180.0) / 360.0 * n)
+    lat_rad = np.radians(lat)
+    y = np.floor((1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def tile_bounds(x, y, level):
+    # Indeks tile -> (lat_selatan, lon_barat, lat_utara, lon_timur)
+    n = float(1 << level)
+    lon_west = np.asarray(x) / n * 360.0 - 180.0
+    lon_east = (np.asarray(x) + 1) / n * 360.0 - 180.0
+    lat_north = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y) / n))))
+    lat_south = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (np.asarray(y) + 1) / n))))
+    return lat_south, lon_west, lat_north, lon_east
+
+
+def cell_keys(lat, lon, level):
+    # Satu bilangan int64 per sel (x, y) pada level tertentu; unik per level (level <= 30)
+    x, y = tile_xy(lat, lon, level)
+    return (x << level) | y
+
+
+def split_cell_keys(keys, level):
+    keys = np.asarray(keys, dtype=np.int64)
+    return keys >> level, keys & ((1 << level) - 1)
+
+
+def viewport_bounds(lat, lon, zoom, width_px, height_px):
+    # Perkiraan bbox (selatan, barat, utara, timur) peta Leaflet berukuran
+    # width_px x height_px yang berpusat di (lat, lon) pada zoom tertentu
+    world_px = 256.0 * (1 << int(zoom))
+    lat = float(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    center_x = (lon + 180.0) / 360.0 * world_px
+    center_y = (1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / np.pi) / 2.0 * world_px
+
+    def to_lat(y):
+        y = min(max(y, 0.0), world_px)
+        return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / world_px)))))
+
+    west = (center_x - width_px / 2) / world_px * 360.0 - 180.0
+    east = (center_x + width_px / 2) / world_px * 360.0 - 180.0
+    if east - west >= 360.0:
+        west, east = -180.0, 180.0
+    else:
+        west = (west + 180.0) % 360.0 - 180.0
+        east = (east + 180.0) % 360.0 - 180.0
+    return to_lat(center_y + height_px / 2), west, to_lat(center_y - height_px / 2), east
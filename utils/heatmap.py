@@ -0,0 +1,86 @@
+import base64
+import io
+
+import numpy as np
+from PIL import Image, ImageColor
+
+from utils.geo import MAX_LATITUDE
+
+
+def mercator_y(lat):
+    # Lintang -> koordinat y Web Mercator (0 di utara, 1 di selatan)
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE))
+    return (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0
+
+
+def grid_bins(lat, lon, bounds, shape):
+    # Titik -> indeks bin datar (baris * lebar + kolom) pada grid `shape` yang
+    # sejajar proyeksi peta di `bounds`, plus mask titik yang jatuh di dalam grid
+    south, west, north, east = bounds
+    height, width = shape
+    lon = np.asarray(lon, dtype=np.float64)
+    if west > east:
+        # Viewport melewati garis 180 derajat: geser bujur ke rentang kontinu
+        east += 360.0
+        lon = np.where(lon < west, lon + 360.0, lon)
+    y_top, y_bottom = mercator_y(north), mercator_y(south)
+    col = np.floor((lon - west) / (east - west) * width).astype(np.int64)
+    row = np.floor((mercator_y(lat) - y_top) / (y_bottom - y_top) * height).astype(np.int64)
+    inside = (col >= 0) & (col < width) & (row >= 0) & (row < height)
+    return row[inside] * width + col[inside], inside
+
+
+def density_grid(lat, lon, weights, bounds, shape):
+    # Binning 2D (setara np.histogram2d) dari titik/sel berbobot (n, n_kategori)
+    # ke grid (n_kategori, tinggi, lebar), lewat satu bincount atas kunci
+    # (jenis, bin), sehingga bisa ditempel apa adanya sebagai ImageOverlay di `bounds`.
+    flat, inside = grid_bins(lat, lon, bounds, shape)
+    weights = np.asarray(weights, dtype=np.float64)[inside]
+    n_cat, n_bins = weights.shape[1], shape[0] * shape[1]
+    keys = np.arange(n_cat, dtype=np.int64) * n_bins + flat[:, None]
+    grid = np.bincount(keys.ravel(), weights=weights.ravel(), minlength=n_cat * n_bins)
+    return grid.reshape(n_cat, *shape)
+
+
+def count_grid(lat, lon, codes, n_cat, bounds, shape):
+    # Seperti density_grid untuk titik mentah berbobot 1 dengan kode jenis
+    # `codes`: satu bincount atas jenis * n_bin + bin, tanpa matriks one-hot
+    flat, inside = grid_bins(lat, lon, bounds, shape)
+    n_bins = shape[0] * shape[1]
+    codes = np.asarray(codes, dtype=np.int64)[inside]
+    grid = np.bincount(codes * n_bins + flat, minlength=n_cat * n_bins)
+    return grid.reshape(n_cat, *shape).astype(np.float64)
+
+
+def smooth(grid, radius=1):
+    # Box blur terpisah (horizontal lalu vertikal) pada dua sumbu terakhir
+    if radius <= 0:
+        return grid
+    size = 2 * radius + 1
+    padded = np.pad(grid, [(0, 0)] * (grid.ndim - 2) + [(radius, radius), (radius, radius)], mode='constant')
+    cumsum = np.cumsum(padded, axis=-1)
+    cumsum = np.concatenate([np.zeros_like(cumsum[..., :1]), cumsum], axis=-1)
+    horizontal = (cumsum[..., size:] - cumsum[..., :-size]) / size
+    cumsum = np.cumsum(horizontal, axis=-2)
+    cumsum = np.concatenate([np.zeros_like(cumsum[..., :1, :]), cumsum], axis=-2)
+    return (cumsum[..., size:, :] - cumsum[..., :-size, :]) / size
+
+
+def render_density(grid, colors, max_alpha=210):
+    # Grid (n_kategori, h, w) -> RGBA uint8: warna = jenis dominan di piksel,
+    # transparansi = kepadatan total (akar, relatif terhadap piksel terpadat)
+    total = grid.sum(axis=0)
+    peak = total.max()
+    rgba = np.zeros(total.shape + (4,), dtype=np.uint8)
+    if peak <= 0:
+        return rgba
+    palette = np.array([ImageColor.getrgb(color) for color in colors], dtype=np.uint8)
+    rgba[..., :3] = palette[grid.argmax(axis=0)]
+    rgba[..., 3] = np.rint(np.sqrt(total / peak) * max_alpha).astype(np.uint8)
+    return rgba
+
+
+def png_data_url(rgba):
+    buf = io.BytesIO()
+    Image.fromarray(rgba, mode='RGBA').save(buf, format='PNG')
+    return "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode('ascii')
@@ -0,0 +1,72 @@
+import glob
+import os
+import time
+
+from utils.history_store import TIMESTAMP_FORMAT
+
+# Baris per potongan yang ditulis ke file ekspor (juga ukuran row group Parquet)
+EXPORT_CHUNK_ROWS = 50_000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def write_csv(chunks, f):
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(f, header=header, index=False, date_format=TIMESTAMP_FORMAT)
+        header = False
+
+
+def write_parquet(chunks, f):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(f, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def export_history(store, directory, fmt, category=None, sort_by='timestamp', ascending=False,
+                   chunk_rows=EXPORT_CHUNK_ROWS, max_age=3600):
+    # Tulis tabel riwayat (filter & urutan yang sama dengan tampilan) ke file di
+    # `directory` per potongan baris, tanpa membangun salinan seluruh frame atau
+    # seluruh isi file di memori. File untuk versi data yang sama dipakai ulang.
+    # -> path file
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format ekspor tidak dikenal: {fmt!r}")
+    os.makedirs(directory, exist_ok=True)
+    version = '-'.join(str(v) for v in store.data_version)
+    name = f"riwayat_{category or 'semua'}_{sort_by}_{'asc' if ascending else 'desc'}_{version}.{fmt}"
+    path = os.path.join(directory, name)
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+
+    # Ekspor lama (versi data sebelumnya) dibersihkan
+    now = time.time()
+    for old in glob.glob(os.path.join(directory, 'riwayat_*')):
+        try:
+            if now - os.path.getmtime(old) > max_age:
+                os.remove(old)
+        except OSError:
+            pass
+
+    chunks = store.iter_chunks(chunk_rows, category, sort_by, ascending)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if fmt == 'csv':
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            write_csv(chunks, f)
+    else:
+        with open(tmp_path, 'wb') as f:
+            write_parquet(chunks, f)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,335 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.classifier import CATEGORIES
+from utils.detection_index import DetectionIndex
+from utils.sheets import HISTORY_COLUMNS, ID_COLUMN, column_letter
+from utils.spatial_index import SpatialIndex
+
+# Skema frame riwayat, diterapkan sekali saat baris dimuat (rows_to_frame):
+# jenis_sampah kategorikal (jenis model + "lainnya"), angka float32, timestamp
+# datetime64, id string pyarrow. Jauh lebih hemat memori dan cepat untuk
+# groupby/filter dibanding kolom object berisi string.
+LABEL_CATEGORIES = [c.lower() for c in CATEGORIES] + ['lainnya']
+LABEL_DTYPE = pd.CategoricalDtype(LABEL_CATEGORIES)
+NUMERIC_COLUMNS = ['keyakinan_model', 'latitude', 'longitude']
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+ID_DTYPE = 'string[pyarrow]'
+ID_POSITION = HISTORY_COLUMNS.index(ID_COLUMN)
+
+
+def normalize_header(header):
+    # Heuristik lama get_detection_history: jika header sheet tidak memakai nama
+    # yang diharapkan tetapi jumlah kolomnya 5, petakan berdasarkan posisi
+    header = [str(h) for h in header]
+    if 'jenis_sampah' not in header and len(header) in (len(HISTORY_COLUMNS) - 1, len(HISTORY_COLUMNS)):
+        return list(HISTORY_COLUMNS)
+    if ID_COLUMN not in header:
+        # Sheet lama tanpa kolom id: id deteksi baru ditulis di kolom setelahnya
+        header = header + [ID_COLUMN]
+    return header
+
+
+def label_codes(labels):
+    # Label mentah (string apa pun) -> kode LABEL_CATEGORIES; hanya label unik yang diproses
+    codes, uniques = pd.factorize(labels, use_na_sentinel=False)
+    lookup = {name: i for i, name in enumerate(LABEL_CATEGORIES)}
+    unique_codes = np.array([lookup.get(str(label).strip().lower(), len(LABEL_CATEGORIES) - 1)
+                             for label in uniques], dtype=np.int8)
+    return unique_codes[codes]
+
+
+def apply_schema(df):
+    if 'timestamp' in df.columns:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format=TIMESTAMP_FORMAT, errors='coerce')
+    if 'jenis_sampah' in df.columns:
+        df['jenis_sampah'] = pd.Categorical.from_codes(label_codes(df['jenis_sampah'].to_numpy()),
+                                                       dtype=LABEL_DTYPE)
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float32)
+    if ID_COLUMN in df.columns:
+        df[ID_COLUMN] = df[ID_COLUMN].astype(ID_DTYPE)
+    return df
+
+
+def rows_to_frame(rows, header, fallback_ids=None):
+    # Baris mentah (list string) -> DataFrame bertipe (lihat apply_schema).
+    # fallback_ids: id untuk baris lama yang belum punya id_deteksi (mis. nomor baris sheet)
+    width = len(header)
+    padded = [row if len(row) == width else list(row[:width]) + [''] * (width - len(row)) for row in rows]
+    df = pd.DataFrame(padded, columns=header)
+    if fallback_ids is not None and ID_COLUMN in df.columns:
+        ids = df[ID_COLUMN].to_numpy(dtype=object)
+        df[ID_COLUMN] = np.where(ids == '', np.asarray(fallback_ids, dtype=object), ids)
+    return apply_schema(df)
+
+
+def sort_positions(frame, positions, sort_by, ascending=True):
+    # Urutkan posisi baris `positions` menurut kolom `sort_by` (argsort stabil
+    # atas nilai numerik/kode kategori); nilai kosong selalu di akhir
+    column = frame[sort_by]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        keys = column.cat.codes.to_numpy()[positions]
+        missing = keys < 0
+    elif pd.api.types.is_datetime64_any_dtype(column):
+        keys = column.to_numpy().view(np.int64)[positions]
+        missing = column.isna().to_numpy()[positions]
+    else:
+        keys = column.to_numpy()[positions]
+        missing = pd.isna(keys)
+    present = positions[~missing]
+    order = np.argsort(keys[~missing], kind='stable')
+    if not ascending:
+        order = order[::-1]
+    return np.concatenate([present[order], positions[missing]])
+
+
+def valid_location_mask(df):
+    # Koordinat terisi dan bukan (0, 0)
+    lat, lon = df['latitude'], df['longitude']
+    return (lat.notna() & lon.notna() & ((lat != 0) | (lon != 0))).to_numpy()
+
+
+class HistoryStore:
+    # Cache riwayat deteksi di memori yang disinkronkan secara inkremental.
+    # Hanya baris setelah baris terakhir yang sudah diambil yang di-fetch (per
+    # range), paling sering sekali per `ttl` detik kecuali refresh(force=True).
+    #
+    # Deteksi di journal lokal yang belum terlihat di data sheet ikut
+    # ditampilkan. data_version berubah setiap kali isi frame() berubah sehingga
+    # view turunan (chart, peta) bisa di-cache berdasarkan nilai ini.
+    #
+    # Baris sheet dengan lokasi valid juga dimasukkan ke SpatialIndex sehingga
+    # peta bisa meminta hanya deteksi di dalam viewport (query_bbox), dan ke
+    # DetectionIndex untuk pencarian per id_deteksi / jenis sampah.
+
+    def __init__(self, sheet, journal=None, ttl=60.0):
+        self.sheet = sheet
+        self.journal = journal
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._header = None
+        self._next_row = 2  # baris 1 adalah header
+        self._synced = rows_to_frame([], HISTORY_COLUMNS)
+        self._sync_count = 0
+        self._last_sync = 0.0
+        # Waktu mulai fetch terakhir; baris journal yang terkirim setelah ini
+        # mungkin belum ada di _synced, jadi tetap diambil dari journal
+        self._fetch_started = 0.0
+        self._frame = None
+        self._frame_version = None
+        self._frame_synced_rows = 0
+        # Urutan baris tabel riwayat per (jenis, kolom urut, arah), untuk data_version ini
+        self._views = {}
+        self._views_version = None
+        self._spatial = SpatialIndex()
+        self._index = DetectionIndex()
+
+    @property
+    def last_synced_row(self):
+        return self._next_row - 1
+
+    @property
+    def last_sync(self):
+        return self._last_sync
+
+    @property
+    def data_version(self):
+        with self._lock:
+            return self._version()
+
+    def _version(self):
+        # Dipanggil dengan self._lock dipegang
+        journal_id = self.journal.last_id() if self.journal is not None else 0
+        return (self._sync_count, len(self._synced), journal_id)
+
+    def refresh(self, force=False):
+        with self._lock:
+            if not force and time.time() - self._last_sync < self.ttl:
+                return 0
+            fetch_started = time.time()
+            if self._header is None:
+                self._header = normalize_header(self.sheet.row_values(1) or HISTORY_COLUMNS)
+            last_col = column_letter(len(self._header))
+            rows = self.sheet.get(f"A{self._next_row}:{last_col}")
+            self._fetch_started = fetch_started
+            self._last_sync = time.time()
+            if not rows:
+                return 0
+            # gspread mengembalikan [] untuk baris kosong di tengah; tetap dihitung
+            row_numbers = [self._next_row + i for i, row in enumerate(rows) if row]
+            self._next_row += len(rows)
+            new = rows_to_frame([row for row in rows if row], self._header,
+                                fallback_ids=[f"baris-{n}" for n in row_numbers])
+            offset = len(self._synced)
+            self._synced = new if self._synced.empty else pd.concat([self._synced, new], ignore_index=True)
+            if 'latitude' in new.columns and 'longitude' in new.columns:
+                valid = valid_location_mask(new)
+                self._spatial.add(new['latitude'].to_numpy()[valid], new['longitude'].to_numpy()[valid],
+                                  offset + np.nonzero(valid)[0])
+            else:
+                valid = np.zeros(len(new), dtype=bool)
+            labels = new['jenis_sampah'] if 'jenis_sampah' in new.columns else [''] * len(new)
+            self._index.add(new[ID_COLUMN].to_numpy(), labels, valid, offset)
+            self._sync_count += 1
+            return len(new)
+
+    def synced_frame(self):
+        # Baris yang sudah diambil dari sheet; hanya bertambah di belakang (append-only)
+        with self._lock:
+            return self._synced
+
+    def pending_frame(self):
+        # Baris journal yang belum terlihat di data sheet yang sudah diambil.
+        # Baris yang terkirim selama fetch berjalan bisa sudah ada di _synced;
+        # yang id_deteksi-nya sudah terindeks dilewati agar tidak terhitung dua kali
+        if self.journal is None:
+            return rows_to_frame([], HISTORY_COLUMNS)
+        with self._lock:
+            entries = [(journal_id, row) for journal_id, row in self.journal.unsynced(self._fetch_started)
+                       if len(row) <= ID_POSITION or self._index.position(row[ID_POSITION]) is None]
+        return rows_to_frame([row for _, row in entries], HISTORY_COLUMNS,
+                             fallback_ids=[f"journal-{journal_id}" for journal_id, _ in entries])
+
+    def frame(self):
+        # DataFrame riwayat (sheet + journal yang belum tersinkron). Jangan diubah
+        # in-place: objek yang sama dikembalikan selama data_version tidak berubah.
+        return self._frame_parts()[0]
+
+    def _frame_parts(self, category=None):
+        # -> (frame, jumlah baris sheet di awal frame, data_version frame, posisi
+        # baris sheet berjenis `category`). Versi, _synced, dan posisi indeks
+        # dibaca bersamaan di bawah lock agar cocok dengan frame yang sama
+        with self._lock:
+            version = self._version()
+            positions = None if category is None else self._index.category_positions(category)
+            if self._frame is not None and self._frame_version == version:
+                return self._frame, self._frame_synced_rows, version, positions
+            synced = self._synced
+        pending = self.pending_frame()
+        frame = synced if pending.empty else pd.concat([synced, pending], ignore_index=True)
+        with self._lock:
+            self._frame = frame
+            self._frame_version = version
+            self._frame_synced_rows = len(synced)
+        return frame, len(synced), version, positions
+
+    def count_bbox(self, south, west, north, east):
+        # Perkiraan (batas atas) jumlah deteksi di dalam bbox, tanpa membaca barisnya
+        with self._lock:
+            count = self._spatial.count_upper(south, west, north, east)
+        if self.journal is not None:
+            count += self.journal.pending_count()
+        return count
+
+    def query_bbox(self, south, west, north, east):
+        # Deteksi dengan lokasi valid di dalam bbox (sheet lewat SpatialIndex,
+        # journal yang belum tersinkron difilter langsung karena jumlahnya kecil)
+        with self._lock:
+            synced = self._synced
+            ids = self._spatial.query(south, west, north, east)
+        parts = [synced.iloc[ids]]
+        pending = self.pending_frame()
+        if not pending.empty:
+            lat, lon = pending['latitude'], pending['longitude']
+            lon_inside = (lon >= west) & (lon <= east) if west <= east else (lon >= west) | (lon <= east)
+            inside = valid_location_mask(pending) & (lat >= south).to_numpy() & (lat <= north).to_numpy() \
+                & lon_inside.to_numpy()
+            parts.append(pending[inside])
+        return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+
+    def detection(self, detection_id):
+        # Satu deteksi (Series) berdasarkan id_deteksi, atau None
+        with self._lock:
+            synced = self._synced
+            position = self._index.position(detection_id)
+        if position is not None:
+            return synced.iloc[position]
+        pending = self.pending_frame()
+        match = pending[pending[ID_COLUMN] == detection_id]
+        return match.iloc[-1] if len(match) else None
+
+    def categories(self):
+        # Jenis sampah (lowercase) yang ada di riwayat, urut kemunculan pertama
+        with self._lock:
+            categories = self._index.categories()
+        pending = self.pending_frame()['jenis_sampah'].astype(str).str.lower()
+        return list(dict.fromkeys(categories + pending.tolist()))
+
+    def _with_pending(self, synced_rows, pending_mask):
+        pending = self.pending_frame()
+        parts = [synced_rows]
+        if not pending.empty:
+            parts.append(pending[pending_mask(pending)])
+        return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+
+    def _category_mask(self, category):
+        if category is None:
+            return lambda df: np.ones(len(df), dtype=bool)
+        return lambda df: (df['jenis_sampah'].astype(str).str.lower() == category.lower()).to_numpy()
+
+    def located_frame(self, category=None, limit=None):
+        # Deteksi berlokasi valid (semua jenis jika category None); `limit` = hanya yang terbaru
+        with self._lock:
+            synced = self._synced
+            positions = self._index.located_positions(category)
+        if limit is not None:
+            positions = positions[-limit:]
+        matches = self._category_mask(category)
+        frame = self._with_pending(synced.iloc[positions], lambda df: matches(df) & valid_location_mask(df))
+        return frame if limit is None else frame.tail(limit)
+
+    def located_center(self, category=None):
+        # Rata-rata (lat, lon) deteksi berlokasi valid, atau None jika tidak ada
+        with self._lock:
+            synced = self._synced
+            positions = self._index.located_positions(category)
+        pending = self.pending_frame()
+        pending = pending[self._category_mask(category)(pending) & valid_location_mask(pending)]
+        count = len(positions) + len(pending)
+        if not count:
+            return None
+        lat = np.concatenate([synced['latitude'].to_numpy()[positions], pending['latitude'].to_numpy()])
+        lon = np.concatenate([synced['longitude'].to_numpy()[positions], pending['longitude'].to_numpy()])
+        # Dirata-rata dalam float64 (kolom disimpan float32)
+        return float(lat.mean(dtype=np.float64)), float(lon.mean(dtype=np.float64))
+
+    def view_positions(self, category=None, sort_by='timestamp', ascending=False):
+        # Posisi baris frame() untuk tabel riwayat: difilter lewat indeks jenis,
+        # lalu diurutkan. Dihitung sekali per data_version untuk tiap kombinasi.
+        # -> (frame, posisi)
+        frame, synced_rows, version, positions = self._frame_parts(category)
+        key = (category, sort_by, ascending)
+        with self._lock:
+            if self._views_version != version:
+                self._views, self._views_version = {}, version
+            if key in self._views:
+                return frame, self._views[key]
+        if category is None:
+            positions = np.arange(len(frame), dtype=np.int64)
+        elif len(frame) > synced_rows:
+            pending = frame.iloc[synced_rows:]
+            positions = np.concatenate([positions, synced_rows + np.nonzero(self._category_mask(category)(pending))[0]])
+        positions = sort_positions(frame, positions, sort_by, ascending)
+        with self._lock:
+            if self._views_version == version:
+                self._views[key] = positions
+        return frame, positions
+
+    def page(self, offset, limit, category=None, sort_by='timestamp', ascending=False):
+        # Satu halaman tabel riwayat -> (DataFrame halaman, jumlah baris total)
+        frame, positions = self.view_positions(category, sort_by, ascending)
+        return frame.iloc[positions[offset:offset + limit]], len(positions)
+
+    def iter_chunks(self, chunk_rows, category=None, sort_by='timestamp', ascending=False):
+        # Seluruh tampilan tabel per potongan `chunk_rows` baris (untuk ekspor)
+        frame, positions = self.view_positions(category, sort_by, ascending)
+        if not len(positions):
+            # Tetap satu potongan kosong agar file ekspor punya header/skema
+            yield frame.iloc[:0]
+        for start in range(0, len(positions), chunk_rows):
+            yield frame.iloc[positions[start:start + chunk_rows]]
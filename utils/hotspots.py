@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+from utils.classifier import CATEGORIES
+from utils.geo import cell_keys, split_cell_keys, tile_bounds
+from utils.history_store import LABEL_CATEGORIES, label_codes
+
+# Level tile untuk grid hotspot. Lebar sel di ekuator: 18 ~ 150 m, 20 ~ 38 m,
+# 22 ~ 10 m (setara pembulatan 4 desimal yang dipakai sebelumnya)
+DEFAULT_LEVEL = 20
+EARTH_CIRCUMFERENCE_M = 40075016.686
+
+
+def cell_size_m(level, latitude=0.0):
+    # Perkiraan lebar satu sel (meter) pada lintang tertentu
+    return EARTH_CIRCUMFERENCE_M * np.cos(np.radians(latitude)) / (1 << level)
+
+
+def valid_points(df):
+    # Buang koordinat kosong dan (0, 0) seperti pada peta riwayat
+    lat = pd.to_numeric(df['latitude'], errors='coerce').to_numpy(dtype=np.float64)
+    lon = pd.to_numeric(df['longitude'], errors='coerce').to_numpy(dtype=np.float64)
+    mask = ~(np.isnan(lat) | np.isnan(lon)) & ((lat != 0) | (lon != 0))
+    return mask, lat, lon
+
+
+def _sum_by_cell(cell, n_cells, codes, n_cat, weights=None):
+    # Jumlahkan per (sel, jenis) dengan bincount (jauh lebih cepat dari np.add.at)
+    flat = np.bincount(cell * n_cat + codes, weights=weights, minlength=n_cells * n_cat)
+    return flat.reshape(n_cells, n_cat)
+
+
+def _sum_rows(inverse, n_cells, values):
+    # Jumlahkan baris matriks (n, n_cat) yang punya sel tujuan sama
+    return np.stack([np.bincount(inverse, weights=values[:, k], minlength=n_cells)
+                     for k in range(values.shape[1])], axis=1)
+
+
+class HotspotIndex:
+    # Indeks grid (tile Web Mercator pada `level`) berisi jumlah deteksi per
+    # jenis sampah untuk setiap sel. Disimpan sebagai array key yang terurut
+    # + matriks (n_sel, n_kategori), sehingga penambahan data cukup menggabungkan
+    # sel baru tanpa menghitung ulang seluruh riwayat.
+
+    def __init__(self, level=DEFAULT_LEVEL, categories=CATEGORIES):
+        self.level = level
+        self.categories = [c.lower() for c in categories] + ['lainnya']
+        self._lookup = {name: i for i, name in enumerate(self.categories)}
+        n_cat = len(self.categories)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros((0, n_cat), dtype=np.int64)
+        # Jumlah lat/lon per sel & jenis, untuk centroid
+        self.lat_sum = np.zeros((0, n_cat), dtype=np.float64)
+        self.lon_sum = np.zeros((0, n_cat), dtype=np.float64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def category_code(self, label):
+        return self._lookup.get(str(label).lower(), len(self.categories) - 1)
+
+    def label_codes(self, labels):
+        # Kolom jenis_sampah -> kode kategori indeks ini (int64). Kategori default
+        # sama dengan LABEL_CATEGORIES sehingga cukup memakai kode kolom bertipe
+        if self.categories == LABEL_CATEGORIES:
+            return label_codes(labels).astype(np.int64)
+        labels = np.asarray(labels)
+        return np.fromiter((self.category_code(label) for label in labels), dtype=np.int64, count=len(labels))
+
+    def add(self, df):
+        # Tambahkan baris riwayat (DataFrame) ke indeks; mengembalikan jumlah titik valid
+        if df.empty:
+            return 0
+        mask, lat, lon = valid_points(df)
+        if not mask.any():
+            return 0
+        lat, lon = lat[mask], lon[mask]
+        codes = self.label_codes(df['jenis_sampah'])[mask]
+        self._merge(cell_keys(lat, lon, self.level), codes, lat, lon)
+        return len(lat)
+
+    def _merge(self, keys, codes, lat, lon):
+        n_cat = len(self.categories)
+        all_keys, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        old, new = inverse[:len(self.keys)], inverse[len(self.keys):]
+        counts = np.zeros((len(all_keys), n_cat), dtype=np.int64)
+        lat_sum = np.zeros((len(all_keys), n_cat), dtype=np.float64)
+        lon_sum = np.zeros((len(all_keys), n_cat), dtype=np.float64)
+        counts[old] = self.counts
+        lat_sum[old] = self.lat_sum
+        lon_sum[old] = self.lon_sum
+        counts += _sum_by_cell(new, len(all_keys), codes, n_cat).astype(np.int64)
+        lat_sum += _sum_by_cell(new, len(all_keys), codes, n_cat, lat)
+        lon_sum += _sum_by_cell(new, len(all_keys), codes, n_cat, lon)
+        self.keys, self.counts, self.lat_sum, self.lon_sum = all_keys, counts, lat_sum, lon_sum
+
+    def merged(self, other):
+        # Salinan indeks ini ditambah isi indeks lain (level yang sama)
+        result = HotspotIndex(self.level)
+        result.categories, result._lookup = self.categories, self._lookup
+        result.keys, result.counts = self.keys, self.counts
+        result.lat_sum, result.lon_sum = self.lat_sum, self.lon_sum
+        if len(other):
+            all_keys, inverse = np.unique(np.concatenate([self.keys, other.keys]), return_inverse=True)
+            old, new = inverse[:len(self.keys)], inverse[len(self.keys):]
+            shape = (len(all_keys), len(self.categories))
+            result.keys = all_keys
+            result.counts = np.zeros(shape, dtype=np.int64)
+            result.lat_sum = np.zeros(shape, dtype=np.float64)
+            result.lon_sum = np.zeros(shape, dtype=np.float64)
+            for target, source in ((old, self), (new, other)):
+                result.counts[target] += source.counts
+                result.lat_sum[target] += source.lat_sum
+                result.lon_sum[target] += source.lon_sum
+        return result
+
+    def hotspots(self, category=None):
+        # Tabel hotspot: satu baris per sel dengan jenis sampah dominan dan
+        # jumlahnya (atau hanya `category` jika diisi), urut dari yang terbanyak.
+        # Kolom: latitude, longitude (centroid), jenis_sampah, count, total, cell
+        if category is None:
+            codes = self.counts.argmax(axis=1)
+            rows = np.arange(len(self.keys))
+            total = self.counts.sum(axis=1)
+        else:
+            code = self.category_code(category)
+            rows = np.nonzero(self.counts[:, code])[0]
+            codes = np.full(len(rows), code)
+            total = self.counts[rows, code]
+        count = self.counts[rows, codes]
+        order = np.lexsort((self.keys[rows], -count))
+        rows, codes, count, total = rows[order], codes[order], count[order], total[order]
+        x, y = split_cell_keys(self.keys[rows], self.level)
+        return pd.DataFrame({
+            'latitude': self.lat_sum[rows, codes] / count,
+            'longitude': self.lon_sum[rows, codes] / count,
+            'jenis_sampah': [self.categories[c] for c in codes],
+            'count': count,
+            'total': total,
+            'cell': list(zip(x.tolist(), y.tolist())),
+        })
+
+    def coarsen(self, level):
+        # Indeks yang sama pada level lebih kasar; cukup menggabungkan sel
+        # (4 sel anak -> 1 sel induk per level), tanpa membaca ulang baris riwayat
+        if level == self.level:
+            return self
+        if level > self.level:
+            raise ValueError(f"Level {level} lebih detail dari indeks (level {self.level})")
+        shift = self.level - level
+        x, y = split_cell_keys(self.keys, self.level)
+        keys, inverse = np.unique(((x >> shift) << level) | (y >> shift), return_inverse=True)
+        result = HotspotIndex(level)
+        result.categories, result._lookup = self.categories, self._lookup
+        result.keys = keys
+        result.counts = np.rint(_sum_rows(inverse, len(keys), self.counts)).astype(np.int64)
+        result.lat_sum = _sum_rows(inverse, len(keys), self.lat_sum)
+        result.lon_sum = _sum_rows(inverse, len(keys), self.lon_sum)
+        return result
+
+    def cell_bounds(self, cell):
+        # (lat_selatan, lon_barat, lat_utara, lon_timur) dari sel (x, y)
+        return tuple(float(v) for v in tile_bounds(cell[0], cell[1], self.level))
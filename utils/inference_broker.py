@@ -0,0 +1,117 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class InferenceBroker:
+    # Mengumpulkan request prediksi dari banyak sesi/thread ke satu antrean, lalu
+    # menjalankannya sebagai satu forward pass batch. Setiap pemanggil hanya
+    # menerima baris hasil miliknya sendiri.
+    #
+    # predict_fn menerima array (N, H, W, C) dan mengembalikan array (N, ...),
+    # atau tuple array (N, ...) -> setiap pemanggil menerima tuple baris miliknya.
+    # Batch dikirim saat sudah berisi max_batch_size item, atau saat item pertama
+    # sudah menunggu max_wait_ms.
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=10.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size harus >= 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self.batches_run = 0
+        self.items_run = 0
+        self._worker = threading.Thread(target=self._run, name="inference-broker", daemon=True)
+        self._worker.start()
+
+    def submit(self, array):
+        # array: satu sampel tanpa dimensi batch, mis. (224, 224, 3)
+        if self._closed:
+            raise RuntimeError("InferenceBroker sudah ditutup")
+        future = Future()
+        self._queue.put((np.asarray(array), future))
+        return future
+
+    def predict(self, array, timeout=None):
+        return self.submit(array).result(timeout=timeout)
+
+    def predict_many(self, arrays, timeout=None):
+        # Beberapa sampel milik satu request (mis. view TTA): semuanya masuk antrean
+        # sekaligus sehingga ikut batch yang sama -> array (N, ...). Input kosong
+        # tidak perlu antre: predict_fn langsung menghasilkan output 0 baris
+        if len(arrays) == 0:
+            return self.predict_fn(np.asarray(arrays, dtype=np.float32))
+        futures = [self.submit(array) for array in arrays]
+        results = [future.result(timeout=timeout) for future in futures]
+        if results and isinstance(results[0], tuple):
+            return tuple(np.stack(part) for part in zip(*results))
+        return np.stack(results)
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+        # Request yang masuk bersamaan dengan close() tidak akan pernah diproses
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("InferenceBroker sudah ditutup"))
+
+    @property
+    def mean_batch_size(self):
+        with self._stats_lock:
+            return self.items_run / self.batches_run if self.batches_run else 0.0
+
+    def _collect(self, first):
+        items = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Sinyal berhenti: proses batch ini dulu, lalu keluar
+                self._queue.put(None)
+                break
+            items.append(item)
+        return items
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            items = self._collect(first)
+            # Lewati request yang sudah dibatalkan pemanggilnya
+            items = [(arr, fut) for arr, fut in items if fut.set_running_or_notify_cancel()]
+            if not items:
+                continue
+            try:
+                batch = np.stack([arr for arr, _ in items])
+                outputs = self.predict_fn(batch)
+                if isinstance(outputs, tuple):
+                    outputs = list(zip(*outputs))
+                # Jumlah baris harus sama; jika tidak, baris mana milik siapa tidak
+                # bisa dipastikan dan future sisanya tidak akan pernah selesai
+                if len(outputs) != len(items):
+                    raise ValueError(f"predict_fn mengembalikan {len(outputs)} baris untuk batch {len(items)}")
+            except Exception as e:
+                for _, fut in items:
+                    fut.set_exception(e)
+                continue
+            with self._stats_lock:
+                self.batches_run += 1
+                self.items_run += len(items)
+            for (_, fut), out in zip(items, outputs):
+                fut.set_result(out)
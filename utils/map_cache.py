@@ -0,0 +1,55 @@
+import threading
+from collections import OrderedDict
+
+
+class MapCache:
+    # Cache string hasil render peta (HTML, GeoJSON, PNG data URL), dengan kunci
+    # berisi versi data riwayat + filter + viewport. Berupa LRU yang dibatasi
+    # jumlah entri dan total ukuran (byte), sehingga tampilan yang tidak berubah
+    # tidak perlu query data & agregasi lagi.
+
+    def __init__(self, max_entries=64, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        size = len(value)
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            if size > self.max_bytes:
+                return
+            self._entries[key] = value
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def get_or_render(self, key, render):
+        # render() -> str, hanya dipanggil jika kunci belum ada di cache
+        value = self.get(key)
+        if value is None:
+            value = render()
+            self.put(key, value)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._size
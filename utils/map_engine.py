@@ -0,0 +1,352 @@
+import html
+import json
+import threading
+
+import numpy as np
+
+from utils.classifier import CATEGORIES
+from utils.geo import cell_keys, split_cell_keys, tile_xy
+from utils.heatmap import count_grid, density_grid, png_data_url, render_density, smooth
+
+# Warna marker per jenis sampah (juga dipakai legenda & peta hotspot)
+CATEGORY_COLORS = {
+    'cardboard': 'orange',
+    'glass': 'blue',
+    'metal': 'gray',
+    'paper': 'green',
+    'plastic': 'red',
+    'trash': 'black'
+}
+DEFAULT_COLOR = 'darkblue'
+
+# Sel agregasi = tile pada level zoom + 2, yaitu 1/4 lebar tile peta (~64 px)
+CELL_LEVEL_OFFSET = 2
+MIN_LEVEL = 2
+MAX_LEVEL = 22
+# Zoom mulai dari mana titik mentah (bukan sel rollup) dimuat sampai batas penuh
+DETAIL_ZOOM = 15
+TILE_SIZE = 256
+
+
+class ClusterLevel:
+    # Hasil agregasi satu level: satu baris per sel yang berisi deteksi
+    def __init__(self, level, keys, count, lat, lon, category_counts, first_index):
+        self.level = level
+        self.keys = keys
+        self.count = count
+        self.lat = lat  # centroid
+        self.lon = lon
+        self.category_counts = category_counts  # (n_sel, n_kategori + 1), kolom terakhir = lainnya
+        self.first_index = first_index  # posisi baris pertama di sel tsb (untuk sel berisi 1 deteksi)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class MapPyramid:
+    # Piramida agregasi per level zoom (tile Web Mercator, kunci sel dari cell_keys) untuk data
+    # riwayat. Tiap level dihitung sekali (vektor numpy) lalu disimpan, sehingga
+    # peta hanya berisi maksimal `max_features` titik berapa pun jumlah riwayat.
+
+    def __init__(self, df, categories=CATEGORIES):
+        # history_store memuat pandas; app meng-import modul ini saat start
+        from utils.history_store import label_codes
+
+        self.categories = [c.lower() for c in categories]
+        self.lat = df['latitude'].to_numpy(dtype=np.float64)
+        self.lon = df['longitude'].to_numpy(dtype=np.float64)
+        # Jenis yang tidak dikenal masuk kolom terakhir ("lainnya"); frame riwayat
+        # bertipe (kategorikal) cukup memakai kode kategorinya
+        self.codes = label_codes(df['jenis_sampah']).astype(np.int64)
+        self.labels = np.asarray(self.categories + ['lainnya'], dtype=object)[self.codes]
+        self.confidence = df['keyakinan_model'].to_numpy(dtype=np.float64)
+        self.timestamps = df['timestamp'].astype(str).to_numpy()
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.lat)
+
+    def level(self, level):
+        with self._lock:
+            if level not in self._levels:
+                self._levels[level] = self._aggregate(level)
+            return self._levels[level]
+
+    def _aggregate(self, level):
+        n_cat = len(self.categories) + 1
+        if not len(self):
+            empty = np.zeros(0, dtype=np.int64)
+            return ClusterLevel(level, empty, empty, empty.astype(float), empty.astype(float),
+                                np.zeros((0, n_cat), dtype=np.int64), empty)
+        keys, inverse = np.unique(cell_keys(self.lat, self.lon, level), return_inverse=True)
+        count = np.bincount(inverse)
+        lat = np.bincount(inverse, weights=self.lat) / count
+        lon = np.bincount(inverse, weights=self.lon) / count
+        category_counts = np.bincount(inverse * n_cat + self.codes,
+                                      minlength=len(keys) * n_cat).reshape(len(keys), n_cat)
+        order = np.argsort(inverse, kind='stable')
+        first_index = order[np.concatenate(([0], np.cumsum(count)[:-1]))]
+        return ClusterLevel(level, keys, count, lat, lon, category_counts, first_index)
+
+    def for_zoom(self, zoom, max_features=1500):
+        # Level terdetail untuk zoom ini yang jumlah selnya tidak melebihi max_features
+        level = min(max(zoom + CELL_LEVEL_OFFSET, MIN_LEVEL), MAX_LEVEL)
+        clusters = self.level(level)
+        while len(clusters) > max_features and level > MIN_LEVEL:
+            level -= 1
+            clusters = self.level(level)
+        return clusters
+
+
+def _category_name(categories, code):
+    return categories[code] if code < len(categories) else 'lainnya'
+
+
+def _detection_popup(label, confidence, timestamp, lat, lon):
+    color = CATEGORY_COLORS.get(label, DEFAULT_COLOR)
+    return f"""
+    <div style="width:200px">
+        <h4 style="color:{color}">{html.escape(label.capitalize())}</h4>
+        <p><b>Keyakinan:</b> {confidence:.2f}%</p>
+        <p><b>Waktu:</b> {html.escape(timestamp)}</p>
+        <p><b>Koordinat:</b> {lat:.6f}, {lon:.6f}</p>
+    </div>
+    """
+
+
+# Style, popup & tooltip dibuat di browser dari properti ringkas setiap fitur,
+# jadi style dan HTML popup tidak ikut dikirim ratusan kali di dalam data GeoJSON.
+# Properti: n = jumlah deteksi, c = warna; titik tunggal: j, k, t (jenis,
+# keyakinan, waktu); cluster: b = [[jenis, warna, jumlah], ...]
+ON_EACH_FEATURE_JS = """
+function(feature, layer) {
+    function esc(s) {
+        return String(s).replace(/[&<>"']/g, function(ch) { return '&#' + ch.charCodeAt(0) + ';'; });
+    }
+    function cap(s) { s = String(s); return s.charAt(0).toUpperCase() + s.slice(1); }
+    var p = feature.properties;
+    var c = feature.geometry.coordinates;
+    var html, tip;
+    // Radius (px) tumbuh logaritmik terhadap jumlah deteksi di sel
+    layer.setStyle({
+        radius: Math.round(6 + 4 * Math.log10(p.n)),
+        color: p.c, fillColor: p.c, fillOpacity: 0.7, weight: 1
+    });
+    if (p.j !== undefined) {
+        html = '<h4 style="color:' + p.c + '">' + esc(cap(p.j)) + '</h4>'
+            + '<p><b>Keyakinan:</b> ' + p.k.toFixed(2) + '%</p>'
+            + '<p><b>Waktu:</b> ' + esc(p.t) + '</p>'
+            + '<p><b>Koordinat:</b> ' + c[1].toFixed(6) + ', ' + c[0].toFixed(6) + '</p>';
+        tip = esc(cap(p.j)) + ' (' + p.k.toFixed(1) + '%)';
+    } else {
+        html = '<h4>' + p.n + ' deteksi</h4><ul style="padding-left:16px;margin:0">';
+        p.b.forEach(function(b) {
+            html += '<li><span style="color:' + b[1] + '">&#9679;</span> ' + esc(cap(b[0])) + ': ' + b[2] + '</li>';
+        });
+        html += '</ul><p><b>Pusat:</b> ' + c[1].toFixed(6) + ', ' + c[0].toFixed(6) + '</p>';
+        tip = p.n + ' deteksi (dominan: ' + esc(cap(p.b[0][0])) + ')';
+    }
+    layer.bindPopup('<div style="width:200px">' + html + '</div>', {maxWidth: 300});
+    layer.bindTooltip(tip);
+}
+"""
+
+
+def cluster_features(clusters, categories, details=None):
+    # Sel -> GeoJSON Feature. Sel berisi satu deteksi ditampilkan sebagai titik
+    # biasa dengan popup detail (jika `details`, yaitu MapPyramid sumber, ada),
+    # sel lain sebagai cluster dengan rincian per jenis.
+    features = []
+    for i in range(len(clusters)):
+        count = int(clusters.count[i])
+        if count == 1 and details is not None:
+            row = clusters.first_index[i]
+            label = str(details.labels[row])
+            lat, lon = float(details.lat[row]), float(details.lon[row])
+            properties = {
+                'n': 1,
+                'c': CATEGORY_COLORS.get(label, DEFAULT_COLOR),
+                'j': label,
+                'k': round(float(details.confidence[row]), 2),
+                't': str(details.timestamps[row]),
+            }
+        else:
+            lat, lon = float(clusters.lat[i]), float(clusters.lon[i])
+            counts = clusters.category_counts[i]
+            breakdown = []
+            for code in np.argsort(-counts, kind='stable'):
+                if counts[code]:
+                    name = _category_name(categories, code)
+                    breakdown.append([name, CATEGORY_COLORS.get(name, DEFAULT_COLOR), int(counts[code])])
+            properties = {'n': count, 'c': breakdown[0][1], 'b': breakdown}
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [round(lon, 6), round(lat, 6)]},
+            'properties': properties,
+        })
+    return features
+
+
+def clusters_from_cells(cells, bounds, category=None):
+    # Sel HotspotIndex (rollup) di dalam bbox -> ClusterLevel, tanpa membaca baris riwayat.
+    # Jika `category` diisi hanya jumlah jenis tersebut yang dihitung.
+    south, west, north, east = bounds
+    x, y = split_cell_keys(cells.keys, cells.level)
+    x0, y0 = tile_xy(north, west, cells.level)
+    x1, y1 = tile_xy(south, east, cells.level)
+    x_inside = (x >= x0) & (x <= x1) if west <= east else (x >= x0) | (x <= x1)
+    counts, lat_sum, lon_sum = cells.counts, cells.lat_sum, cells.lon_sum
+    if category is not None:
+        code = cells.category_code(category)
+        keep = np.zeros(counts.shape[1], dtype=bool)
+        keep[code] = True
+        counts, lat_sum, lon_sum = counts * keep, lat_sum * keep, lon_sum * keep
+    rows = np.nonzero(x_inside & (y >= y0) & (y <= y1) & (counts.sum(axis=1) > 0))[0]
+    counts = counts[rows]
+    count = counts.sum(axis=1)
+    return ClusterLevel(cells.level, cells.keys[rows], count,
+                        lat_sum[rows].sum(axis=1) / count, lon_sum[rows].sum(axis=1) / count,
+                        counts, None)
+
+
+def viewport_point_limit(zoom, max_points=50000, max_features=1500):
+    # Batas titik mentah yang dimuat untuk satu viewport: penuh mulai DETAIL_ZOOM,
+    # separuhnya per level zoom di bawahnya (di zoom rendah peta memakai sel rollup)
+    return max(max_features, max_points >> max(0, DETAIL_ZOOM - int(zoom)))
+
+
+def viewport_clusters(store, rollups, bounds, zoom, category=None, max_features=1500, max_points=50000):
+    # Cluster untuk viewport `bounds` (selatan, barat, utara, timur).
+    # -> (ClusterLevel, categories, details) untuk detection_geojson().
+    # Jika jumlah titik di viewport masih di bawah batas zoom ini, titik diambil
+    # dari SpatialIndex HistoryStore lalu dikelompokkan; jika tidak, dipakai sel
+    # rollup yang sudah teragregasi sehingga biaya tidak tergantung jumlah riwayat.
+    if store.count_bbox(*bounds) <= viewport_point_limit(zoom, max_points, max_features):
+        points = store.query_bbox(*bounds)
+        if category is not None:
+            points = points[points['jenis_sampah'].astype(str).str.lower() == category.lower()]
+        pyramid = MapPyramid(points)
+        return pyramid.for_zoom(zoom, max_features), pyramid.categories, pyramid
+    level = min(max(int(zoom) + CELL_LEVEL_OFFSET, MIN_LEVEL), rollups.cells.level)
+    clusters = clusters_from_cells(rollups.hotspot_cells(level), bounds, category)
+    while len(clusters) > max_features and level > MIN_LEVEL:
+        level -= 1
+        clusters = clusters_from_cells(rollups.hotspot_cells(level), bounds, category)
+    return clusters, rollups.cells.categories[:-1], None
+
+
+def detection_geojson(clusters, categories, details=None):
+    # FeatureCollection (string JSON, '' jika kosong) untuk detection_layer(); inilah
+    # yang di-cache per viewport sehingga rerun tidak perlu query & clustering ulang
+    if not len(clusters):
+        return ''
+    return json.dumps({'type': 'FeatureCollection', 'features': cluster_features(clusters, categories, details)},
+                      separators=(',', ':'))
+
+
+def detection_layer(geojson, focus=None):
+    # FeatureGroup berisi satu layer GeoJSON (style & popup dibuat di browser,
+    # lihat ON_EACH_FEATURE_JS) dan, jika ada, marker bintang untuk deteksi yang difokuskan.
+    # focus: dict/Series dengan latitude, longitude, jenis_sampah, keyakinan_model, timestamp
+    import folium
+
+    layer = folium.FeatureGroup(name="Deteksi")
+    if geojson:
+        # Tanpa style_function folium hanya memanggil setStyle(properties.style);
+        # properti itu tidak ada sehingga style dari ON_EACH_FEATURE_JS tetap dipakai
+        folium.GeoJson(
+            geojson,
+            marker=folium.CircleMarker(),
+            on_each_feature=folium.JsCode(ON_EACH_FEATURE_JS),
+        ).add_to(layer)
+
+    if focus is not None:
+        _add_focus_marker(layer, focus)
+    return layer
+
+
+def _add_focus_marker(layer, focus):
+    import folium
+
+    label = str(focus['jenis_sampah']).lower()
+    color = CATEGORY_COLORS.get(label, DEFAULT_COLOR)
+    location = [float(focus['latitude']), float(focus['longitude'])]
+    confidence = float(focus['keyakinan_model'])
+    # Lingkaran untuk menyorot marker yang difokuskan
+    folium.Circle(location=location, radius=20, color=color, fill=True, fill_opacity=0.3).add_to(layer)
+    folium.Marker(
+        location=location,
+        popup=folium.Popup(_detection_popup(label, confidence, str(focus['timestamp']), *location),
+                           max_width=300),
+        tooltip=f"{label.capitalize()} ({confidence:.1f}%)",
+        icon=folium.Icon(color=color, icon='star', prefix='fa', icon_color='yellow'),
+    ).add_to(layer)
+
+
+def viewport_density(store, rollups, bounds, zoom, category=None, shape=(125, 200),
+                     pixel_size=4, max_points=50000):
+    # Grid kepadatan (n_kategori, tinggi, lebar) untuk viewport `bounds`.
+    # Satu bin grid = `pixel_size` piksel layar. Titik mentah dipakai jika
+    # jumlahnya di bawah batas zoom ini; jika tidak, sel rollup seukuran satu
+    # bin, sehingga biaya mengikuti resolusi grid, bukan jumlah riwayat.
+    cells = rollups.cells
+    n_cat = len(cells.categories)
+    if store.count_bbox(*bounds) <= viewport_point_limit(zoom, max_points, 0):
+        points = store.query_bbox(*bounds)
+        codes = cells.label_codes(points['jenis_sampah'])
+        lat = points['latitude'].to_numpy(dtype=np.float64)
+        lon = points['longitude'].to_numpy(dtype=np.float64)
+        if category is not None:
+            keep = codes == cells.category_code(category)
+            codes, lat, lon = codes[keep], lat[keep], lon[keep]
+        return count_grid(lat, lon, codes, n_cat, bounds, shape)
+    level = int(zoom) + int(np.log2(TILE_SIZE / pixel_size))
+    level = min(max(level, MIN_LEVEL), cells.level)
+    clusters = clusters_from_cells(rollups.hotspot_cells(level), bounds, category)
+    return density_grid(clusters.lat, clusters.lon, clusters.category_counts, bounds, shape)
+
+
+def density_image(grid, categories):
+    # Grid kepadatan -> PNG (data URL) untuk heatmap_layer(), atau '' jika kosong:
+    # warna = jenis sampah dominan per bin, transparansi = jumlah deteksi
+    if not grid.any():
+        return ''
+    colors = [CATEGORY_COLORS.get(name, DEFAULT_COLOR) for name in categories]
+    return png_data_url(render_density(smooth(grid), colors))
+
+
+def heatmap_layer(image, bounds, focus=None):
+    # FeatureGroup berisi satu gambar PNG (ImageOverlay, hasil density_image) di
+    # `bounds`. Ukuran data ke browser tetap (sesuai resolusi grid) berapa pun jumlah titik.
+    import folium
+
+    south, west, north, east = bounds
+    if west > east:
+        east += 360.0
+    layer = folium.FeatureGroup(name="Heatmap")
+    if image:
+        folium.raster_layers.ImageOverlay(
+            image=image,
+            bounds=[[south, west], [north, east]],
+            interactive=False,
+        ).add_to(layer)
+    if focus is not None:
+        _add_focus_marker(layer, focus)
+    return layer
+
+
+def bounds_from_leaflet(bounds):
+    # Nilai "bounds" dari st_folium -> (selatan, barat, utara, timur), atau None
+    # jika belum ada viewport. Bujur Leaflet bisa di luar -180..180 setelah peta
+    # digeser melewati garis 180 derajat, jadi dinormalkan.
+    try:
+        south, west = bounds['_southWest']['lat'], bounds['_southWest']['lng']
+        north, east = bounds['_northEast']['lat'], bounds['_northEast']['lng']
+    except (KeyError, TypeError):
+        return None
+    if None in (south, west, north, east):
+        return None
+    if east - west >= 360.0:
+        return south, -180.0, north, 180.0
+    return south, (west + 180.0) % 360.0 - 180.0, north, (east + 180.0) % 360.0 - 180.0
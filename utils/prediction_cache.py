@@ -0,0 +1,104 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    # Cache hasil prediksi berdasarkan hash isi gambar + versi model.
+    # Nilai: (label, keyakinan, embedding float16 atau None jika belum ada).
+    # Di memori berupa LRU terbatas (max_entries); jika path diberikan, hasil juga
+    # disimpan ke SQLite sehingga tetap ada setelah restart dan dipakai lintas sesi.
+
+    def __init__(self, max_entries=1024, path=None, max_disk_entries=100_000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._puts_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "key TEXT PRIMARY KEY, label TEXT NOT NULL, confidence REAL NOT NULL, last_used REAL NOT NULL, "
+                "embedding BLOB)"
+            )
+            # Cache dari versi sebelum ada kolom embedding
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(predictions)")]
+            if 'embedding' not in columns:
+                self._db.execute("ALTER TABLE predictions ADD COLUMN embedding BLOB")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(image_bytes, model_version):
+        digest = hashlib.sha256()
+        digest.update(model_version.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(image_bytes)
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT label, confidence, embedding FROM predictions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE predictions SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    embedding = None if row[2] is None else np.frombuffer(row[2], dtype=np.float16)
+                    value = (row[0], float(row[1]), embedding)
+                    self._remember(key, value)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key, label, confidence, embedding=None):
+        if embedding is not None:
+            embedding = np.asarray(embedding, dtype=np.float16)
+        value = (label, float(confidence), embedding)
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO predictions (key, label, confidence, last_used, embedding) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value[0], value[1], time.time(), None if embedding is None else embedding.tobytes()),
+                )
+                self._db.commit()
+                self._puts_since_prune += 1
+                if self._puts_since_prune >= 1000:
+                    self._prune_disk()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _prune_disk(self):
+        # Hapus entri yang paling lama tidak dipakai jika melebihi batas disk
+        self._puts_since_prune = 0
+        self._db.execute(
+            "DELETE FROM predictions WHERE key IN ("
+            "SELECT key FROM predictions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+        self._db.commit()
@@ -0,0 +1,132 @@
+import io
+import threading
+
+import numpy as np
+from PIL import Image, ImageOps
+
+IMG_SIZE = 224
+# Batas piksel untuk menolak "decompression bomb"; foto ponsel 48 MP masih lolos
+MAX_IMAGE_PIXELS = 100_000_000
+# draft()/reduce() berhenti saat sisi terpendek masih >= DECODE_HEADROOM x ukuran
+# akhir, agar resize bicubic terakhir tetap punya cukup piksel. Pada foto asli
+# (assets/) selisih dengan decode penuh: 4x maks 0.09, rata-rata 0.0005;
+# 2x sampai 0.22 (lihat benchmarks/bench_preprocessing.py)
+DECODE_HEADROOM = 4
+
+_buffers = threading.local()
+
+
+class ImageTooLargeError(ValueError):
+    pass
+
+
+def open_image(source):
+    # Image.open dengan bom dekompresi PIL dilaporkan sebagai ImageTooLargeError
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    try:
+        return Image.open(source)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from e
+
+
+def _check_size(img, max_pixels):
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"Gambar terlalu besar ({width}x{height} = {width * height / 1e6:.0f} MP, "
+            f"maksimal {max_pixels / 1e6:.0f} MP)"
+        )
+
+
+def thread_buffer(size=IMG_SIZE):
+    # Buffer float32 (size, size, 3) yang dipakai ulang per thread
+    buf = getattr(_buffers, 'array', None)
+    if buf is None or buf.shape[0] != size:
+        buf = np.empty((size, size, 3), dtype=np.float32)
+        _buffers.array = buf
+    return buf
+
+
+def decode_rgb(source, min_side=IMG_SIZE * DECODE_HEADROOM, max_pixels=MAX_IMAGE_PIXELS):
+    # Path/bytes/file-like/PIL Image -> PIL Image RGB yang sisi terpendeknya
+    # masih >= kira-kira min_side (atau ukuran asli jika lebih kecil).
+    #
+    # Urutan langkah dibuat agar foto ponsel besar tidak pernah didecode penuh:
+    # 1. cek ukuran header (tanpa decode) terhadap batas piksel
+    # 2. JPEG: draft() meminta libjpeg decode dengan skala DCT 1/2, 1/4, atau 1/8
+    # 3. orientasi EXIF diterapkan
+    # 4. reduce() dengan faktor bulat (box filter murah) sampai mendekati min_side
+    # Image milik pemanggil (mis. yang juga ditampilkan di UI) tidak diubah
+    owned = not isinstance(source, Image.Image)
+    img = open_image(source) if owned else source
+    _check_size(img, max_pixels)
+
+    if owned:
+        if img.format == 'JPEG':
+            img.draft('RGB', (min_side, min_side))
+        ImageOps.exif_transpose(img, in_place=True)
+    else:
+        img = ImageOps.exif_transpose(img)
+    img = img.convert('RGB')
+
+    factor = min(img.width // min_side, img.height // min_side)
+    if factor >= 2:
+        img = img.reduce(factor)
+    return img
+
+
+def load_image(source, size=IMG_SIZE, out=None, max_pixels=MAX_IMAGE_PIXELS):
+    # Path/bytes/file-like/PIL Image -> array float32 (size, size, 3) bernilai 0..1;
+    # resize akhir ke (size, size) ditulis langsung sebagai float32 ke `out`
+    img = decode_rgb(source, size * DECODE_HEADROOM, max_pixels).resize((size, size))
+    if out is None:
+        out = np.empty((size, size, 3), dtype=np.float32)
+    np.divide(np.asarray(img), np.float32(255.0), out=out, dtype=np.float32)
+    return out
+
+
+# Test-time augmentation: (porsi sisi yang di-crop, posisi crop, flip horizontal).
+# Urutan = prioritas; mode TTA dengan n view memakai n transformasi pertama.
+TTA_TRANSFORMS = [
+    (1.0, 'center', False),
+    (1.0, 'center', True),
+    (0.875, 'center', False),
+    (0.75, 'center', False),
+    (0.875, 'top-left', False),
+    (0.875, 'top-right', False),
+    (0.875, 'bottom-left', False),
+    (0.875, 'bottom-right', False),
+]
+
+
+def crop_box(width, height, fraction, anchor):
+    # Kotak (left, top, right, bottom) seluas `fraction` dari tiap sisi
+    w, h = width * fraction, height * fraction
+    left = {'center': (width - w) / 2, 'top-left': 0, 'bottom-left': 0}.get(anchor, width - w)
+    top = {'center': (height - h) / 2, 'top-left': 0, 'top-right': 0}.get(anchor, height - h)
+    return (left, top, left + w, top + h)
+
+
+def load_tta_views(source, n_views=len(TTA_TRANSFORMS), size=IMG_SIZE, out=None,
+                   max_pixels=MAX_IMAGE_PIXELS):
+    # Gambar -> batch float32 (n_views, size, size, 3) berisi view augmentasi.
+    # Gambar hanya didecode sekali; setiap crop di-resize dari piksel yang sama
+    # (resize dengan box), flip cukup membalik array.
+    if not 1 <= n_views <= len(TTA_TRANSFORMS):
+        raise ValueError(f"n_views harus 1..{len(TTA_TRANSFORMS)}")
+    transforms = TTA_TRANSFORMS[:n_views]
+    img = decode_rgb(source, size * DECODE_HEADROOM, max_pixels)
+    # Satu resize ke resolusi terkecil yang masih cukup untuk crop tersempit,
+    # agar resize per view bekerja pada gambar kecil
+    scale = size / min(fraction for fraction, _, _ in transforms) / min(img.size)
+    if scale < 1 and n_views > 1:
+        img = img.resize((max(round(img.width * scale), size), max(round(img.height * scale), size)))
+    if out is None:
+        out = np.empty((n_views, size, size, 3), dtype=np.float32)
+    for view, (fraction, anchor, flip) in zip(out, transforms):
+        pixels = np.asarray(img.resize((size, size), box=crop_box(img.width, img.height, fraction, anchor)))
+        if flip:
+            pixels = pixels[:, ::-1]
+        np.divide(pixels, np.float32(255.0), out=view, dtype=np.float32)
+    return out
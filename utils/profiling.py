@@ -0,0 +1,67 @@
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class PhaseTimer:
+    # Mencatat durasi tiap fase (mis. import, koneksi sheets, load model) dan
+    # mencetak ringkasannya ke log server.
+
+    def __init__(self, label, verbose=True):
+        self.label = label
+        self.verbose = verbose
+        self.phases = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.phases.append((name, seconds))
+        if self.verbose:
+            print(f"[{self.label}] {name}: {seconds * 1000:.0f} ms", file=sys.stderr, flush=True)
+
+    def summary(self):
+        with self._lock:
+            phases = list(self.phases)
+        return f"[{self.label}] " + " | ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in phases)
+
+    def has_phase(self, name):
+        with self._lock:
+            return any(phase == name for phase, _ in self.phases)
+
+    def report(self):
+        print(self.summary(), file=sys.stderr, flush=True)
+
+
+class LatencyWindow:
+    # Latensi end-to-end per request (ms) untuk N request terakhir, per grup
+    # (mis. jalur cepat vs dieskalasi pada cascade)
+
+    def __init__(self, size=1000):
+        self.size = size
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def record(self, seconds, group='semua'):
+        with self._lock:
+            if group not in self._groups:
+                self._groups[group] = deque(maxlen=self.size)
+            self._groups[group].append(seconds * 1000)
+
+    def summary(self):
+        # -> {grup: (jumlah, p50_ms, p99_ms)}
+        with self._lock:
+            groups = {group: list(values) for group, values in self._groups.items()}
+        return {group: (len(values),) + tuple(float(v) for v in np.percentile(values, [50, 99]))
+                for group, values in groups.items() if values}
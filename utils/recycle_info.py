@@ -179,3 +179,23 @@ recycle_guide = {
         """
     },
 }
+
+# Angka dampak per jenis sampah dalam bentuk numerik (sumber: teks "impact" &
+# "carbon_footprint" di atas), dipakai utils/carbon.py untuk estimasi CO2.
+#   co2_kg            : kg CO2 per `unit` ("item" = satu barang, "kg" = per kilogram)
+#   item_mass_kg      : perkiraan berat satu barang yang terdeteksi (untuk unit "kg")
+#   decomposition_years: (minimum, maksimum) waktu penguraian dalam tahun; None = tidak diketahui
+impact_factors = {
+    "glass": {"co2_kg": 0.25, "unit": "item", "item_mass_kg": 0.2,
+              "decomposition_years": (1_000_000.0, None)},
+    "paper": {"co2_kg": 0.1, "unit": "item", "item_mass_kg": 0.005,
+              "decomposition_years": (2 / 12, 5 / 12)},
+    "cardboard": {"co2_kg": 0.15, "unit": "item", "item_mass_kg": 0.2,
+                  "decomposition_years": (2 / 12, 5 / 12)},
+    "plastic": {"co2_kg": 6.0, "unit": "kg", "item_mass_kg": 0.025,
+                "decomposition_years": (100.0, 1000.0)},
+    "metal": {"co2_kg": 9.0, "unit": "kg", "item_mass_kg": 0.015,
+              "decomposition_years": (80.0, 100.0)},
+    "trash": {"co2_kg": 4.0, "unit": "kg", "item_mass_kg": 0.1,
+              "decomposition_years": (None, None)},
+}
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from utils.history_store import TIMESTAMP_FORMAT
+from utils.hotspots import HotspotIndex
+
+# Sel hotspot disimpan pada level terdetail; level lebih kasar diturunkan
+# dengan HotspotIndex.coarsen (lihat slider resolusi di tab riwayat)
+CELL_LEVEL = 22
+SNAPSHOT_FORMAT = 1
+
+
+def row_fingerprint(row):
+    # Hash satu baris riwayat; dipakai untuk memastikan snapshot masih cocok
+    # dengan isi sheet (sheet tidak diganti/dipotong sejak snapshot dibuat)
+    return hashlib.sha256(json.dumps([str(v) for v in row]).encode('utf-8')).hexdigest()[:16]
+
+
+class Rollups:
+    # Tabel agregat riwayat deteksi: jumlah per jenis sampah, per (tanggal, jam)
+    # dan per sel grid. Diperbarui dengan add() per potongan baris baru, jadi
+    # chart & tabel analitik tidak perlu membaca ulang seluruh riwayat.
+
+    def __init__(self, cell_level=CELL_LEVEL):
+        self.rows = 0
+        self.by_class = Counter()
+        self.by_hour = Counter()  # ('YYYY-MM-DD', jam) -> jumlah
+        self.cells = HotspotIndex(cell_level)
+        self._coarse = {}
+        self._parts = None
+
+    def add(self, df):
+        if df.empty:
+            return
+        self.rows += len(df)
+        # Frame riwayat bertipe: value_counts atas kolom kategorikal & datetime64
+        labels = df['jenis_sampah'].value_counts(sort=False)
+        self.by_class.update({str(label): int(n) for label, n in labels.items() if n})
+        times = df['timestamp']
+        if not pd.api.types.is_datetime64_any_dtype(times):
+            times = pd.to_datetime(times, format=TIMESTAMP_FORMAT, errors='coerce')
+        times = times.dropna()
+        if len(times):
+            hours = times.dt.floor('h').value_counts(sort=False)
+            self.by_hour.update({(t.strftime("%Y-%m-%d"), t.hour): int(n) for t, n in hours.items()})
+        self.cells.add(df)
+        self._coarse = {}
+        self._parts = None
+
+    def merged(self, other):
+        result = Rollups(self.cells.level)
+        result.rows = self.rows + other.rows
+        result.by_class = self.by_class + other.by_class
+        result.by_hour = self.by_hour + other.by_hour
+        result.cells = self.cells.merged(other.cells)
+        # Level kasar hasil gabungan dihitung dari cache masing-masing bagian
+        result._parts = (self, other)
+        return result
+
+    def class_counts(self):
+        # Seperti value_counts(): DataFrame (Jenis Sampah, Jumlah), urut terbanyak
+        items = sorted(self.by_class.items(), key=lambda item: -item[1])
+        return pd.DataFrame(items, columns=['Jenis Sampah', 'Jumlah'])
+
+    def daily_counts(self):
+        days = Counter()
+        for (day, _), n in self.by_hour.items():
+            days[day] += n
+        return pd.DataFrame(sorted(days.items()), columns=['Tanggal', 'Jumlah'])
+
+    def hourly_counts(self):
+        hours = np.zeros(24, dtype=np.int64)
+        for (_, hour), n in self.by_hour.items():
+            hours[hour] += n
+        return pd.DataFrame({'Jam': np.arange(24), 'Jumlah': hours})
+
+    def hotspot_cells(self, level):
+        # Sel pada `level`, diturunkan dari level lebih detail terdekat yang sudah ada
+        if level not in self._coarse and self._parts is not None:
+            base, overlay = self._parts
+            self._coarse[level] = base.hotspot_cells(level).merged(overlay.hotspot_cells(level))
+        elif level not in self._coarse:
+            finer = [cached for cached in self._coarse if cached > level]
+            source = self._coarse[min(finer)] if finer else self.cells
+            self._coarse[level] = source.coarsen(level)
+        return self._coarse[level]
+
+    def save(self, path, meta):
+        # Snapshot ke .npz (ditulis ke file sementara lalu di-rename)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        hour_keys = list(self.by_hour)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                meta=np.array(json.dumps(dict(meta, format=SNAPSHOT_FORMAT, rows=self.rows, level=self.cells.level))),
+                class_labels=np.array(list(self.by_class), dtype=str),
+                class_counts=np.array(list(self.by_class.values()), dtype=np.int64),
+                hour_days=np.array([day for day, _ in hour_keys], dtype=str),
+                hour_hours=np.array([hour for _, hour in hour_keys], dtype=np.int64),
+                hour_counts=np.array([self.by_hour[key] for key in hour_keys], dtype=np.int64),
+                cell_keys=self.cells.keys,
+                cell_counts=self.cells.counts,
+                cell_lat_sum=self.cells.lat_sum,
+                cell_lon_sum=self.cells.lon_sum,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        # -> (Rollups, meta) atau (None, None) jika snapshot tidak ada/tidak valid
+        try:
+            with np.load(path) as data:
+                meta = json.loads(str(data['meta']))
+                if meta.get('format') != SNAPSHOT_FORMAT:
+                    return None, None
+                rollups = cls(meta['level'])
+                if data['cell_counts'].shape[1:] != rollups.cells.counts.shape[1:]:
+                    return None, None
+                rollups.rows = meta['rows']
+                rollups.by_class = Counter(dict(zip(data['class_labels'].tolist(), data['class_counts'].tolist())))
+                rollups.by_hour = Counter({
+                    (day, hour): n for day, hour, n in zip(
+                        data['hour_days'].tolist(), data['hour_hours'].tolist(), data['hour_counts'].tolist())
+                })
+                rollups.cells.keys = data['cell_keys']
+                rollups.cells.counts = data['cell_counts']
+                rollups.cells.lat_sum = data['cell_lat_sum']
+                rollups.cells.lon_sum = data['cell_lon_sum']
+            return rollups, meta
+        except FileNotFoundError:
+            return None, None
+        except Exception as e:
+            print(f"[rollups] snapshot {path} tidak bisa dibaca, dihitung ulang: {e}", file=sys.stderr)
+            return None, None
+
+
+class RollupEngine:
+    # Rollups yang mengikuti HistoryStore. Baris sheet yang baru tersinkron
+    # dilipat sekali ke rollup permanen; deteksi yang baru disimpan (masih di
+    # journal) ditambahkan sebagai overlay kecil saat snapshot() dipanggil,
+    # sehingga langsung terlihat tanpa dihitung dua kali setelah terkirim.
+    #
+    # Rollup permanen disimpan ke `snapshot_path` dan dimuat saat start; baris
+    # yang sudah tercakup snapshot tidak diagregasi ulang.
+
+    def __init__(self, store, snapshot_path=None, cell_level=CELL_LEVEL):
+        self.store = store
+        self.snapshot_path = snapshot_path
+        self.cell_level = cell_level
+        self._lock = threading.Lock()
+        self._rollups = Rollups(cell_level)
+        self._consumed = 0
+        self._fingerprint = None
+        self._snapshot = None
+        self._snapshot_version = None
+        if snapshot_path:
+            rollups, meta = Rollups.load(snapshot_path)
+            if rollups is not None and rollups.cells.level == cell_level:
+                self._rollups = rollups
+                self._consumed = meta['consumed']
+                self._fingerprint = meta['fingerprint']
+
+    def _restart(self):
+        self._rollups = Rollups(self.cell_level)
+        self._consumed = 0
+        self._fingerprint = None
+
+    def _fold_synced(self):
+        # False jika sheet belum pernah berhasil diambil dan masih di belakang snapshot
+        synced = self.store.synced_frame()
+        if len(synced) < self._consumed:
+            if not self.store.last_sync:
+                return False
+            # Fetch pertama mengambil seluruh sheet: sheet lebih pendek dari snapshot
+            print("[rollups] sheet lebih pendek dari snapshot, dihitung ulang", file=sys.stderr)
+            self._restart()
+        elif self._consumed and row_fingerprint(synced.iloc[self._consumed - 1].tolist()) != self._fingerprint:
+            print("[rollups] snapshot tidak cocok dengan isi sheet, dihitung ulang", file=sys.stderr)
+            self._restart()
+        if len(synced) > self._consumed:
+            self._rollups.add(synced.iloc[self._consumed:])
+            self._consumed = len(synced)
+            self._fingerprint = row_fingerprint(synced.iloc[-1].tolist())
+            if self.snapshot_path:
+                try:
+                    self._rollups.save(self.snapshot_path,
+                                       {'consumed': self._consumed, 'fingerprint': self._fingerprint})
+                except OSError as e:
+                    print(f"[rollups] gagal menyimpan snapshot: {e}", file=sys.stderr)
+        return True
+
+    def snapshot(self):
+        # Rollups terkini (sheet + journal yang belum tersinkron), di-cache per data_version
+        version = self.store.data_version
+        with self._lock:
+            if self._snapshot is not None and self._snapshot_version == version:
+                return self._snapshot
+            if not self._fold_synced():
+                # Sheet masih di belakang snapshot (mis. fetch awal gagal): hitung dari frame saja
+                full = Rollups(self.cell_level)
+                full.add(self.store.frame())
+                self._snapshot, self._snapshot_version = full, version
+                return full
+            pending = Rollups(self.cell_level)
+            pending.add(self.store.pending_frame())
+            self._snapshot = self._rollups.merged(pending)
+            self._snapshot_version = version
+            return self._snapshot
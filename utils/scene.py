@@ -0,0 +1,110 @@
+import math
+
+import numpy as np
+from PIL import ImageDraw, ImageOps
+
+from utils.classifier import CATEGORIES
+from utils.preprocessing import DECODE_HEADROOM, IMG_SIZE, MAX_IMAGE_PIXELS, decode_rgb
+
+# Mode scene: gambar berisi beberapa sampah dipecah menjadi tile multi-skala
+# (grid g x g untuk tiap g), semua tile diklasifikasi dalam satu batch, lalu
+# tile berlabel sama yang bertumpuk digabung menjadi satu region/item.
+
+
+def tile_boxes(grids=(1, 2, 3), overlap=0.25):
+    # -> (boxes (N, 4) ternormalisasi 0..1 sebagai (x0, y0, x1, y1), grid (N,))
+    # Tile bertetangga pada satu grid tumpang tindih sebesar `overlap` lebar tile
+    boxes, levels = [], []
+    for g in grids:
+        span = 1.0 / (g - (g - 1) * overlap)
+        step = span * (1 - overlap)
+        for row in range(g):
+            for col in range(g):
+                boxes.append((col * step, row * step, col * step + span, row * step + span))
+                levels.append(g)
+    return np.clip(np.array(boxes, dtype=np.float64), 0.0, 1.0), np.array(levels)
+
+
+def load_tiles(source, boxes, size=IMG_SIZE, out=None, max_pixels=MAX_IMAGE_PIXELS):
+    # Gambar -> batch float32 (N, size, size, 3), satu tile per box. Gambar hanya
+    # didecode sekali pada resolusi yang cukup untuk tile terkecil (dengan
+    # DECODE_HEADROOM seperti load_image); setiap tile di-resize dari piksel
+    # yang sama (resize dengan box).
+    min_span = float(np.min(np.minimum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])))
+    img = decode_rgb(source, math.ceil(size * DECODE_HEADROOM / min_span), max_pixels)
+    # Satu resize ke resolusi di mana tile terkecil tepat `size` piksel (seperti
+    # load_tta_views), agar resize per tile bekerja pada gambar kecil
+    scale = size / min_span / min(img.size)
+    if scale < 1:
+        img = img.resize((max(round(img.width * scale), size), max(round(img.height * scale), size)))
+    if out is None:
+        out = np.empty((len(boxes), size, size, 3), dtype=np.float32)
+    scale = np.array([img.width, img.height, img.width, img.height], dtype=np.float64)
+    for tile, box in zip(out, boxes * scale):
+        np.divide(np.asarray(img.resize((size, size), box=tuple(box))), np.float32(255.0),
+                  out=tile, dtype=np.float32)
+    return out
+
+
+def overlap_ratio(a, b):
+    # Luas irisan dibagi luas box yang lebih kecil
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    smaller = min((a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1]))
+    return width * height / smaller
+
+
+def merge_tiles(probs, boxes, levels, min_confidence=0.6, min_overlap=0.2):
+    # Gabungkan hasil per tile menjadi region:
+    # - tile dengan keyakinan < min_confidence diabaikan
+    # - dari grid terhalus ke terkasar: tile berlabel sama yang bertumpuk
+    #   (overlap_ratio >= min_overlap) pada grid yang sama digabung satu region
+    # - tile grid lebih kasar hanya menambah region baru jika tidak menutupi
+    #   region berlabel sama yang sudah ada (mis. benda besar yang tidak
+    #   terlihat utuh di tile kecil)
+    # -> list dict {label, confidence, box (x0, y0, x1, y1) 0..1, tiles}, urut keyakinan
+    labels = probs.argmax(axis=1)
+    confidence = probs.max(axis=1)
+    regions = []
+    for level in sorted(set(levels.tolist()), reverse=True):
+        found = []
+        for i in np.flatnonzero(levels == level):
+            if confidence[i] < min_confidence:
+                continue
+            label = CATEGORIES[labels[i]]
+            if any(r['label'] == label and overlap_ratio(boxes[i], r['box']) >= min_overlap for r in regions):
+                continue
+            # Region pada grid ini yang bertumpuk dengan tile ini digabung
+            joined = [r for r in found if r['label'] == label
+                      and any(overlap_ratio(boxes[i], boxes[j]) >= min_overlap for j in r['members'])]
+            region = {'label': label, 'confidence': float(confidence[i]), 'box': boxes[i].copy(), 'members': [i]}
+            for other in joined:
+                found.remove(other)
+                region['confidence'] = max(region['confidence'], other['confidence'])
+                region['box'][:2] = np.minimum(region['box'][:2], other['box'][:2])
+                region['box'][2:] = np.maximum(region['box'][2:], other['box'][2:])
+                region['members'] += other['members']
+            found.append(region)
+        regions += found
+    regions.sort(key=lambda r: r['confidence'], reverse=True)
+    return [{'label': r['label'], 'confidence': r['confidence'], 'box': tuple(float(v) for v in r['box']),
+             'tiles': len(r['members'])} for r in regions]
+
+
+def draw_regions(image, regions, colors, default_color='darkblue'):
+    # Salinan gambar (orientasi EXIF diterapkan) dengan kotak & label tiap region
+    annotated = ImageOps.exif_transpose(image).convert('RGB')
+    draw = ImageDraw.Draw(annotated)
+    width = max(2, min(annotated.size) // 150)
+    for region in regions:
+        x0, y0, x1, y1 = region['box']
+        box = (x0 * annotated.width, y0 * annotated.height, x1 * annotated.width, y1 * annotated.height)
+        color = colors.get(region['label'], default_color)
+        draw.rectangle(box, outline=color, width=width)
+        text = f"{region['label']} {region['confidence'] * 100:.0f}%"
+        text_box = draw.textbbox((box[0] + width, box[1] + width), text)
+        draw.rectangle(text_box, fill=color)
+        draw.text((box[0] + width, box[1] + width), text, fill='white')
+    return annotated
@@ -0,0 +1,95 @@
+import os
+
+# Pengaturan runtime RecycleLens, bisa di-override lewat environment variable
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value not in (None, '') else default
+
+
+# Micro-batching antar sesi Streamlit
+MAX_BATCH_SIZE = _env_int('RECYCLELENS_MAX_BATCH_SIZE', 16)
+MAX_WAIT_MS = _env_float('RECYCLELENS_MAX_WAIT_MS', 10.0)
+
+# Kompilasi XLA untuk jalur serving (tf.function dengan jit_compile)
+USE_XLA = os.environ.get('RECYCLELENS_XLA', '0').lower() in ('1', 'true', 'yes')
+
+# Backend inferensi: 'keras', 'tflite-dynamic', 'tflite-int8', atau 'cascade'
+BACKEND = os.environ.get('RECYCLELENS_BACKEND', 'keras')
+# Cascade: model cepat dulu; dieskalasi ke DenseNet121 penuh jika selisih top-1/top-2
+# < CASCADE_MIN_MARGIN atau keyakinan top-1 < CASCADE_MIN_CONFIDENCE
+CASCADE_FAST_BACKEND = os.environ.get('RECYCLELENS_CASCADE_FAST_BACKEND', 'tflite-int8')
+CASCADE_MIN_MARGIN = _env_float('RECYCLELENS_CASCADE_MIN_MARGIN', 0.2)
+CASCADE_MIN_CONFIDENCE = _env_float('RECYCLELENS_CASCADE_MIN_CONFIDENCE', 0.0)
+
+# Mode akurasi tinggi: jumlah view test-time augmentation per gambar, dibatasi
+# ke 1..8 (jumlah preprocessing.TTA_TRANSFORMS)
+TTA_VIEWS = min(max(_env_int('RECYCLELENS_TTA_VIEWS', 4), 1), 8)
+
+# Mode scene (banyak item): ukuran grid tile multi-skala, tumpang tindih antar
+# tile, dan keyakinan minimum sebuah tile dihitung sebagai item
+SCENE_GRIDS = tuple(int(g) for g in os.environ.get('RECYCLELENS_SCENE_GRIDS', '1,2,3').split(','))
+SCENE_OVERLAP = _env_float('RECYCLELENS_SCENE_OVERLAP', 0.25)
+SCENE_MIN_CONFIDENCE = _env_float('RECYCLELENS_SCENE_MIN_CONFIDENCE', 0.6)
+
+# Embedding deteksi (fitur DenseNet121 diproyeksikan ke EMBEDDING_DIM dimensi)
+# untuk "deteksi serupa" dan pengecekan duplikat; path kosong = hanya di memori
+EMBEDDING_DIM = _env_int('RECYCLELENS_EMBEDDING_DIM', 256)
+EMBEDDING_INDEX_PATH = os.environ.get('RECYCLELENS_EMBEDDING_INDEX_PATH', 'state/embeddings.sqlite')
+SIMILAR_RESULTS = _env_int('RECYCLELENS_SIMILAR_RESULTS', 5)
+# Deteksi yang mirip (cosine >= DUPLICATE_SIMILARITY) dengan deteksi tersimpan dalam
+# DUPLICATE_WINDOW detik terakhir tidak disimpan ulang
+DUPLICATE_SIMILARITY = _env_float('RECYCLELENS_DUPLICATE_SIMILARITY', 0.97)
+DUPLICATE_WINDOW = _env_float('RECYCLELENS_DUPLICATE_WINDOW', 600.0)
+
+# Cache prediksi (hash gambar + versi model); path kosong = hanya di memori
+PREDICTION_CACHE_SIZE = _env_int('RECYCLELENS_PREDICTION_CACHE_SIZE', 1024)
+PREDICTION_CACHE_PATH = os.environ.get('RECYCLELENS_PREDICTION_CACHE_PATH', '')
+
+# Journal deteksi lokal (write-behind ke Google Sheets)
+JOURNAL_PATH = os.environ.get('RECYCLELENS_JOURNAL_PATH', 'state/detection_journal.sqlite')
+JOURNAL_FLUSH_INTERVAL = _env_float('RECYCLELENS_JOURNAL_FLUSH_INTERVAL', 5.0)
+JOURNAL_BATCH_SIZE = _env_int('RECYCLELENS_JOURNAL_BATCH_SIZE', 500)
+# Baris journal yang sudah terkirim dihapus setelah sekian detik
+JOURNAL_RETENTION = _env_float('RECYCLELENS_JOURNAL_RETENTION', 3600.0)
+
+# Jika diisi, riwayat disimpan ke CSV lokal ini alih-alih Google Sheets (mode offline)
+LOCAL_SHEET_PATH = os.environ.get('RECYCLELENS_LOCAL_SHEET_PATH', '')
+
+# Berapa detik riwayat di memori dianggap segar sebelum baris baru diambil dari sheet
+HISTORY_TTL = _env_float('RECYCLELENS_HISTORY_TTL', 60.0)
+
+# Peta riwayat: batas jumlah titik/cluster yang dikirim ke browser dan jumlah
+# deteksi terbaru yang bisa dipilih di "Fokus ke lokasi"
+MAP_MAX_FEATURES = _env_int('RECYCLELENS_MAP_MAX_FEATURES', 1500)
+MAP_FOCUS_OPTIONS = _env_int('RECYCLELENS_MAP_FOCUS_OPTIONS', 500)
+# Batas titik mentah yang dimuat untuk satu viewport peta (pada zoom >= 15;
+# separuhnya per level zoom di bawahnya, lalu peta memakai sel rollup)
+MAP_VIEWPORT_POINTS = _env_int('RECYCLELENS_MAP_VIEWPORT_POINTS', 50000)
+# Mode heatmap: lebar satu bin grid kepadatan dalam piksel layar
+HEATMAP_PIXEL_SIZE = _env_int('RECYCLELENS_HEATMAP_PIXEL_SIZE', 4)
+# Cache HTML/JS peta yang sudah dirender (LRU: jumlah entri & total ukuran MB)
+MAP_CACHE_ENTRIES = _env_int('RECYCLELENS_MAP_CACHE_ENTRIES', 64)
+MAP_CACHE_MB = _env_int('RECYCLELENS_MAP_CACHE_MB', 64)
+
+# Tabel riwayat: jumlah baris per halaman (default) dan folder file ekspor CSV/Parquet
+HISTORY_PAGE_SIZE = _env_int('RECYCLELENS_HISTORY_PAGE_SIZE', 50)
+EXPORT_DIR = os.environ.get('RECYCLELENS_EXPORT_DIR', 'state/exports')
+
+# Level tile grid hotspot (20 ~ 38 m, 22 ~ 10 m per sel di ekuator)
+HOTSPOT_LEVEL = _env_int('RECYCLELENS_HOTSPOT_LEVEL', 20)
+
+# Level tile wilayah untuk ringkasan estimasi CO2 (15 ~ 1,2 km per sel di ekuator)
+CARBON_REGION_LEVEL = _env_int('RECYCLELENS_CARBON_REGION_LEVEL', 15)
+
+# Snapshot rollup analitik (jumlah per jenis/jam/sel); kosong = tidak disimpan
+ROLLUP_SNAPSHOT_PATH = os.environ.get('RECYCLELENS_ROLLUP_SNAPSHOT_PATH', 'state/rollups.npz')
+
+# Catat fase yang dikerjakan tiap rerun ke log server & sidebar
+RERUN_STATS = os.environ.get('RECYCLELENS_RERUN_STATS', '1').lower() in ('1', 'true', 'yes')
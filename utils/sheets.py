@@ -0,0 +1,109 @@
+import csv
+import os
+import re
+import threading
+
+# Urutan kolom di Google Sheet riwayat deteksi. id_deteksi ditambahkan belakangan:
+# sheet lama berisi 5 kolom pertama saja
+ID_COLUMN = 'id_deteksi'
+HISTORY_COLUMNS = ['timestamp', 'jenis_sampah', 'keyakinan_model', 'latitude', 'longitude', ID_COLUMN]
+
+
+def column_letter(n):
+    # 1 -> 'A', 5 -> 'E', 27 -> 'AA' (notasi A1)
+    letters = ''
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
+
+
+def _column_number(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - ord('A') + 1
+    return n
+
+
+def _parse_range(range_name):
+    # 'A2:E', 'A2:E10', atau '1:1' -> (baris_awal, baris_akhir, kolom_awal, kolom_akhir), 1-based
+    match = re.fullmatch(r'([A-Z]*)(\d*):([A-Z]*)(\d*)', range_name)
+    if not match:
+        raise ValueError(f"Range tidak didukung: {range_name!r}")
+    col_start, row_start, col_end, row_end = match.groups()
+    return (int(row_start) if row_start else 1,
+            int(row_end) if row_end else None,
+            _column_number(col_start) if col_start else 1,
+            _column_number(col_end) if col_end else None)
+
+
+def _numericise(value):
+    # Meniru gspread.get_all_records: string angka dikembalikan sebagai angka
+    if value == '':
+        return value
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+class LocalSheet:
+    # Pengganti worksheet gspread berbasis file CSV lokal (atau memori jika path
+    # None). Dipakai untuk menjalankan aplikasi dan journal tanpa koneksi internet.
+    # Baris 1 adalah header, sama seperti sheet asli.
+
+    def __init__(self, path=None, header=HISTORY_COLUMNS):
+        self.path = path
+        self._lock = threading.Lock()
+        self._rows = [list(header)]
+        if path and os.path.exists(path):
+            with open(path, newline='', encoding='utf-8') as f:
+                rows = list(csv.reader(f))
+            if rows:
+                self._rows = rows
+        elif path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._write_rows(self._rows, mode='w')
+
+    def _write_rows(self, rows, mode='a'):
+        with open(self.path, mode, newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(rows)
+
+    def append_row(self, values, **kwargs):
+        self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        rows = [[str(v) for v in row] for row in values]
+        with self._lock:
+            self._rows.extend(rows)
+            if self.path:
+                self._write_rows(rows)
+
+    @property
+    def row_count(self):
+        with self._lock:
+            return len(self._rows)
+
+    def get_all_values(self):
+        with self._lock:
+            return [list(row) for row in self._rows]
+
+    def row_values(self, row):
+        with self._lock:
+            return list(self._rows[row - 1]) if row <= len(self._rows) else []
+
+    def get(self, range_name):
+        # Seperti Worksheet.get di gspread: list baris (string) dalam range A1
+        row_start, row_end, col_start, col_end = _parse_range(range_name)
+        with self._lock:
+            rows = self._rows[row_start - 1:row_end]
+        return [list(row[col_start - 1:col_end]) for row in rows]
+
+    def get_all_records(self):
+        with self._lock:
+            header, *rows = self._rows
+        return [{key: _numericise(value) for key, value in zip(header, row)} for row in rows]
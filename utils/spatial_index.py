@@ -0,0 +1,85 @@
+import numpy as np
+
+from utils.geo import cell_keys, tile_xy
+
+# Level tile untuk indeks (16 ~ 600 m per sel di ekuator)
+INDEX_LEVEL = 16
+# Di atas jumlah kolom tile ini query memakai satu rentang x lalu filter lintang
+MAX_COLUMNS = 256
+
+
+class SpatialIndex:
+    # Indeks titik (lat, lon) untuk query bounding box. Titik diurutkan menurut
+    # key tile (x lalu y) sehingga isi satu kolom tile dengan rentang y tertentu
+    # bersebelahan di array dan bisa diambil dengan searchsorted; biaya query
+    # sebanding dengan jumlah titik di sekitar viewport, bukan seluruh riwayat.
+
+    def __init__(self, level=INDEX_LEVEL):
+        self.level = level
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.lat = np.zeros(0, dtype=np.float64)
+        self.lon = np.zeros(0, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, lat, lon, ids):
+        # Tambah titik (array); `ids` = nomor baris pemanggil yang dikembalikan query()
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(lat):
+            return
+        keys = cell_keys(lat, lon, self.level)
+        order = np.argsort(keys, kind='stable')
+        keys, lat, lon, ids = keys[order], lat[order], lon[order], ids[order]
+        # Sisipkan potongan terurut ke array terurut (O(n + m log m))
+        at = np.searchsorted(self.keys, keys, side='right')
+        self.keys = np.insert(self.keys, at, keys)
+        self.ids = np.insert(self.ids, at, ids)
+        self.lat = np.insert(self.lat, at, lat)
+        self.lon = np.insert(self.lon, at, lon)
+
+    def _ranges(self, south, west, north, east):
+        # Rentang posisi [start, stop) di array yang mungkin berisi titik dalam bbox
+        x0, y0 = tile_xy(north, west, self.level)
+        x1, y1 = tile_xy(south, east, self.level)
+        x0, y0, x1, y1 = int(x0), int(y0), int(x1), int(y1)
+        if x1 - x0 + 1 > MAX_COLUMNS:
+            start = np.searchsorted(self.keys, x0 << self.level)
+            stop = np.searchsorted(self.keys, (x1 + 1) << self.level)
+            return np.array([start]), np.array([stop])
+        columns = np.arange(x0, x1 + 1, dtype=np.int64) << self.level
+        starts = np.searchsorted(self.keys, columns | y0)
+        stops = np.searchsorted(self.keys, columns | y1, side='right')
+        return starts, stops
+
+    def _boxes(self, south, west, north, east):
+        # Bbox yang melewati garis 180 derajat dipecah dua
+        if west <= east:
+            return [(south, west, north, east)]
+        return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+    def count_upper(self, south, west, north, east):
+        # Batas atas jumlah titik dalam bbox (tanpa membaca koordinat titik)
+        total = 0
+        for box in self._boxes(south, west, north, east):
+            starts, stops = self._ranges(*box)
+            total += int((stops - starts).sum())
+        return total
+
+    def query(self, south, west, north, east):
+        # -> array ids (terurut) dari titik di dalam bbox
+        found = []
+        for box in self._boxes(south, west, north, east):
+            starts, stops = self._ranges(*box)
+            if not len(starts) or not (stops - starts).sum():
+                continue
+            positions = np.concatenate([np.arange(a, b) for a, b in zip(starts, stops) if b > a])
+            lat, lon = self.lat[positions], self.lon[positions]
+            inside = (lat >= box[0]) & (lat <= box[2]) & (lon >= box[1]) & (lon <= box[3])
+            found.append(self.ids[positions[inside]])
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
@@ -0,0 +1,70 @@
+import os
+import threading
+
+import numpy as np
+
+
+def _load_interpreter_class():
+    # Runtime TFLite ringan dipakai jika terpasang; jika tidak, pakai tensorflow
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        import tensorflow as tf
+        return tf.lite.Interpreter
+
+
+class TFLiteModel:
+    # Menjalankan model .tflite (float, dynamic-range, atau full int8) dengan
+    # antarmuka predict_on_batch yang sama seperti model Keras.
+    # Input float 0..1 dikuantisasi otomatis jika model memakai input int8/uint8.
+    #
+    # Bentuk input interpreter dibuat tetap (batch 1) dan batch dijalankan per
+    # sampel: resize_tensor_input setelah invoke bisa crash dengan delegate
+    # XNNPACK, sedangkan overhead invoke TFLite per sampel kecil.
+
+    def __init__(self, path, num_threads=None):
+        Interpreter = _load_interpreter_class()
+        self.path = path
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads or os.cpu_count())
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self.input_shape = tuple(self._input['shape'][1:])
+        # Interpreter TFLite tidak thread-safe
+        self._lock = threading.Lock()
+
+    def _quantize(self, sample):
+        dtype = self._input['dtype']
+        if dtype == np.float32:
+            return sample
+        scale, zero_point = self._input['quantization']
+        info = np.iinfo(dtype)
+        return np.clip(np.round(sample / scale + zero_point), info.min, info.max).astype(dtype)
+
+    def _dequantize(self, output):
+        if self._output['dtype'] == np.float32:
+            return output
+        scale, zero_point = self._output['quantization']
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def predict_on_batch(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        outputs = []
+        with self._lock:
+            for sample in batch:
+                self.interpreter.set_tensor(self._input['index'], self._quantize(sample[np.newaxis]))
+                self.interpreter.invoke()
+                outputs.append(self._dequantize(self.interpreter.get_tensor(self._output['index'])[0]))
+        if not outputs:
+            return np.zeros((0, self._output['shape'][-1]), dtype=np.float32)
+        return np.stack(outputs)
+
+    def warmup(self, batch_sizes=(1,)):
+        self.predict_on_batch(np.zeros((1,) + self.input_shape, dtype=np.float32))
+        return self